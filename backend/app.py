@@ -12,7 +12,14 @@ from flask_login import current_user, logout_user
 # Configuration imports
 from .config import Config
 from .extensions import db, login_manager, csrf, migrate
-from .models import Notification
+from .cli import register_commands
+from .services.activity_service import init_activity_log
+from .services.dashboard_service import ensure_dashboard_rollups, start_usage_reconciler
+from .services.folder_service import ensure_folder_tree
+from .services.notification_service import unread_summary
+from .services.schema_service import upgrade_schema
+from .services.gc_service import start_background_sweeper
+from .services.job_service import init_job_workers
 
 # --------------------------------------------------
 # BLUEPRINT IMPORTS
@@ -36,6 +43,8 @@ from .routes.settings import settings_bp
 from .routes.storage import storage_bp
 from .routes.security import security_bp
 from .routes.notifications import notifications_bp
+from .routes.uploads import uploads_bp
+from .routes.jobs import jobs_bp
 
 
 def create_app(config_class=Config):
@@ -50,6 +59,15 @@ def create_app(config_class=Config):
     # --------------------------------------------------
     app.config.from_object(config_class)
 
+    # Rotated ENCRYPTION_KEY without a pinned index key: stored search and
+    # dedup hashes were made with a key that is no longer the primary
+    if app.config.get("ENCRYPTION_OLD_KEYS") and not app.config.get("SEARCH_INDEX_KEY"):
+        app.logger.warning(
+            "ENCRYPTION_OLD_KEYS is set but SMARTDMS_INDEX_KEY is not: search "
+            "and dedup hashes follow the new key. Set SMARTDMS_INDEX_KEY to the "
+            "previous key, or run 'flask search reindex --content'."
+        )
+
     # --------------------------------------------------
     # ENSURE REQUIRED FOLDERS
     # --------------------------------------------------
@@ -80,6 +98,11 @@ def create_app(config_class=Config):
     # --------------------------------------------------
     with app.app_context():
         db.create_all()
+        added = upgrade_schema()  # columns added to existing tables
+        if added:
+            app.logger.info("Schema upgraded: %s", ", ".join(added))
+        ensure_folder_tree()  # backfill folder_closure on existing databases
+        ensure_dashboard_rollups()  # first count of dashboard_rollups
 
     # --------------------------------------------------
     # JINJA FILTER: IST (Timezone)
@@ -103,19 +126,14 @@ def create_app(config_class=Config):
     @app.context_processor
     def inject_notifications():
         if current_user.is_authenticated:
-            unread = (
-                Notification.query
-                .filter_by(
-                    user_id=current_user.id,
-                    is_read=False
-                )
-                .order_by(Notification.created_at.desc())
-                .limit(10)
-                .all()
+            # Cached per user, invalidated by notification writes
+            summary = unread_summary(int(current_user.id))
+            return dict(
+                unread_notifications=summary["recent"],
+                unread_count=summary["count"]
             )
-            return dict(unread_notifications=unread)
 
-        return dict(unread_notifications=[])
+        return dict(unread_notifications=[], unread_count=0)
 
     # --------------------------------------------------
     # REGISTER BLUEPRINTS
@@ -124,12 +142,21 @@ def create_app(config_class=Config):
         auth_bp, document_bp, folder_bp, profile_bp, dashboard_bp, api_bp,
         recycle_bin_bp, archive_bp, sharing_bp, favorites_bp, users_bp,
         roles_bp, reports_bp, approvals_bp, settings_bp, storage_bp,
-        security_bp, notifications_bp
+        security_bp, notifications_bp, uploads_bp, jobs_bp
     ]
 
     for bp in blueprints:
         app.register_blueprint(bp)
 
+    # --------------------------------------------------
+    # CLI COMMANDS + BACKGROUND JOBS
+    # --------------------------------------------------
+    register_commands(app)
+    init_activity_log(app)
+    start_background_sweeper(app)
+    start_usage_reconciler(app)
+    init_job_workers(app)
+
     # --------------------------------------------------
     # HOME ROUTE (FORCE LOGIN)
     # --------------------------------------------------
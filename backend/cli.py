@@ -0,0 +1,182 @@
+# backend/cli.py
+# Maintenance commands, available as `flask --app run <group> <command>`.
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+from .extensions import db
+from .models import Document
+from .services.content_index_service import index_document_content_safely
+from .services.dashboard_service import rebuild_dashboard_rollups, reconcile_storage_usage
+from .services.document_service import rotate_document_fields
+from .services.folder_service import rebuild_folder_tree
+from .services.gc_service import (
+    DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, sweep_orphans
+)
+from .services.job_service import run_pending_jobs
+from .services.schema_service import upgrade_schema
+from .services.upload_service import purge_expired_uploads
+
+storage_cli = AppGroup("storage", help="Encrypted file storage maintenance.")
+search_cli = AppGroup("search", help="Search index maintenance.")
+folders_cli = AppGroup("folders", help="Folder hierarchy maintenance.")
+dashboard_cli = AppGroup("dashboard", help="Dashboard statistics maintenance.")
+jobs_cli = AppGroup("jobs", help="Background jobs.")
+schema_cli = AppGroup("schema", help="Database schema maintenance.")
+keys_cli = AppGroup("keys", help="Encryption key maintenance.")
+
+
+# =========================
+# STORAGE: ORPHAN SWEEP
+# =========================
+@storage_cli.command("gc")
+@click.option("--dry-run", is_flag=True, help="Report orphans without deleting anything.")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Rows / files handled per batch.")
+@click.option("--workers", default=DEFAULT_WORKERS, show_default=True, help="Parallel unlink threads.")
+@click.option("--rate", type=float, default=None, help="Max files deleted per second.")
+@click.option("--grace", type=int, default=None, help="Skip files younger than this many seconds.")
+def storage_gc(dry_run, batch_size, workers, rate, grace):
+    """Delete encrypted files no document or version points to."""
+    sweep = sweep_orphans(
+        dry_run=dry_run,
+        batch_size=batch_size,
+        workers=workers,
+        max_per_second=rate,
+        grace_seconds=grace
+    )
+
+    click.echo(f"Orphaned files found : {sweep.orphans_found}")
+    click.echo(f"Orphaned files removed: {sweep.orphans_removed}")
+    click.echo(f"Bytes reclaimed      : {sweep.bytes_reclaimed}")
+    click.echo(f"Unused blobs removed : {sweep.blobs_removed}")
+    click.echo(f"Files left on disk   : {sweep.files_total} ({sweep.bytes_total} bytes)")
+    if dry_run:
+        click.echo("Dry run: nothing was deleted.")
+
+
+@storage_cli.command("reconcile-usage")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Unsized rows stat()ed per batch.")
+def storage_reconcile_usage(batch_size):
+    """Size legacy rows and correct the per-user / global usage counters."""
+    sized, corrected = reconcile_storage_usage(batch_size)
+    click.echo(f"Rows sized        : {sized}")
+    click.echo(f"Counters corrected: {corrected}")
+
+
+@storage_cli.command("purge-uploads")
+def storage_purge_uploads():
+    """Delete resumable uploads idle for longer than UPLOAD_SESSION_TTL."""
+    purged = purge_expired_uploads()
+    click.echo(f"Expired uploads removed: {purged}")
+
+
+# =========================
+# SEARCH: BLIND INDEX BACKFILL
+# =========================
+@search_cli.command("reindex")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Documents per commit.")
+@click.option("--content", is_flag=True, help="Also re-extract file contents into the full-text index.")
+def search_reindex(batch_size, content):
+    """Rebuild the title/tags/category word index for all documents."""
+    last_id = 0
+    total = 0
+
+    # Keyset batches: each batch is committed and released from the session
+    while True:
+        batch = (
+            Document.query
+            .filter(Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        for doc in batch:
+            doc.reindex()
+
+        last_id = batch[-1].id
+        total += len(batch)
+
+        db.session.commit()
+
+        if content:
+            for doc in batch:
+                if not doc.is_deleted:
+                    index_document_content_safely(doc)
+
+        db.session.expunge_all()
+
+        click.echo(f"Indexed {total} documents...")
+
+    click.echo(f"Done. {total} documents indexed.")
+
+
+# =========================
+# FOLDERS: CLOSURE TABLE
+# =========================
+@folders_cli.command("rebuild-tree")
+def folders_rebuild_tree():
+    """Recompute the folder closure table from parent links."""
+    rows = rebuild_folder_tree()
+    click.echo(f"Done. {rows} ancestor/descendant rows.")
+
+
+# =========================
+# DASHBOARD: ROLLUP COUNTERS
+# =========================
+@dashboard_cli.command("rebuild-rollups")
+def dashboard_rebuild_rollups():
+    """Recompute the dashboard counters from the documents table."""
+    rows = rebuild_dashboard_rollups()
+    click.echo(f"Done. {rows} rollup rows.")
+
+
+# =========================
+# JOBS: RUN WITHOUT WORKER THREADS
+# =========================
+@jobs_cli.command("run")
+def jobs_run():
+    """Run queued (and stale) background jobs until the queue is empty."""
+    count = run_pending_jobs("cli")
+    click.echo(f"Done. {count} jobs run.")
+
+
+# =========================
+# SCHEMA: ADDED COLUMNS
+# =========================
+@schema_cli.command("upgrade")
+def schema_upgrade():
+    """Add model columns and indexes missing from existing tables."""
+    added = upgrade_schema()
+    for name in added:
+        click.echo(f"Added {name}")
+    click.echo(f"Done. {len(added)} schema changes.")
+
+
+# =========================
+# KEYS: RE-ENCRYPT UNDER THE PRIMARY KEY
+# =========================
+@keys_cli.command("rotate")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Documents per commit.")
+def keys_rotate(batch_size):
+    """Re-encrypt document titles, tags and categories with ENCRYPTION_KEY."""
+    if not current_app.config.get("ENCRYPTION_OLD_KEYS"):
+        click.echo("No old keys configured (SMARTDMS_OLD_ENC_KEYS): nothing to rotate.")
+        return
+
+    rotated = rotate_document_fields(batch_size)
+    click.echo(f"Done. {rotated} documents re-encrypted.")
+    click.echo("Files keep their old key; keep it in SMARTDMS_OLD_ENC_KEYS.")
+
+
+def register_commands(app: Flask) -> None:
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(folders_cli)
+    app.cli.add_command(dashboard_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(keys_cli)
@@ -35,6 +35,56 @@ class Config:
     UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, "storage", "files")
     MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # 32 MB
 
+    # Threads encrypting the files of one multi-file upload
+    UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "4"))
+
+    # Resumable uploads (/uploads): chunks are staged encrypted until the
+    # upload is finalized; idle uploads expire after the TTL.
+    UPLOAD_STAGING_FOLDER = os.path.join(PROJECT_ROOT, "storage", "staging")
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB per PUT
+    UPLOAD_MAX_SIZE = 4 * 1024 * 1024 * 1024  # 4 GB per file
+    UPLOAD_SESSION_TTL = 24 * 3600
+
+    # Files are encrypted in fixed-size AES-GCM frames (streamed, not
+    # loaded into memory). Existing files keep the frame size they were
+    # written with.
+    STORAGE_FRAME_SIZE = 1024 * 1024  # 1 MB
+
+    # Orphan file sweeper (`flask storage gc`). Interval 0 = only run
+    # from the CLI; otherwise a background thread sweeps periodically.
+    STORAGE_GC_INTERVAL = int(os.environ.get("STORAGE_GC_INTERVAL", "0"))
+    STORAGE_GC_GRACE_SECONDS = 3600
+    STORAGE_GC_RATE = None  # max files deleted per second
+
+    # Per-user / global usage counters (`flask storage reconcile-usage`).
+    # Interval 0 = only run from the CLI; otherwise a background thread
+    # sizes legacy rows and corrects counter drift periodically.
+    STORAGE_USAGE_RECONCILE_INTERVAL = int(os.environ.get("STORAGE_USAGE_RECONCILE_INTERVAL", "0"))
+
+    # ZIP downloads of folders / selections (streamed)
+    EXPORT_ZIP_COMPRESSION = 6  # zlib level for compressible files
+    EXPORT_BATCH_SIZE = 200     # document rows read per query
+
+    # ZIP import (folders + documents, as a background job). Archives
+    # over any of these limits are rejected before anything is created;
+    # single files over the member limit are skipped.
+    IMPORT_MAX_MEMBERS = 20000
+    IMPORT_MAX_MEMBER_SIZE = 512 * 1024 * 1024  # 512 MB
+    IMPORT_MAX_TOTAL_SIZE = 20 * 1024 * 1024 * 1024  # 20 GB uncompressed
+
+    # Background jobs (folder copy, ZIP import). Worker threads per process; 0 = jobs
+    # only run through `flask jobs run`. Handlers commit a checkpoint every
+    # JOB_CHECKPOINT_SIZE items or JOB_CHECKPOINT_SECONDS; a running job
+    # without one for JOB_STALE_SECONDS is requeued.
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL = 2
+    JOB_CHECKPOINT_SIZE = 100
+    JOB_CHECKPOINT_SECONDS = 30
+    JOB_STALE_SECONDS = 600
+
+    # Rows per UPDATE when a folder subtree is binned / restored
+    FOLDER_BULK_CHUNK_SIZE = 1000
+
     ALLOWED_EXTENSIONS = {
         "pdf", "doc", "docx", "xls", "xlsx",
         "ppt", "pptx", "txt",
@@ -54,12 +104,82 @@ class Config:
 
     ENCRYPTION_KEY = _raw_key.encode()
 
+    # Key rotation: previous keys (comma separated) stay valid for
+    # decryption; new data is always encrypted with ENCRYPTION_KEY.
+    ENCRYPTION_OLD_KEYS = [
+        k.strip().encode()
+        for k in os.environ.get("SMARTDMS_OLD_ENC_KEYS", "").split(",")
+        if k.strip()
+    ]
+
+    # Keys the HMACs that are stored and matched later: the search word
+    # index (titles, tags, file contents) and blob dedup hashes. Not
+    # rotated with ENCRYPTION_KEY, or every stored hash stops matching.
+    # Unset = ENCRYPTION_KEY; set it to that key before the first rotation.
+    SEARCH_INDEX_KEY = os.environ.get("SMARTDMS_INDEX_KEY", "").encode() or None
+
     # -------------------------------------------------
     # FEATURES
     # -------------------------------------------------
     ENABLE_NOTIFICATIONS = True
+
+    # Same unread message to the same user within this many seconds is
+    # merged into one notification with a counter (0 = never merge)
+    NOTIFICATION_COALESCE_SECONDS = 600
+
+    # Per-user unread count + bell items, cached in-process
+    NOTIFICATION_CACHE_TTL = 30  # seconds
+    NOTIFICATION_CACHE_SIZE = 4096  # users
+
+    # The bell polls /notifications/unread every POLL_SECONDS, unless the
+    # live stream is enabled. /notifications/stream (SSE) holds one worker
+    # per open tab for up to MAX_SECONDS: only enable it with gthread /
+    # gevent workers and a worker timeout above MAX_SECONDS (deployment.md).
+    NOTIFICATION_POLL_SECONDS = 60
+    NOTIFICATION_STREAM_ENABLED = os.environ.get("NOTIFICATION_STREAM", "0") == "1"
+    NOTIFICATION_STREAM_HEARTBEAT = 15
+    NOTIFICATION_STREAM_MAX_SECONDS = 300
     ENABLE_WORKFLOW = True
 
+    # Extract text from uploads (pdf/docx/xlsx/pptx/txt) into the
+    # encrypted full-text index used by /api/search
+    CONTENT_INDEX_ENABLED = True
+    # Larger files are stored but not content-indexed (0 = no limit)
+    CONTENT_INDEX_MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
+
+    # -------------------------------------------------
+    # ACTIVITY LOG (audit trail)
+    # -------------------------------------------------
+    # "request": one multi-row INSERT per request, at teardown.
+    # "background": rows go to a writer thread through a bounded queue;
+    # when it is full, a request waits PUT_TIMEOUT seconds and the row
+    # is then dropped (counted on the security page).
+    ACTIVITY_LOG_MODE = os.environ.get("ACTIVITY_LOG_MODE", "request")
+    ACTIVITY_LOG_QUEUE_SIZE = 10000
+    ACTIVITY_LOG_BATCH_SIZE = 500
+    ACTIVITY_LOG_PUT_TIMEOUT = 0.1
+
+    # -------------------------------------------------
+    # DASHBOARD
+    # -------------------------------------------------
+    # "rollups": precomputed dashboard_rollups counters (default)
+    # "live": one aggregate query over the visible documents per load
+    DASHBOARD_STATS_SOURCE = os.environ.get("DASHBOARD_STATS_SOURCE", "rollups")
+
+    # Widget cache, keyed by each user's data version (bumped on every
+    # document / folder change). The activity widget is not versioned
+    # and only lives ACTIVITY_TTL seconds.
+    DASHBOARD_CACHE_TTL = 300  # seconds
+    DASHBOARD_CACHE_SIZE = 4096  # entries
+    DASHBOARD_ACTIVITY_TTL = 15
+    DASHBOARD_REFRESH_SECONDS = 60  # widget auto-refresh in the browser
+
+    # -------------------------------------------------
+    # PAGINATION (keyset, ?cursor=&per_page=)
+    # -------------------------------------------------
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
     # -------------------------------------------------
     # SESSION / AUTH
     # -------------------------------------------------
@@ -1,15 +1,23 @@
 from .user import User
 from .folder import Folder
+from .folder_tree import FolderClosure
 from .document import Document, DocumentVersion
 from .comment import DocumentComment
 from .share import DocumentShare
 from .activity import ActivityLog
 from .notification import Notification
 from .favorite import DocumentFavorite, FolderFavorite
+from .blob import StoredBlob
+from .sweep import StorageSweep
+from .search import DocumentSearchToken, DocumentContentTerm, DocumentContentStats
+from .dashboard import DashboardRollup
+from .upload import UploadSession
+from .job import Job
 
 __all__ = [
     "User",
     "Folder",
+    "FolderClosure",
     "Document",
     "DocumentVersion",
     "DocumentComment",
@@ -18,4 +26,12 @@ __all__ = [
     "Notification",
     "DocumentFavorite",
     "FolderFavorite",
+    "StoredBlob",
+    "StorageSweep",
+    "DocumentSearchToken",
+    "DocumentContentTerm",
+    "DocumentContentStats",
+    "DashboardRollup",
+    "UploadSession",
+    "Job",
 ]
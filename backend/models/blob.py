@@ -0,0 +1,53 @@
+from datetime import datetime
+from ..extensions import db
+
+
+# ======================
+# STORED BLOB (CONTENT-ADDRESSED)
+# ======================
+class StoredBlob(db.Model):
+    """
+    One encrypted file on disk, shared by every Document /
+    DocumentVersion row whose content is identical.
+    """
+    __tablename__ = "stored_blobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # 🔐 Keyed hash (HMAC-SHA256) of the plaintext, not a plain digest,
+    # so equal files can't be confirmed from the DB alone
+    content_hash = db.Column(
+        db.String(64),
+        nullable=False,
+        unique=True,
+        index=True
+    )
+
+    stored_name = db.Column(db.String(255), nullable=False)
+    filepath = db.Column(db.String(500), nullable=False)
+
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+
+    # Number of documents / document_versions rows pointing here
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    # Last time an upload / import reused this content. The GC leaves
+    # blobs created or reused within STORAGE_GC_GRACE_SECONDS alone:
+    # the rows that will reference them may not be committed yet.
+    last_used_at = db.Column(
+        db.DateTime,
+        nullable=True,
+        default=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return (
+            f"<StoredBlob id={self.id} "
+            f"refs={self.ref_count}>"
+        )
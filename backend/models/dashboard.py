@@ -0,0 +1,31 @@
+from ..extensions import db
+
+
+class DashboardRollup(db.Model):
+    """
+    Precomputed dashboard counters over non-deleted documents.
+
+    user_id 0 holds the global figures (admin view); any other user_id
+    counts what that user can see (own uploads + shared with them).
+
+    metric / bucket:
+        total, active, archived  -> bucket ""
+        uploads                  -> bucket "YYYY-MM-DD" (created_at day)
+        type                     -> bucket normalized file_type
+        files, bytes             -> bucket "" (storage usage: own
+                                    uploads only, not shares)
+    """
+    __tablename__ = "dashboard_rollups"
+
+    # No FK: 0 is the global scope, not a user
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    metric = db.Column(db.String(16), primary_key=True)
+    bucket = db.Column(db.String(32), primary_key=True, default="")
+
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<DashboardRollup user={self.user_id} "
+            f"{self.metric}[{self.bucket}]={self.value}>"
+        )
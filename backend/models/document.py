@@ -1,6 +1,13 @@
 from datetime import datetime
+from sqlalchemy import event
 from ..extensions import db
 from ..services.encryption_service import EncryptionService
+from ..services.blind_index import INDEXED_FIELDS, blind_tokens
+from .search import DocumentSearchToken
+
+
+# Decrypted-field cache counters (for profiling, see Document.decrypt_cache_stats)
+_DECRYPT_CACHE_STATS = {"hits": 0, "misses": 0}
 
 
 # ======================
@@ -21,6 +28,20 @@ class Document(db.Model):
     filepath = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(20), nullable=True)
 
+    # Shared encrypted content (NULL for files stored before dedup)
+    blob_id = db.Column(
+        db.Integer,
+        db.ForeignKey("stored_blobs.id", ondelete="RESTRICT"),
+        nullable=True,
+        index=True
+    )
+
+    # Plaintext size of the current content, recorded at write time
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+
+    # Legacy file already sized by the usage reconciler (even if missing/empty)
+    size_checked = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
     version = db.Column(db.Integer, nullable=False, default=1)
 
     is_active = db.Column(db.Boolean, default=True)
@@ -84,6 +105,12 @@ class Document(db.Model):
     expiry_date = db.Column(db.Date, nullable=True)
     download_count = db.Column(db.Integer, default=0)
 
+    # Keyset pagination walks (created_at, id) newest first
+    __table_args__ = (
+        db.Index("ix_documents_created_id", "created_at", "id"),
+        db.Index("ix_documents_uploader_created_id", "uploaded_by", "created_at", "id"),
+    )
+
     # ======================
     # RELATIONSHIPS
     # ======================
@@ -113,33 +140,108 @@ class Document(db.Model):
         lazy="select"
     )
 
+    search_tokens = db.relationship(
+        "DocumentSearchToken",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="select"
+    )
+
     # ======================
     # 🔐 TRANSPARENT ENCRYPTION
     # ======================
+    # Decrypted values are memoized on the instance as
+    # {column: (ciphertext, plaintext)}. A row lives in the session for
+    # one request, so each column is decrypted at most once per request.
+    # The cache is dropped on expire/refresh, and an entry is only used
+    # while the stored ciphertext is still the one it was built from.
+
+    def _decrypted(self, column: str):
+        cache = self.__dict__.get("_plain_cache")
+        if cache is None:
+            cache = self.__dict__["_plain_cache"] = {}
+
+        encrypted = getattr(self, column)
+        entry = cache.get(column)
+
+        if entry is not None and entry[0] is encrypted:
+            _DECRYPT_CACHE_STATS["hits"] += 1
+            return entry[1]
+
+        _DECRYPT_CACHE_STATS["misses"] += 1
+        value = EncryptionService.decrypt_text(encrypted)
+        cache[column] = (encrypted, value)
+        return value
+
+    def _encrypt_into(self, column: str, value):
+        # Keep the blind index in step with the ciphertext. First: on an
+        # expired row it loads the row, and that refresh drops the memo
+        self._index_field(column.lstrip("_"), value)
+
+        encrypted = EncryptionService.encrypt_text(value)
+        setattr(self, column, encrypted)
+
+        cache = self.__dict__.setdefault("_plain_cache", {})
+        cache[column] = (encrypted, str(value) if value else value)
+
+    def _index_field(self, field: str, value):
+        wanted = set(blind_tokens(value))
+
+        # Unchanged words keep their row (no delete + re-insert of the
+        # same unique key within one flush)
+        kept = []
+        for token in self.search_tokens:
+            if token.field != field:
+                kept.append(token)
+            elif token.token_hash in wanted:
+                kept.append(token)
+                wanted.discard(token.token_hash)
+
+        self.search_tokens = kept + [
+            DocumentSearchToken(field=field, token_hash=h)
+            for h in sorted(wanted)
+        ]
+
+    def reindex(self):
+        """ Rebuild all blind-index tokens (backfill / repair) """
+        for field in INDEXED_FIELDS:
+            self._index_field(field, getattr(self, field))
+
+    def _clear_decrypted(self):
+        self.__dict__.pop("_plain_cache", None)
+
+    @staticmethod
+    def decrypt_cache_stats(reset: bool = False) -> dict:
+        """ Process-wide hit/miss counters of the decrypted-field cache """
+        stats = dict(_DECRYPT_CACHE_STATS)
+        if reset:
+            _DECRYPT_CACHE_STATS["hits"] = _DECRYPT_CACHE_STATS["misses"] = 0
+        return stats
 
     @property
     def title(self):
-        return EncryptionService.decrypt_text(self._title)
+        return self._decrypted("_title")
 
     @title.setter
     def title(self, value):
-        self._title = EncryptionService.encrypt_text(value)
+        self._encrypt_into("_title", value)
 
     @property
     def tags(self):
-        return EncryptionService.decrypt_text(self._tags)
+        return self._decrypted("_tags")
 
     @tags.setter
     def tags(self, value):
-        self._tags = EncryptionService.encrypt_text(value)
+        self._encrypt_into("_tags", value)
 
     @property
     def category(self):
-        return EncryptionService.decrypt_text(self._category)
+        return self._decrypted("_category")
 
     @category.setter
     def category(self, value):
-        self._category = EncryptionService.encrypt_text(value)
+        self._encrypt_into("_category", value)
 
     # ======================
     # SAFE REPR (🔥 FIX)
@@ -151,6 +253,18 @@ class Document(db.Model):
         )
 
 
+@event.listens_for(Document, "expire")
+def _document_expired(target, attrs):
+    # expire_all() also visits states whose object was already collected
+    if target is not None:
+        target._clear_decrypted()
+
+
+@event.listens_for(Document, "refresh")
+def _document_refreshed(target, context, attrs):
+    target._clear_decrypted()
+
+
 # ======================
 # DOCUMENT VERSION
 # ======================
@@ -171,6 +285,16 @@ class DocumentVersion(db.Model):
     stored_name = db.Column(db.String(255), nullable=False)
     filepath = db.Column(db.String(500), nullable=False)
 
+    blob_id = db.Column(
+        db.Integer,
+        db.ForeignKey("stored_blobs.id", ondelete="RESTRICT"),
+        nullable=True,
+        index=True
+    )
+
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    size_checked = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
     created_at = db.Column(
         db.DateTime,
         nullable=False,
@@ -1,5 +1,7 @@
 from datetime import datetime
+from sqlalchemy import event, inspect, select
 from ..extensions import db
+from .folder_tree import FolderClosure, insert_node, move_subtree, remove_nodes
 
 
 class Folder(db.Model):
@@ -81,16 +83,45 @@ class Folder(db.Model):
     def is_root(self) -> bool:
         return self.parent_id is None
 
+    def subtree_ids(self, include_self: bool = True):
+        """
+        SELECT of the ids in this folder's subtree (closure table lookup,
+        one query at any depth). Usable directly inside IN (...).
+        """
+        query = select(FolderClosure.descendant_id).where(
+            FolderClosure.ancestor_id == self.id
+        )
+        if not include_self:
+            query = query.where(FolderClosure.depth > 0)
+        return query
+
     def all_descendants(self):
         """
-        Return all subfolders recursively.
+        Return all subfolders (any depth), parents before children.
         Used for move / copy validation.
         """
-        result = []
-        for child in self.children:
-            result.append(child)
-            result.extend(child.all_descendants())
-        return result
+        return (
+            Folder.query
+            .join(FolderClosure, FolderClosure.descendant_id == Folder.id)
+            .filter(
+                FolderClosure.ancestor_id == self.id,
+                FolderClosure.depth > 0
+            )
+            .order_by(FolderClosure.depth, Folder.id)
+            .all()
+        )
+
+    def is_ancestor_of(self, other_id: int) -> bool:
+        """ True if folder other_id sits anywhere below this folder """
+        return db.session.query(
+            select(FolderClosure.ancestor_id)
+            .where(
+                FolderClosure.ancestor_id == self.id,
+                FolderClosure.descendant_id == other_id,
+                FolderClosure.depth > 0
+            )
+            .exists()
+        ).scalar()
 
     def __repr__(self):
         return (
@@ -100,3 +131,23 @@ class Folder(db.Model):
             f"deleted={self.is_deleted} "
             f"parent_id={self.parent_id}>"
         )
+
+
+# ======================
+# CLOSURE TABLE SYNC
+# ======================
+@event.listens_for(Folder, "after_insert")
+def _folder_inserted(mapper, connection, target):
+    insert_node(connection, target.id, target.parent_id)
+
+
+@event.listens_for(Folder, "after_update")
+def _folder_updated(mapper, connection, target):
+    history = inspect(target).attrs.parent_id.history
+    if history.has_changes():
+        move_subtree(connection, target.id, target.parent_id)
+
+
+@event.listens_for(Folder, "after_delete")
+def _folder_deleted(mapper, connection, target):
+    remove_nodes(connection, [target.id])
@@ -0,0 +1,117 @@
+from sqlalchemy import and_, delete, insert, literal, select, true
+from ..extensions import db
+
+
+class FolderClosure(db.Model):
+    """
+    Closure table of the folder hierarchy: one row per (ancestor,
+    descendant) pair, including depth 0 (folder → itself).
+    Subtree and ancestor lookups are one indexed query at any depth.
+    Kept in sync by the Folder mapper events (see models/folder.py).
+    """
+    __tablename__ = "folder_closure"
+
+    ancestor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("folders.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    descendant_id = db.Column(
+        db.Integer,
+        db.ForeignKey("folders.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    depth = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_folder_closure_descendant", "descendant_id", "depth"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<FolderClosure ancestor={self.ancestor_id} "
+            f"descendant={self.descendant_id} depth={self.depth}>"
+        )
+
+
+# ======================
+# SYNC HELPERS (connection level, usable inside flush events)
+# ======================
+_closure = FolderClosure.__table__
+
+
+def insert_node(connection, folder_id: int, parent_id) -> None:
+    """ New leaf: self row + one row per ancestor of the parent """
+    connection.execute(
+        insert(_closure).values(ancestor_id=folder_id, descendant_id=folder_id, depth=0)
+    )
+
+    if parent_id is None:
+        return
+
+    connection.execute(
+        insert(_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                _closure.c.ancestor_id,
+                literal(folder_id),
+                _closure.c.depth + 1
+            ).where(_closure.c.descendant_id == parent_id)
+        )
+    )
+
+
+def move_subtree(connection, folder_id: int, new_parent_id) -> None:
+    """
+    Re-hang the subtree of folder_id under new_parent_id: drop the links
+    to its old ancestors, then link every new ancestor to every node.
+    """
+    subtree = connection.execute(
+        select(_closure.c.descendant_id).where(_closure.c.ancestor_id == folder_id)
+    ).scalars().all()
+
+    # IDs are materialized first: MySQL can't DELETE from a table it
+    # also reads in a subquery
+    connection.execute(
+        delete(_closure).where(
+            _closure.c.descendant_id.in_(subtree),
+            _closure.c.ancestor_id.notin_(subtree)
+        )
+    )
+
+    if new_parent_id is None:
+        return
+
+    above = _closure.alias("above")
+    below = _closure.alias("below")
+
+    connection.execute(
+        insert(_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                above.c.ancestor_id,
+                below.c.descendant_id,
+                above.c.depth + below.c.depth + 1
+            )
+            .select_from(above.join(below, true()))
+            .where(and_(
+                above.c.descendant_id == new_parent_id,
+                below.c.ancestor_id == folder_id
+            ))
+        )
+    )
+
+
+def remove_nodes(connection, folder_ids) -> None:
+    """
+    Drop closure rows of deleted folders. MySQL's FK cascade does this
+    too; doing it here also covers bulk deletes on other backends.
+    """
+    if not folder_ids:
+        return
+
+    connection.execute(
+        delete(_closure).where(_closure.c.descendant_id.in_(folder_ids))
+    )
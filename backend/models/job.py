@@ -0,0 +1,55 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class Job(db.Model):
+    """
+    A background job (e.g. folder copy), run by the job workers.
+
+    status: queued -> running -> done | failed | cancelled
+
+    Handlers commit their work in checkpoints together with `progress_done`
+    and `checkpoint` (JSON resume state), so a job interrupted by a
+    restart is requeued and carries on from its last checkpoint.
+    """
+    __tablename__ = "jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="queued", index=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    checkpoint = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Bumped at every checkpoint; a running job without one for
+    # JOB_STALE_SECONDS lost its worker and is requeued
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<Job id={self.id} {self.kind} "
+            f"{self.status} {self.progress_done}/{self.progress_total}>"
+        )
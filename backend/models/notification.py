@@ -23,6 +23,14 @@ class Notification(db.Model):
         nullable=False
     )
 
+    # how many times this message was sent within the coalesce window
+    # (see notification_service.notify_many)
+    repeat_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1
+    )
+
     # read / unread
     is_read = db.Column(
         db.Boolean,
@@ -38,6 +46,11 @@ class Notification(db.Model):
         default=lambda: datetime.now(IST)
     )
 
+    # bell / coalescing lookups: unread rows of a user, newest first
+    __table_args__ = (
+        db.Index("ix_notifications_user_unread", "user_id", "is_read", "created_at"),
+    )
+
     # relationship
     user = db.relationship(
         "User",
@@ -56,6 +69,7 @@ class Notification(db.Model):
         return {
             "id": self.id,
             "message": self.message,
+            "count": self.repeat_count,
             "is_read": self.is_read,
             "created_at": self.created_at.strftime("%Y-%m-%d %H:%M")
         }
@@ -0,0 +1,106 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class DocumentSearchToken(db.Model):
+    """
+    Blind index for encrypted Document columns: one row per
+    (document, field, word), storing only an HMAC of the word.
+    """
+    __tablename__ = "document_search_tokens"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    document_id = db.Column(
+        db.Integer,
+        db.ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # title / tags / category
+    field = db.Column(db.String(20), nullable=False)
+
+    token_hash = db.Column(db.String(32), nullable=False)
+
+    document = db.relationship(
+        "Document",
+        back_populates="search_tokens",
+        lazy="select"
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "document_id",
+            "field",
+            "token_hash",
+            name="uq_document_field_token"
+        ),
+        db.Index("ix_search_token_lookup", "token_hash", "field", "document_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<DocumentSearchToken doc_id={self.document_id} "
+            f"field={self.field}>"
+        )
+
+
+class DocumentContentTerm(db.Model):
+    """
+    Full-text inverted index over document bodies: one posting per
+    (term, document) with its term frequency. Terms are stored as the
+    same keyed hash as DocumentSearchToken, never as plain words.
+    """
+    __tablename__ = "document_content_terms"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    term_hash = db.Column(db.String(32), nullable=False)
+
+    document_id = db.Column(
+        db.Integer,
+        db.ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    term_freq = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        db.Index("ix_content_term_lookup", "term_hash", "document_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<DocumentContentTerm doc_id={self.document_id} "
+            f"tf={self.term_freq}>"
+        )
+
+
+class DocumentContentStats(db.Model):
+    """
+    Per-document length (in words) for BM25 length normalisation.
+    A row exists for every document whose content was indexed.
+    """
+    __tablename__ = "document_content_stats"
+
+    document_id = db.Column(
+        db.Integer,
+        db.ForeignKey("documents.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    length = db.Column(db.Integer, nullable=False, default=0)
+
+    indexed_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return (
+            f"<DocumentContentStats doc_id={self.document_id} "
+            f"length={self.length}>"
+        )
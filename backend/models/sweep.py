@@ -0,0 +1,39 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class StorageSweep(db.Model):
+    """
+    Result of one orphan-file sweep over UPLOAD_FOLDER.
+    The latest row also provides the storage page's system totals.
+    """
+    __tablename__ = "storage_sweeps"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)
+
+    # files left on disk after the sweep
+    files_total = db.Column(db.Integer, nullable=False, default=0)
+    bytes_total = db.Column(db.BigInteger, nullable=False, default=0)
+
+    orphans_found = db.Column(db.Integer, nullable=False, default=0)
+    orphans_removed = db.Column(db.Integer, nullable=False, default=0)
+    bytes_reclaimed = db.Column(db.BigInteger, nullable=False, default=0)
+    blobs_removed = db.Column(db.Integer, nullable=False, default=0)
+
+    started_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<StorageSweep id={self.id} "
+            f"orphans={self.orphans_found} "
+            f"removed={self.orphans_removed} "
+            f"dry_run={self.dry_run}>"
+        )
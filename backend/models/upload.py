@@ -0,0 +1,57 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class UploadSession(db.Model):
+    """
+    A resumable (chunked) upload in progress.
+
+    Chunks are staged encrypted under UPLOAD_STAGING_FOLDER/<id>/ until
+    the upload is finalized into a new document, or a new version of
+    `document_id`. `received` is the next offset the server expects.
+    """
+    __tablename__ = "upload_sessions"
+
+    # Random hex token, also the staging directory name
+    id = db.Column(db.String(32), primary_key=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+
+    # Target: a folder for a new document, or a document for a new version
+    folder_id = db.Column(
+        db.Integer,
+        db.ForeignKey("folders.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    document_id = db.Column(
+        db.Integer,
+        db.ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=True
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        index=True
+    )
+
+    def __repr__(self):
+        return (
+            f"<UploadSession id={self.id} "
+            f"{self.received}/{self.total_size}>"
+        )
@@ -1,26 +1,178 @@
-from flask import Blueprint, jsonify, request
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request
 from flask_login import login_required, current_user
-from ..models import Document
+from sqlalchemy import func
+
+from ..models import Document, User
 from ..extensions import db
+from ..services.dashboard_service import GLOBAL_SCOPE, data_version
+from ..services.document_service import (
+    DOCUMENT_FIELDS, document_load_options, document_to_dict,
+    visible_documents_query
+)
+from ..services.content_index_service import search_content
+from ..services.pagination import request_page
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
+# =========================
+# DOCUMENT LISTING
+# =========================
+def _parse_date(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO date or datetime")
+
+
+def _filtered_documents():
+    """
+    Visible documents narrowed by ?folder= (id or 'root'), ?status=,
+    ?file_type=, ?created_after= and ?created_before=.
+    Raises ValueError on malformed parameters.
+    """
+    query = visible_documents_query(current_user)
+
+    folder = request.args.get("folder")
+    if folder == "root":
+        query = query.filter(Document.folder_id.is_(None))
+    elif folder:
+        if not folder.isdigit():
+            raise ValueError("'folder' must be a folder id or 'root'")
+        query = query.filter(Document.folder_id == int(folder))
+
+    status = request.args.get("status")
+    if status == "archived":
+        query = query.filter(Document.is_active.is_(False))
+    elif status == "active":
+        query = query.filter(Document.is_active.is_(True))
+    elif status:
+        query = query.filter(Document.status == status)
+
+    file_type = request.args.get("file_type")
+    if file_type:
+        query = query.filter(Document.file_type == file_type.lower())
+
+    created_after = _parse_date("created_after")
+    if created_after:
+        query = query.filter(Document.created_at >= created_after)
+
+    created_before = _parse_date("created_before")
+    if created_before:
+        query = query.filter(Document.created_at < created_before)
+
+    return query
+
+
+def _requested_fields():
+    raw = request.args.get("fields")
+    if not raw:
+        return DOCUMENT_FIELDS
+
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in DOCUMENT_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or raw}")
+    return fields
+
+
+def _listing_etag(query, fields) -> str:
+    """
+    Weak validator for a listing: changes when a matching row is added,
+    removed or updated, when the viewer's shares change (their dashboard
+    data version) and, if requested, when an uploader is renamed.
+    A few aggregate queries, no document rows loaded.
+    """
+    count, last_update, max_id = query.with_entities(
+        func.count(Document.id),
+        func.max(Document.updated_at),
+        func.max(Document.id)
+    ).order_by(None).one()
+
+    scope = GLOBAL_SCOPE if current_user.is_admin else int(current_user.id)
+    parts = [
+        current_user.id, request.query_string.decode(),
+        count, last_update, max_id, data_version(scope)
+    ]
+
+    if "uploader" in fields:
+        parts.extend(
+            db.session.query(User.id, User.username)
+            .filter(User.id.in_(query.with_entities(Document.uploaded_by).order_by(None)))
+            .order_by(User.id)
+            .all()
+        )
+
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return digest[:32]
+
+
 @api_bp.route("/documents")
 @login_required
 def api_documents():
-    docs = Document.query.limit(50).all()
-    data = [
-        {
-            "id": d.id,
-            "title": d.title,
-            "category": d.category,
-            "file_type": d.file_type,
-            "version": d.version,
-            "status": d.status,
-            "is_active": d.is_active,
-            "uploaded_by": d.uploader.username if d.uploader else None,
-            "created_at": d.created_at.isoformat(),
-        }
-        for d in docs
-    ]
-    return jsonify(data)
+    try:
+        fields = _requested_fields()
+        query = _filtered_documents()
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    # Polling clients: nothing changed → 304 before any row is loaded
+    etag = _listing_etag(query, fields)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        page = request_page(
+            query.options(*document_load_options(fields)),
+            Document.created_at,
+            Document.id
+        )
+        response = jsonify(
+            success=True,
+            documents=[document_to_dict(d, fields) for d in page.items],
+            next_cursor=page.next_cursor
+        )
+
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+# =========================
+# FULL-TEXT CONTENT SEARCH
+# =========================
+@api_bp.route("/search")
+@login_required
+def api_search():
+    query_text = (request.args.get("q") or "").strip()
+    limit = min(request.args.get("limit", 20, type=int) or 20, 100)
+
+    if not query_text:
+        return jsonify(success=False, error="Query parameter 'q' is required"), 400
+
+    results = search_content(
+        visible_documents_query(current_user),
+        query_text,
+        limit=limit
+    )
+
+    return jsonify(
+        success=True,
+        query=query_text,
+        results=[
+            {
+                "id": d.id,
+                "title": d.title,
+                "file_type": d.file_type,
+                "folder_id": d.folder_id,
+                "score": round(score, 4),
+                "created_at": d.created_at.isoformat(),
+            }
+            for d, score in results
+        ]
+    )
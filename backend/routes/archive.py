@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
 from flask_login import login_required
 from ..models import Document
+from ..services.document_service import document_to_dict
+from ..services.pagination import request_page, pager_links, wants_json
 
 archive_bp = Blueprint("archive", __name__, url_prefix="/archive")
 
@@ -8,14 +10,21 @@ archive_bp = Blueprint("archive", __name__, url_prefix="/archive")
 @archive_bp.route("/")
 @login_required
 def index():
-    documents = (
-        Document.query
-        .filter_by(is_active=False)
-        .order_by(Document.updated_at.desc())
-        .all()
+    page = request_page(
+        Document.query.filter_by(is_active=False),
+        Document.created_at,
+        Document.id
     )
 
+    if wants_json():
+        return jsonify(
+            success=True,
+            documents=[document_to_dict(d) for d in page.items],
+            next_cursor=page.next_cursor
+        )
+
     return render_template(
         "archive/index.html",
-        documents=documents
+        documents=page.items,
+        pager=pager_links(page)
     )
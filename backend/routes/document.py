@@ -1,12 +1,13 @@
 # backend/routes/documents.py
 
-from io import BytesIO
-from werkzeug.datastructures import FileStorage
+import mimetypes
 from datetime import datetime
 from flask import (
     Blueprint, render_template, redirect,
-    url_for, flash, request, send_file, abort, jsonify
+    url_for, flash, request, abort, jsonify,
+    Response, stream_with_context
 )
+from werkzeug.datastructures import ContentRange
 from flask_login import login_required, current_user
 from sqlalchemy import or_
 
@@ -21,13 +22,19 @@ from ..forms import (
 )
 
 from ..services.document_service import (
-    create_document, update_document_file,
+    ingest_uploads, update_document_file,
     soft_archive, restore, increment_download,
+    copy_document_row, apply_search, visible_documents_query,
+    document_to_dict,
     InvalidFileTypeError  # 🔥 IMPORT
 )
+from ..services.blob_service import release_document_blobs
+from ..services.export_service import export_response
+from ..services.import_service import ArchiveError, import_archive
+from ..services.pagination import request_page, pager_links, wants_json
 from ..services.activity_service import log_activity
 from ..services.notification_service import notify_user
-from ..services.storage_service import decrypt_file, save_encrypted_file
+from ..services.storage_service import iter_decrypted_file, plaintext_size
 
 document_bp = Blueprint("document", __name__, url_prefix="/documents")
 
@@ -46,6 +53,86 @@ def _user_can_view(doc: Document) -> bool:
     ).first() is not None
 
 
+def _stream_file(doc: Document, mimetype: str, as_attachment: bool = False) -> Response:
+    """
+    Stream a decrypted document frame by frame.
+    Only one frame is held in memory, whatever the file size.
+
+    Single byte ranges (Range / If-Range) are answered with 206 and only
+    the frames covering the requested span are decrypted.
+    """
+    try:
+        size = plaintext_size(doc.filepath)
+    except OSError:
+        abort(404)
+
+    # stored_name is unique per stored file, so it is a strong validator
+    etag = doc.stored_name
+    start, stop = 0, None
+    status = 200
+
+    byte_range = request.range
+    if (
+        size is not None
+        and byte_range is not None
+        and len(byte_range.ranges) == 1
+        and _if_range_matches(etag, doc)
+    ):
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response = Response(status=416)
+            response.content_range = ContentRange("bytes", None, None, size)
+            return response
+
+        start, stop = span
+        status = 206
+
+    try:
+        chunks = iter_decrypted_file(doc.filepath, start, stop)
+    except RuntimeError:
+        abort(404)
+
+    response = Response(
+        stream_with_context(chunks),
+        status=status,
+        mimetype=mimetype,
+        direct_passthrough=True
+    )
+    response.set_etag(etag)
+    response.last_modified = doc.updated_at
+
+    if size is not None:
+        response.accept_ranges = "bytes"
+        if status == 206:
+            response.content_range = ContentRange("bytes", start, stop, size)
+            response.content_length = stop - start
+        else:
+            response.content_length = size
+
+    if as_attachment:
+        response.headers.set(
+            "Content-Disposition", "attachment", filename=doc.filename
+        )
+
+    return response
+
+
+def _if_range_matches(etag: str, doc: Document) -> bool:
+    """
+    If-Range: serve the range only when the client's copy is current,
+    otherwise the whole file is sent.
+    """
+    if_range = request.if_range
+
+    if if_range.etag is not None:
+        return if_range.etag == etag
+
+    if if_range.date is not None and doc.updated_at:
+        return doc.updated_at.replace(microsecond=0) <= if_range.date.replace(tzinfo=None)
+
+    return True
+
+
 def _user_owns_folder(folder_id):
     if not folder_id:
         return True
@@ -82,21 +169,14 @@ def list_documents():
     else:
         folder_query = folder_query.filter(Folder.parent_id.is_(None))
 
-    folders = folder_query.order_by(Folder.created_at.asc()).all()
+    # Folders are listed above the documents, on the first page only
+    if request.args.get("cursor"):
+        folders = []
+    else:
+        folders = folder_query.order_by(Folder.created_at.asc()).all()
 
     # 2. Query Documents
-    doc_query = Document.query.filter(Document.is_deleted.is_(False))
-
-    if not current_user.is_admin:
-        doc_query = doc_query.filter(
-            or_(
-                Document.uploaded_by == current_user_id,
-                Document.id.in_(
-                    db.session.query(DocumentShare.document_id)
-                    .filter(DocumentShare.shared_with_id == current_user_id)
-                )
-            )
-        )
+    doc_query = visible_documents_query(current_user)
 
     if active_folder:
         doc_query = doc_query.filter(Document.folder_id == active_folder.id)
@@ -104,10 +184,8 @@ def list_documents():
         doc_query = doc_query.filter(Document.folder_id.is_(None))
 
     if form.search.data:
-        like = f"%{form.search.data.strip()}%"
-        doc_query = doc_query.filter(
-            or_(Document.title.ilike(like), Document.tags.ilike(like))
-        )
+        # whole-word match on encrypted title/tags via the blind index
+        doc_query = apply_search(doc_query, form.search.data)
 
     status = form.status.data or "active"
     if status == "archived":
@@ -115,7 +193,24 @@ def list_documents():
     else:
         doc_query = doc_query.filter(Document.is_active.is_(True))
 
-    documents = doc_query.order_by(Document.created_at.desc()).all()
+    page = request_page(doc_query, Document.created_at, Document.id)
+    documents = page.items
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            folders=[
+                {
+                    "id": f.id,
+                    "name": f.name,
+                    "parent_id": f.parent_id,
+                    "created_at": f.created_at.isoformat()
+                }
+                for f in folders
+            ],
+            documents=[document_to_dict(d) for d in documents],
+            next_cursor=page.next_cursor
+        )
 
     items = (
         [{"type": "folder", "obj": f} for f in folders] +
@@ -126,7 +221,8 @@ def list_documents():
         "documents/list.html",
         items=items,
         active_folder=active_folder,
-        form=form
+        form=form,
+        pager=pager_links(page)
     )
 
 
@@ -167,13 +263,24 @@ def create_folder():
 @document_bp.route("/my")
 @login_required
 def my_documents():
-    documents = (
-        Document.query
-        .filter_by(uploaded_by=int(current_user.id))
-        .order_by(Document.created_at.desc())
-        .all()
+    page = request_page(
+        Document.query.filter_by(uploaded_by=int(current_user.id)),
+        Document.created_at,
+        Document.id
+    )
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            documents=[document_to_dict(d) for d in page.items],
+            next_cursor=page.next_cursor
+        )
+
+    return render_template(
+        "documents/my_documents.html",
+        documents=page.items,
+        pager=pager_links(page)
     )
-    return render_template("documents/my_documents.html", documents=documents)
 
 
 # =========================
@@ -198,30 +305,43 @@ def upload():
             flash("Title and file required.", "danger")
             return redirect(request.url)
 
-        try:
-            for i, file in enumerate(files):
-                if not file or file.filename == "":
-                    continue
-
-                doc_title = title if i == 0 else f"{title} ({i + 1})"
-                create_document(
-                    user=current_user,
-                    title=doc_title,
-                    tags=tags,
-                    file_storage=file,
-                    folder_id=folder_id,
-                    status="uploaded"
-                )
-
-        except InvalidFileTypeError as e:
-            flash(str(e), "danger")
-            return redirect(request.url)
-
-        except Exception:
-            flash("Unexpected error while uploading file.", "danger")
+        results = ingest_uploads(
+            user=current_user,
+            title=title,
+            tags=tags,
+            files=files,
+            folder_id=folder_id,
+            status="uploaded"
+        )
+        uploaded = [r for r in results if r.ok]
+
+        if wants_json():
+            return jsonify(
+                success=bool(uploaded),
+                results=[
+                    {
+                        "filename": r.filename,
+                        "document_id": r.document.id if r.ok else None,
+                        "error": r.error
+                    }
+                    for r in results
+                ]
+            ), 200 if uploaded else 400
+
+        for r in results:
+            if not r.ok:
+                flash(f"{r.filename}: {r.error}", "danger")
+
+        if not uploaded:
+            if not results:
+                flash("Title and file required.", "danger")
             return redirect(request.url)
 
-        flash("Documents uploaded successfully.", "success")
+        flash(
+            "Documents uploaded successfully." if len(uploaded) == len(results)
+            else f"{len(uploaded)} of {len(results)} documents uploaded.",
+            "success"
+        )
         return redirect(
             url_for("document.list_documents", folder=folder_id)
             if folder_id else url_for("document.list_documents")
@@ -234,6 +354,47 @@ def upload():
     )
 
 
+# =========================
+# IMPORT ZIP (FOLDERS + DOCUMENTS)
+# =========================
+@document_bp.route("/import", methods=["POST"])
+@login_required
+def import_zip():
+    """
+    Recreate a .zip's folders and files as folders and documents, in
+    the background. Archives above the request size limit go through
+    /uploads and /uploads/<id>/import instead.
+    """
+    folder_id = request.form.get("folder_id", type=int)
+
+    if folder_id and not _user_owns_folder(folder_id):
+        if wants_json():
+            return jsonify(success=False, error="Invalid folder selected"), 400
+        flash("Invalid folder selected.", "danger")
+        return redirect(url_for("document.upload"))
+
+    try:
+        job = import_archive(current_user, request.files.get("archive"), folder_id)
+    except ArchiveError as e:
+        if wants_json():
+            return jsonify(success=False, error=str(e)), 400
+        flash(str(e), "danger")
+        return redirect(url_for("document.upload", folder=folder_id))
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            job_id=job.id,
+            status_url=url_for("jobs.status", job_id=job.id)
+        ), 202
+
+    flash("Import started. You will be notified when it has finished.", "success")
+    return redirect(
+        url_for("document.list_documents", folder=folder_id)
+        if folder_id else url_for("document.list_documents")
+    )
+
+
 # =========================
 # MOVE DOCUMENT
 # =========================
@@ -284,33 +445,12 @@ def copy_document(doc_id):
         return jsonify(success=False, error="Cannot copy to a folder you do not own"), 403
 
     try:
-        # decrypt original file
-        file_bytes = decrypt_file(doc.filepath)
-
-        # bytes -> FileStorage
-        copied_file = FileStorage(
-            stream=BytesIO(file_bytes),
-            filename=doc.filename,
-            content_type="application/octet-stream"
-        )
-
-        # save encrypted copy
-        stored_path, stored_name = save_encrypted_file(copied_file)
-
-        new_doc = Document(
-            title=doc.title,
-            tags=doc.tags,
-            filename=doc.filename,
-            stored_name=stored_name,
-            filepath=stored_path,
-            file_type=doc.file_type,
-            uploaded_by=int(current_user.id),
-            folder_id=target_folder_id,
-            version=1,
-            is_active=True
+        # metadata-only copy: shares the original's encrypted blob
+        new_doc = copy_document_row(
+            doc,
+            user_id=int(current_user.id),
+            folder_id=target_folder_id
         )
-
-        db.session.add(new_doc)
         db.session.commit()
 
         log_activity(
@@ -375,14 +515,14 @@ def download(document_id):
     if not _user_can_view(doc):
         abort(403)
 
-    data = decrypt_file(doc.filepath)
-    increment_download(doc)
+    mime = mimetypes.guess_type(doc.filename)[0] or "application/octet-stream"
+    response = _stream_file(doc, mime, as_attachment=True)
 
-    return send_file(
-        BytesIO(data),
-        as_attachment=True,
-        download_name=doc.filename
-    )
+    # Resumed / partial downloads are not counted again
+    if response.status_code == 200:
+        increment_download(doc)
+
+    return response
 
 
 @document_bp.route("/<int:document_id>/preview")
@@ -396,12 +536,10 @@ def preview(document_id):
         flash("Preview not available for this file type.", "info")
         return redirect(url_for("document.detail", document_id=doc.id))
 
-    data = decrypt_file(doc.filepath)
-    
     # Explicit MIME types prevent sniffing attacks
     mime = "application/pdf" if doc.file_type == "pdf" else f"image/{'jpeg' if doc.file_type in ('jpg','jpeg') else 'png'}"
 
-    return send_file(BytesIO(data), mimetype=mime)
+    return _stream_file(doc, mime)
 
 
 # =========================
@@ -647,6 +785,7 @@ def delete_document(document_id):
         return jsonify(success=False, error="Permission denied. Only the owner can permanently delete this."), 403
 
     doc_title = doc.title
+    release_document_blobs(Document.id == doc.id)
     db.session.delete(doc)
     db.session.commit()
 
@@ -659,6 +798,45 @@ def delete_document(document_id):
     return jsonify(success=True)
 
 
+# =========================
+# DOWNLOAD SELECTION (STREAMED ZIP)
+# =========================
+@document_bp.route("/export")
+@login_required
+def export_selection():
+    """ ?doc=<id>&doc=...&folder=<id>&folder=... as one ZIP """
+    doc_ids = request.args.getlist("doc", type=int)
+    folder_ids = request.args.getlist("folder", type=int)
+
+    # Only what the user may see / owns; anything else is left out
+    visible_ids = [
+        doc_id for (doc_id,) in
+        visible_documents_query(current_user)
+        .filter(Document.id.in_(doc_ids))
+        .with_entities(Document.id)
+    ] if doc_ids else []
+
+    folders = [
+        folder for folder in
+        Folder.query.filter(Folder.id.in_(folder_ids), Folder.is_deleted.is_(False))
+        if _user_owns_folder(folder.id)
+    ] if folder_ids else []
+
+    if not visible_ids and not folders:
+        abort(404)
+
+    log_activity(
+        action="export",
+        document_id=None,
+        details=f"Downloaded {len(visible_ids)} documents and {len(folders)} folders as ZIP"
+    )
+
+    return export_response(
+        folders, visible_ids,
+        f"documents-{datetime.utcnow().strftime('%Y%m%d-%H%M')}.zip"
+    )
+
+
 # =========================
 # BULK MOVE DOCUMENTS TO RECYCLE BIN (Updated for Shares)
 # =========================
@@ -705,13 +883,15 @@ def bulk_documents_delete():
     if not isinstance(ids, list):
         return jsonify(success=False, error="Invalid payload"), 400
 
-    documents = Document.query.filter(Document.id.in_(ids)).all()
-
-    for doc in documents:
+    documents = [
+        doc for doc in Document.query.filter(Document.id.in_(ids)).all()
         # Only Owner can hard delete
-        if doc.uploaded_by != current_user_id and not current_user.is_admin:
-            continue
+        if doc.uploaded_by == current_user_id or current_user.is_admin
+    ]
+    if documents:
+        release_document_blobs(Document.id.in_([doc.id for doc in documents]))
 
+    for doc in documents:
         doc_title = doc.title
         db.session.delete(doc)
         log_activity("document_permanent_delete", document_id=None, details=f"Permanently deleted document '{doc_title}'")
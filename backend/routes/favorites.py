@@ -1,6 +1,6 @@
 # backend/routes/favorite.py
 
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 
 from ..extensions import db
@@ -10,6 +10,8 @@ from ..models import (
     DocumentFavorite,
     FolderFavorite
 )
+from ..services.document_service import document_to_dict
+from ..services.pagination import request_page, pager_links, wants_json
 
 favorites_bp = Blueprint(
     "favorites",
@@ -28,8 +30,8 @@ def index():
     for the logged-in user.
     """
 
-    # ⭐ Favorite Documents
-    favorite_documents = (
+    # ⭐ Favorite Documents (keyset pages, newest document first)
+    page = request_page(
         Document.query
         .join(
             DocumentFavorite,
@@ -38,30 +40,42 @@ def index():
         .filter(
             DocumentFavorite.user_id == current_user.id,
             Document.is_deleted.is_(False)
-        )
-        .order_by(DocumentFavorite.created_at.desc())
-        .all()
+        ),
+        Document.created_at,
+        Document.id
     )
 
-    # ⭐ Favorite Folders
-    favorite_folders = (
-        Folder.query
-        .join(
-            FolderFavorite,
-            Folder.id == FolderFavorite.folder_id
+    # ⭐ Favorite Folders (first page only)
+    if request.args.get("cursor"):
+        favorite_folders = []
+    else:
+        favorite_folders = (
+            Folder.query
+            .join(
+                FolderFavorite,
+                Folder.id == FolderFavorite.folder_id
+            )
+            .filter(
+                FolderFavorite.user_id == current_user.id,
+                Folder.is_deleted.is_(False)
+            )
+            .order_by(FolderFavorite.created_at.desc())
+            .all()
         )
-        .filter(
-            FolderFavorite.user_id == current_user.id,
-            Folder.is_deleted.is_(False)
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            documents=[document_to_dict(d) for d in page.items],
+            folders=[{"id": f.id, "name": f.name} for f in favorite_folders],
+            next_cursor=page.next_cursor
         )
-        .order_by(FolderFavorite.created_at.desc())
-        .all()
-    )
 
     return render_template(
         "favorites/index.html",
-        documents=favorite_documents,
-        folders=favorite_folders
+        documents=page.items,
+        folders=favorite_folders,
+        pager=pager_links(page)
     )
 
 
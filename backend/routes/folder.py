@@ -1,18 +1,19 @@
 # backend/routes/folder.py
 
-from io import BytesIO
 from flask import (
     Blueprint, request, jsonify,
-    redirect, url_for, flash
+    redirect, url_for, flash, abort
 )
-from werkzeug.datastructures import FileStorage
-from datetime import datetime
 from flask_login import login_required, current_user
 
 from ..extensions import db
-from ..models import Folder, Document
+from ..models import Folder
 from ..services.activity_service import log_activity
-from ..services.storage_service import decrypt_file, save_encrypted_file
+from ..services.export_service import export_response
+from ..services.job_service import enqueue_job
+from ..services.folder_service import (
+    hard_delete_subtrees, soft_delete_subtrees
+)
 
 folder_bp = Blueprint(
     "folder",
@@ -33,100 +34,11 @@ def _owns_folder(folder: Folder) -> bool:
 def _is_descendant(folder: Folder, target: Folder) -> bool:
     """
     Prevents circular moves (e.g., moving a parent into its own child).
-    Returns True if 'target' is inside 'folder' (recursively).
+    Returns True if 'target' is inside 'folder' (at any depth).
     """
-    if not target or not target.parent_id:
+    if not target:
         return False
-    if target.parent_id == folder.id:
-        return True
-    return _is_descendant(folder, target.parent)
-
-
-def _clone_folder(folder: Folder, parent_id=None):
-    """
-    Recursively clones a folder, its subfolders, and all documents.
-    CRITICAL: It physically duplicates the encrypted files on disk.
-    """
-    current_user_id = int(current_user.id) # FIX: Use int ID for ownership of copies
-
-    # 1. Create the new folder entry
-    new_folder = Folder(
-        name=f"{folder.name} (copy)" if parent_id == folder.parent_id else folder.name,
-        created_by=current_user_id,
-        parent_id=parent_id
-    )
-    db.session.add(new_folder)
-    db.session.flush() # Flush to get new_folder.id for relationships
-
-    # 2. Clone Documents (Database + Physical File)
-    for doc in folder.documents:
-        if doc.is_deleted: continue # Skip deleted docs
-
-        try:
-            # A. Decrypt original file to memory
-            file_bytes = decrypt_file(doc.filepath)
-            
-            # B. Create a new FileStorage object
-            file_obj = FileStorage(
-                stream=BytesIO(file_bytes),
-                filename=doc.filename,
-                content_type="application/octet-stream" 
-            )
-
-            # C. Save as a NEW encrypted file (get new path)
-            stored_path, stored_name = save_encrypted_file(file_obj)
-
-            # D. Create DB Entry
-            new_doc = Document(
-                title=doc.title,
-                filename=doc.filename,
-                file_type=doc.file_type,
-                tags=doc.tags,
-                uploaded_by=current_user_id, # The copier becomes the owner of the copy
-                folder_id=new_folder.id,
-                is_active=doc.is_active,
-                filepath=stored_path,
-                stored_name=stored_name,
-                version=1
-            )
-            db.session.add(new_doc)
-        except Exception as e:
-            print(f"Error cloning document {doc.id}: {e}")
-            # Continue cloning other files even if one fails
-
-    # 3. Recursively Clone Children Folders
-    for child in folder.children:
-        if not child.deleted_at:
-            _clone_folder(child, new_folder.id)
-
-    return new_folder
-
-
-def _hard_delete_folder(folder: Folder):
-    """Recursively permanently deletes folders and documents."""
-    # Delete docs in this folder
-    for doc in folder.documents:
-        db.session.delete(doc) # Listener should handle file cleanup if configured
-
-    # Recurse for children
-    for child in folder.children:
-        _hard_delete_folder(child)
-
-    # Delete the folder itself
-    db.session.delete(folder)
-
-
-def _soft_delete_folder(folder: Folder):
-    """Recursively soft deletes folders and documents (Recycle Bin)."""
-    folder.is_deleted = True
-    folder.deleted_at = datetime.utcnow()
-
-    for doc in folder.documents:
-        doc.is_deleted = True
-        doc.deleted_at = datetime.utcnow()
-
-    for child in folder.children:
-        _soft_delete_folder(child)
+    return folder.is_ancestor_of(target.id)
 
 
 # =========================
@@ -265,19 +177,38 @@ def copy_folder(folder_id):
     if target and not _owns_folder(target):
         return jsonify(success=False, error="Permission denied for target folder"), 403
 
-    try:
-        _clone_folder(folder, target_parent_id)
-        db.session.commit()
+    # Runs in the background; the client polls the job
+    job = enqueue_job(
+        "folder_copy",
+        current_user,
+        {"folder_id": folder.id, "parent_id": target_parent_id}
+    )
+
+    return jsonify(
+        success=True,
+        job_id=job.id,
+        status_url=url_for("jobs.status", job_id=job.id)
+    ), 202
+
+
+# =========================
+# DOWNLOAD FOLDER (STREAMED ZIP)
+# =========================
+@folder_bp.route("/<int:folder_id>/export")
+@login_required
+def export_folder(folder_id):
+    folder = Folder.query.get_or_404(folder_id)
+
+    if folder.is_deleted or not _owns_folder(folder):
+        abort(404)
+
+    log_activity(
+        action="folder_export",
+        document_id=None,
+        details=f"Downloaded folder '{folder.name}' as ZIP"
+    )
 
-        log_activity(
-            action="folder_copy",
-            document_id=None,
-            details=f"Copied folder '{folder.name}'"
-        )
-        return jsonify(success=True)
-    except Exception as e:
-        db.session.rollback()
-        return jsonify(success=False, error=str(e)), 500
+    return export_response([folder], [], f"{folder.name}.zip")
 
 
 # =========================
@@ -329,7 +260,7 @@ def move_folder_to_bin(folder_id):
     if not _owns_folder(folder):
         return jsonify(success=False, error="Permission denied. You do not own this folder."), 403
 
-    _soft_delete_folder(folder)
+    soft_delete_subtrees([folder.id])
     db.session.commit()
 
     log_activity(
@@ -354,7 +285,7 @@ def delete_folder(folder_id):
 
     folder_name = folder.name
 
-    _hard_delete_folder(folder)
+    hard_delete_subtrees([folder.id])
     db.session.commit()
 
     log_activity(
@@ -380,15 +311,12 @@ def bulk_folder_move_to_bin():
 
     folders = Folder.query.filter(Folder.id.in_(ids)).all()
 
-    count = 0
-    for folder in folders:
-        # _owns_folder already includes the int() fix
-        if _owns_folder(folder):
-            _soft_delete_folder(folder)
-            count += 1
+    # _owns_folder already includes the int() fix
+    owned = [folder.id for folder in folders if _owns_folder(folder)]
+    soft_delete_subtrees(owned)
 
     db.session.commit()
-    return jsonify(success=True, count=count)
+    return jsonify(success=True, count=len(owned))
 
 
 @folder_bp.route("/bulk/delete", methods=["POST"])
@@ -402,12 +330,9 @@ def bulk_folder_delete():
 
     folders = Folder.query.filter(Folder.id.in_(ids)).all()
 
-    count = 0
-    for folder in folders:
-        # _owns_folder already includes the int() fix
-        if _owns_folder(folder):
-            _hard_delete_folder(folder)
-            count += 1
+    # _owns_folder already includes the int() fix
+    owned = [folder.id for folder in folders if _owns_folder(folder)]
+    hard_delete_subtrees(owned)
 
     db.session.commit()
-    return jsonify(success=True, count=count)
\ No newline at end of file
+    return jsonify(success=True, count=len(owned))
\ No newline at end of file
@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+from ..extensions import db
+from ..models import Job
+from ..services.job_service import FINISHED, cancel_job, job_to_dict
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+def _own_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or (job.user_id != int(current_user.id) and not current_user.is_admin):
+        return None
+    return job
+
+
+# =========================
+# STATUS / PROGRESS
+# =========================
+@jobs_bp.route("/<int:job_id>")
+@login_required
+def status(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify(success=False, error="Job not found"), 404
+
+    return jsonify(success=True, job=job_to_dict(job))
+
+
+# =========================
+# CANCEL
+# =========================
+@jobs_bp.route("/<int:job_id>/cancel", methods=["POST"])
+@login_required
+def cancel(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify(success=False, error="Job not found"), 404
+
+    if job.status in FINISHED:
+        return jsonify(success=False, error=f"Job already {job.status}"), 409
+
+    cancel_job(job)
+    db.session.refresh(job)
+    return jsonify(success=True, job=job_to_dict(job))
@@ -1,7 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify
+import json
+import queue
+import time
+
+from flask import (
+    Blueprint, render_template, request, jsonify,
+    current_app, Response, stream_with_context
+)
 from flask_login import login_required, current_user
+from sqlalchemy import func, or_
+
 from ..extensions import db
 from ..models import Notification
+from ..services.notification_service import (
+    broker, invalidate_unread, unread_summary
+)
 
 notifications_bp = Blueprint(
     "notifications",
@@ -43,6 +55,7 @@ def mark_read():
     )
 
     db.session.commit()
+    invalidate_unread([current_user.id])
     return ("", 204)
 
 # -------------------------------------------------
@@ -62,6 +75,7 @@ def delete_notification(notification_id):
 
     db.session.delete(notification)
     db.session.commit()
+    invalidate_unread([current_user.id])
 
     # supports normal form submit & AJAX
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
@@ -82,8 +96,144 @@ def clear_all():
     )
 
     db.session.commit()
+    invalidate_unread([current_user.id])
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return jsonify(success=True)
 
     return ("", 204)
+
+
+# -------------------------------------------------
+# Unread summary (bell polling)
+# -------------------------------------------------
+@notifications_bp.route("/unread")
+@login_required
+def unread():
+    """ Badge count + latest unread items; cached per user, so cheap to poll """
+    summary = unread_summary(int(current_user.id))
+    return jsonify(
+        success=True,
+        count=summary["count"],
+        recent=[
+            {
+                "id": n["id"],
+                "message": n["message"],
+                "count": n["repeat_count"],
+                "created_at": n["created_at"].strftime("%Y-%m-%d %H:%M"),
+            }
+            for n in summary["recent"]
+        ]
+    )
+
+
+# -------------------------------------------------
+# Live stream (Server-Sent Events)
+# -------------------------------------------------
+def _sse(event: str, data: dict, event_id=None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _pending_rows(user_id: int, last_id: int, updated_ids: set):
+    """ Rows newer than last_id, plus coalesced rows that were bumped """
+    condition = Notification.id > last_id
+    if updated_ids:
+        condition = or_(condition, Notification.id.in_(updated_ids))
+
+    rows = (
+        Notification.query
+        .filter(Notification.user_id == user_id, condition)
+        .order_by(Notification.id)
+        .all()
+    )
+    # End the read transaction: with REPEATABLE READ an open snapshot
+    # would never show rows inserted later
+    db.session.rollback()
+    return rows
+
+
+@notifications_bp.route("/stream")
+@login_required
+def stream():
+    """
+    Pushes new notifications as they are created. Event ids are
+    notification ids, so a reconnecting EventSource resumes from
+    Last-Event-ID. The connection is closed after
+    NOTIFICATION_STREAM_MAX_SECONDS (the browser reconnects) to free
+    the worker.
+
+    Off unless NOTIFICATION_STREAM_ENABLED: each open tab holds a worker,
+    which needs threaded / async workers. 204 tells EventSource not to
+    reconnect.
+    """
+    if not current_app.config.get("NOTIFICATION_STREAM_ENABLED"):
+        return ("", 204)
+
+    user_id = int(current_user.id)
+    heartbeat = current_app.config.get("NOTIFICATION_STREAM_HEARTBEAT", 15)
+    lifetime = current_app.config.get("NOTIFICATION_STREAM_MAX_SECONDS", 300)
+
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        # New connection: the page already rendered what exists
+        last_id = (
+            db.session.query(func.max(Notification.id))
+            .filter(Notification.user_id == user_id)
+            .scalar()
+        ) or 0
+        db.session.rollback()
+
+    def events():
+        nonlocal last_id
+        inbox = broker.subscribe(user_id)
+        deadline = time.monotonic() + lifetime
+        updated_ids = set()
+
+        try:
+            yield "retry: 3000\n\n"
+
+            while True:
+                sent = False
+                for note in _pending_rows(user_id, last_id, updated_ids):
+                    data = note.to_dict()
+                    data["unread"] = unread_summary(user_id)["count"]
+
+                    if note.id > last_id:
+                        last_id = note.id
+                        yield _sse("notification", data, event_id=note.id)
+                    else:
+                        # Coalesced bump: no id, Last-Event-ID stays put
+                        yield _sse("notification", data)
+                    sent = True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                if not sent:
+                    yield ": heartbeat\n\n"
+
+                # Sleep until notify_many() wakes us, or poll on the
+                # heartbeat (rows written by other processes)
+                updated_ids = set()
+                try:
+                    bumped = inbox.get(timeout=min(heartbeat, remaining))
+                    while True:
+                        if bumped is not None:
+                            updated_ids.add(bumped)
+                        bumped = inbox.get_nowait()
+                except queue.Empty:
+                    pass
+        finally:
+            broker.unsubscribe(user_id, inbox)
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer
+    return response
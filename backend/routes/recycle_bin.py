@@ -1,10 +1,15 @@
 from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, jsonify, request
 from flask_login import login_required, current_user
+from sqlalchemy import and_, select
 
 from ..extensions import db
 from ..models import Document, Folder
 from ..services.activity_service import log_activity
+from ..services.blob_service import release_document_blobs
+from ..services.document_service import document_to_dict
+from ..services.folder_service import hard_delete_subtrees, restore_subtrees
+from ..services.pagination import request_page, pager_links, wants_json
 
 recycle_bin_bp = Blueprint(
     "recycle_bin",
@@ -12,66 +17,54 @@ recycle_bin_bp = Blueprint(
     url_prefix="/recycle-bin"
 )
 
-# =====================================================
-# 🔥 HELPERS (RECURSIVE & SAFE)
-# =====================================================
-def _restore_folder_recursive(folder: Folder):
-    folder.is_deleted = False
-    folder.deleted_at = None
-
-    # restore documents
-    for doc in folder.documents:
-        doc.is_deleted = False
-        doc.deleted_at = None
-
-    # restore subfolders
-    for child in folder.children:
-        _restore_folder_recursive(child)
-
-
-def _delete_folder_recursive(folder: Folder):
-    # delete documents first
-    for doc in folder.documents:
-        db.session.delete(doc)
-
-    # delete child folders
-    for child in folder.children:
-        _delete_folder_recursive(child)
-
-    # finally delete this folder
-    db.session.delete(folder)
-
-
 # =====================================================
 # RECYCLE BIN HOME
 # =====================================================
 @recycle_bin_bp.route("/", methods=["GET"])
 @login_required
 def index():
-    deleted_documents = (
-        Document.query
-        .filter(
+    page = request_page(
+        Document.query.filter(
             Document.uploaded_by == current_user.id,
             Document.is_deleted == True
-        )
-        .order_by(Document.deleted_at.desc())
-        .all()
+        ),
+        Document.created_at,
+        Document.id
     )
 
-    deleted_folders = (
-        Folder.query
-        .filter(
-            Folder.created_by == current_user.id,
-            Folder.is_deleted == True
+    # Folders are shown on the first page only
+    deleted_folders = []
+    if not request.args.get("cursor"):
+        deleted_folders = (
+            Folder.query
+            .filter(
+                Folder.created_by == current_user.id,
+                Folder.is_deleted == True
+            )
+            .order_by(Folder.deleted_at.desc())
+            .all()
+        )
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            documents=[document_to_dict(d) for d in page.items],
+            folders=[
+                {
+                    "id": f.id,
+                    "name": f.name,
+                    "deleted_at": f.deleted_at.isoformat() if f.deleted_at else None
+                }
+                for f in deleted_folders
+            ],
+            next_cursor=page.next_cursor
         )
-        .order_by(Folder.deleted_at.desc())
-        .all()
-    )
 
     return render_template(
         "recycle_bin/index.html",
-        deleted_documents=deleted_documents,
-        deleted_folders=deleted_folders
+        deleted_documents=page.items,
+        deleted_folders=deleted_folders,
+        pager=pager_links(page)
     )
 
 
@@ -110,6 +103,7 @@ def delete_document_permanently(document_id):
     if doc.uploaded_by != current_user.id:
         abort(403)
 
+    release_document_blobs(Document.id == doc.id)
     db.session.delete(doc)
     db.session.commit()
 
@@ -133,7 +127,7 @@ def restore_folder(folder_id):
     if folder.created_by != current_user.id:
         abort(403)
 
-    _restore_folder_recursive(folder)
+    restore_subtrees([folder.id])
     db.session.commit()
 
     log_activity(
@@ -156,12 +150,14 @@ def delete_folder_permanently(folder_id):
     if folder.created_by != current_user.id:
         abort(403)
 
-    _delete_folder_recursive(folder)
+    folder_name = folder.name
+
+    hard_delete_subtrees([folder.id])
     db.session.commit()
 
     log_activity(
         "folder_delete_permanent",
-        details=f"Permanently deleted folder '{folder.name}'"
+        details=f"Permanently deleted folder '{folder_name}'"
     )
 
     flash("Folder permanently deleted.", "danger")
@@ -176,19 +172,22 @@ def delete_folder_permanently(folder_id):
 def empty_recycle_bin():
 
     # delete documents
-    Document.query.filter(
+    binned = and_(
         Document.uploaded_by == current_user.id,
         Document.is_deleted == True
-    ).delete(synchronize_session=False)
+    )
+    release_document_blobs(binned)
+    Document.query.filter(binned).delete(synchronize_session=False)
 
-    # delete folders recursively
-    folders = Folder.query.filter(
-        Folder.created_by == current_user.id,
-        Folder.is_deleted == True
-    ).all()
+    # delete binned folders with their whole subtrees
+    folder_ids = db.session.execute(
+        select(Folder.id).where(
+            Folder.created_by == current_user.id,
+            Folder.is_deleted == True
+        )
+    ).scalars().all()
 
-    for folder in folders:
-        _delete_folder_recursive(folder)
+    hard_delete_subtrees(folder_ids)
 
     db.session.commit()
 
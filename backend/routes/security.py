@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
 from ..models import ActivityLog
+from ..services.activity_service import activity_log_stats
 
 security_bp = Blueprint("security", __name__, url_prefix="/security")
 
@@ -22,7 +23,8 @@ def index():
 
         return render_template(
             "security/index.html",
-            logs=logs
+            logs=logs,
+            audit_stats=activity_log_stats()
         )
 
     # ==================================================
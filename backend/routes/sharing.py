@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
 from flask_login import login_required, current_user
 from ..models import DocumentShare, Document
 from ..extensions import db
+from ..services.document_service import document_to_dict
+from ..services.pagination import request_page, pager_links, wants_json
 
 sharing_bp = Blueprint("sharing", __name__, url_prefix="/sharing")
 
@@ -17,10 +19,18 @@ def index():
         .filter(DocumentShare.shared_with_id == current_user_id)
         # Fix 2: Ensure we don't show deleted documents (Trash Items)
         .filter(Document.is_deleted == False) 
-        .all()
     )
+    page = request_page(shared_docs, Document.created_at, Document.id)
+
+    if wants_json():
+        return jsonify(
+            success=True,
+            documents=[document_to_dict(d) for d in page.items],
+            next_cursor=page.next_cursor
+        )
 
     return render_template(
         "sharing/index.html",
-        documents=shared_docs
+        documents=page.items,
+        pager=pager_links(page)
     )
\ No newline at end of file
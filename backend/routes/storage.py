@@ -1,12 +1,16 @@
-import os
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, current_app
 from flask_login import login_required, current_user
 
-from ..models import Document
+from ..services.dashboard_service import GLOBAL_SCOPE, storage_usage
+from ..services.gc_service import latest_sweep
 
 storage_bp = Blueprint("storage", __name__, url_prefix="/storage")
 
 
+def _mb(size: int) -> str:
+    return f"{round(size / (1024 * 1024), 2)} MB"
+
+
 @storage_bp.route("/")
 @login_required
 def index():
@@ -15,29 +19,39 @@ def index():
     # ADMIN VIEW → SYSTEM STORAGE
     # ==================================================
     if current_user.is_admin:
-        storage_path = os.path.abspath("storage/files")
-
-        total_files = 0
-        total_size = 0
+        storage_path = current_app.config["UPLOAD_FOLDER"]
 
-        if os.path.exists(storage_path):
-            for root, _, files in os.walk(storage_path):
-                for f in files:
-                    total_files += 1
-                    try:
-                        total_size += os.path.getsize(os.path.join(root, f))
-                    except OSError:
-                        pass
+        # Recorded sizes, kept up to date on every write (no filesystem walk)
+        total_files, total_size = storage_usage(GLOBAL_SCOPE)
 
         stats = [
-            {"label": "Total Files (System)", "value": total_files},
-            {
-                "label": "Total Size (System)",
-                "value": f"{round(total_size / (1024 * 1024), 2)} MB"
-            },
+            {"label": "Total Documents", "value": total_files},
+            {"label": "Total Size (Documents)", "value": _mb(total_size)},
             {"label": "Storage Path", "value": storage_path},
         ]
 
+        sweep = latest_sweep()
+        if sweep:
+            stats += [
+                {
+                    "label": "Files on Disk (Last Sweep)",
+                    "value": f"{sweep.files_total} ({_mb(sweep.bytes_total)})"
+                },
+                {
+                    "label": "Orphaned Files (Last Sweep)",
+                    "value": sweep.orphans_found - sweep.orphans_removed
+                },
+                {
+                    "label": "Space Reclaimed (Last Sweep)",
+                    "value": _mb(sweep.bytes_reclaimed)
+                },
+                {
+                    "label": "Last Sweep",
+                    "value": sweep.finished_at.strftime("%Y-%m-%d %H:%M")
+                    + (" (dry run)" if sweep.dry_run else "")
+                },
+            ]
+
         return render_template(
             "storage/index.html",
             stats=stats
@@ -46,28 +60,11 @@ def index():
     # ==================================================
     # USER VIEW → OWN DOCUMENT STORAGE
     # ==================================================
-    user_docs = Document.query.filter_by(
-        uploaded_by=current_user.id,
-        is_deleted=False
-    ).all()
-
-    user_files = 0
-    user_size = 0
-
-    for doc in user_docs:
-        if doc.filepath and os.path.exists(doc.filepath):
-            user_files += 1
-            try:
-                user_size += os.path.getsize(doc.filepath)
-            except OSError:
-                pass
+    user_files, user_size = storage_usage(current_user.id)
 
     stats = [
         {"label": "Your Documents", "value": user_files},
-        {
-            "label": "Your Storage Usage",
-            "value": f"{round(user_size / (1024 * 1024), 2)} MB"
-        }
+        {"label": "Your Storage Usage", "value": _mb(user_size)}
     ]
 
     return render_template(
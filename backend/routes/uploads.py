@@ -0,0 +1,207 @@
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import login_required, current_user
+
+from ..extensions import db
+from ..models import Document, Folder
+from ..services.document_service import InvalidFileTypeError
+from ..services.upload_service import (
+    DEFAULT_CHUNK_SIZE, UploadError, UploadOffsetError,
+    abort_upload, get_upload, import_upload, queue_finalize,
+    read_chunk, start_upload, write_chunk
+)
+
+uploads_bp = Blueprint("uploads", __name__, url_prefix="/uploads")
+
+
+# =========================
+# HELPERS
+# =========================
+def _status(upload, code=200):
+    return jsonify(
+        success=True,
+        upload_id=upload.id,
+        offset=upload.received,
+        size=upload.total_size,
+        chunk_size=current_app.config.get("UPLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE),
+        complete=upload.received == upload.total_size
+    ), code
+
+
+def _not_found():
+    return jsonify(success=False, error="Upload not found or expired"), 404
+
+
+# =========================
+# INIT
+# =========================
+@uploads_bp.route("/", methods=["POST"])
+@login_required
+def init():
+    """
+    JSON {filename, size, folder_id?} for a new document,
+    {filename, size, document_id} for a new version,
+    or {filename, size, folder_id?, import: true} for a ZIP import.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = (data.get("filename") or "").strip()
+
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        size = None
+
+    if not filename or size is None:
+        return jsonify(success=False, error="filename and size are required"), 400
+
+    document = None
+    folder_id = data.get("folder_id")
+
+    if data.get("document_id"):
+        document = Document.query.get(data.get("document_id"))
+        if not document or document.is_deleted:
+            return jsonify(success=False, error="Document not found"), 404
+        if document.uploaded_by != int(current_user.id) and not current_user.is_admin:
+            return jsonify(success=False, error="Access denied"), 403
+
+    elif folder_id:
+        folder = Folder.query.get(folder_id)
+        if not folder or (folder.created_by != int(current_user.id) and not current_user.is_admin):
+            return jsonify(success=False, error="Invalid folder selected"), 400
+
+    try:
+        upload = start_upload(
+            current_user, filename, size,
+            folder_id=folder_id, document=document,
+            for_import=bool(data.get("import"))
+        )
+    except (InvalidFileTypeError, UploadError) as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    return _status(upload, 201)
+
+
+# =========================
+# RESUME STATUS
+# =========================
+@uploads_bp.route("/<upload_id>", methods=["GET"])
+@login_required
+def status(upload_id):
+    upload = get_upload(upload_id, current_user)
+    if upload is None:
+        return _not_found()
+    return _status(upload)
+
+
+# =========================
+# CHUNK
+# =========================
+@uploads_bp.route("/<upload_id>", methods=["PUT"])
+@login_required
+def put_chunk(upload_id):
+    """
+    Raw chunk body at ?offset=N, optional X-Chunk-SHA256 header.
+    A wrong offset answers 409 with the offset to resume from.
+    """
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify(success=False, error="offset is required"), 400
+
+    # Body read and verified before the upload row is locked
+    try:
+        data = read_chunk(request.stream, request.headers.get("X-Chunk-SHA256"))
+    except UploadError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    upload = get_upload(upload_id, current_user, lock=True)
+    if upload is None:
+        return _not_found()
+
+    try:
+        write_chunk(upload, offset, data)
+    except UploadOffsetError as e:
+        db.session.rollback()
+        return jsonify(success=False, error=str(e), offset=e.expected), 409
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify(success=False, error=str(e)), 400
+
+    return _status(upload)
+
+
+# =========================
+# FINALIZE
+# =========================
+@uploads_bp.route("/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize(upload_id):
+    """
+    JSON {title, tags?}; the title is only needed for a new document.
+    Storing and indexing run as a background job: the answer is 202
+    with the job to poll, whose result holds the document id.
+    """
+    data = request.get_json(silent=True) or {}
+
+    upload = get_upload(upload_id, current_user, lock=True)
+    if upload is None:
+        return _not_found()
+
+    title = (data.get("title") or "").strip()
+    if not upload.document_id and not title:
+        db.session.rollback()
+        return jsonify(success=False, error="Title required"), 400
+
+    try:
+        job = queue_finalize(upload, current_user, title=title, tags=(data.get("tags") or "").strip())
+    except UploadOffsetError as e:
+        db.session.rollback()
+        return jsonify(success=False, error="Upload incomplete", offset=e.expected), 409
+    except (InvalidFileTypeError, UploadError) as e:
+        db.session.rollback()
+        return jsonify(success=False, error=str(e)), 400
+
+    return jsonify(
+        success=True,
+        job_id=job.id,
+        status_url=url_for("jobs.status", job_id=job.id)
+    ), 202
+
+
+# =========================
+# IMPORT (ZIP -> FOLDERS)
+# =========================
+@uploads_bp.route("/<upload_id>/import", methods=["POST"])
+@login_required
+def import_zip(upload_id):
+    """ Import a complete .zip upload into its folder, as a background job """
+    upload = get_upload(upload_id, current_user, lock=True)
+    if upload is None:
+        return _not_found()
+
+    try:
+        job = import_upload(upload, current_user)
+    except UploadOffsetError as e:
+        db.session.rollback()
+        return jsonify(success=False, error="Upload incomplete", offset=e.expected), 409
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify(success=False, error=str(e)), 400
+
+    return jsonify(
+        success=True,
+        job_id=job.id,
+        status_url=url_for("jobs.status", job_id=job.id)
+    ), 202
+
+
+# =========================
+# ABORT
+# =========================
+@uploads_bp.route("/<upload_id>", methods=["DELETE"])
+@login_required
+def abort(upload_id):
+    upload = get_upload(upload_id, current_user)
+    if upload is None:
+        return _not_found()
+
+    abort_upload(upload)
+    return jsonify(success=True)
@@ -1,16 +1,182 @@
-from flask import request
+import atexit
+import queue
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from flask import Flask, current_app, g, has_request_context, request
 from flask_login import current_user
+from sqlalchemy import insert
+
 from ..extensions import db
 from ..models import ActivityLog
 
+# ======================================================
+# BUFFERED AUDIT SINK
+# ======================================================
+# log_activity() only records the event. Rows are written in one
+# multi-row INSERT per request at teardown ("request" mode), or handed
+# to a background writer thread through a bounded queue ("background"
+# mode). Both use their own connection, never the request's session.
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+
+_activity_table = ActivityLog.__table__
+
+_STATS_LOCK = threading.Lock()
+_STATS = {"logged": 0, "written": 0, "dropped": 0, "failed": 0}
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[key] += n
+
+
+def activity_log_stats() -> dict:
+    """ Counters since start + current queue depth (backpressure metric) """
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    stats["queued"] = _writer.qsize() if _writer else 0
+    return stats
+
+
+def _write_rows(rows: List[dict]) -> None:
+    if not rows:
+        return
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(_activity_table), rows)
+        _count("written", len(rows))
+    except Exception as e:
+        _count("failed", len(rows))
+        current_app.logger.error(f"Activity log write failed ({len(rows)} rows): {e}")
+
+
+# ======================================================
+# BACKGROUND WRITER
+# ======================================================
+class ActivityWriter:
+    """
+    Daemon thread draining a bounded queue of activity rows in batches.
+    When the queue is full, producers wait up to `put_timeout` seconds
+    and the row is dropped (and counted) after that.
+    """
+
+    _STOP = object()
+
+    def __init__(self, app: Flask, maxsize: int, batch_size: int, put_timeout: float):
+        self.app = app
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def submit(self, rows: List[dict]) -> None:
+        for row in rows:
+            try:
+                self.queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                _count("dropped")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+
+            # Drain whatever else is waiting, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if self._STOP in batch:
+                stopping = True
+                batch = [row for row in batch if row is not self._STOP]
+
+            with self.app.app_context():
+                _write_rows(batch)
+                db.session.remove()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """ Flush everything queued so far, then end the thread """
+        if not self.thread.is_alive():
+            return
+        self.queue.put(self._STOP)
+        self.thread.join(timeout)
+
+
+_writer: Optional[ActivityWriter] = None
+
+
+# ======================================================
+# PUBLIC
+# ======================================================
+def log_activity(action, document_id=None, details=None, user_id=None):
+    """
+    Record an event. The user is the logged-in one; background jobs
+    pass the id of the user they act for.
+    """
+    in_request = has_request_context()
+    if user_id is None and in_request and current_user.is_authenticated:
+        user_id = current_user.id
+
+    row = {
+        "action": action,
+        "user_id": user_id,
+        "document_id": document_id,
+        "details": details,
+        "ip_address": request.remote_addr if in_request else None,
+        "created_at": datetime.utcnow(),
+    }
+    _count("logged")
+
+    if in_request:
+        # Written once, at request teardown
+        g.setdefault("_activity_rows", []).append(row)
+    else:
+        # CLI / background jobs: no request end to wait for
+        _dispatch([row])
+
+
+def _dispatch(rows: List[dict]) -> None:
+    if _writer is not None:
+        _writer.submit(rows)
+    else:
+        _write_rows(rows)
+
+
+def flush_activity(exc=None) -> None:
+    """ Teardown hook: hand this request's events to the sink """
+    rows = g.pop("_activity_rows", None)
+    if rows:
+        _dispatch(rows)
+
+
+def init_activity_log(app: Flask) -> None:
+    """
+    Register the per-request flush and, with ACTIVITY_LOG_MODE =
+    "background", start the writer thread (flushed on shutdown).
+    """
+    global _writer
+
+    app.teardown_request(flush_activity)
+
+    if app.config.get("ACTIVITY_LOG_MODE", "request") != "background":
+        return
 
-def log_activity(action, document_id=None, details=None):
-    log = ActivityLog(
-        action=action,
-        user_id=current_user.id if current_user.is_authenticated else None,
-        document_id=document_id,
-        details=details,
-        ip_address=request.remote_addr
+    _writer = ActivityWriter(
+        app,
+        maxsize=app.config.get("ACTIVITY_LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+        batch_size=app.config.get("ACTIVITY_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+        put_timeout=app.config.get("ACTIVITY_LOG_PUT_TIMEOUT", 0.1)
     )
-    db.session.add(log)
-    db.session.commit()
+    _writer.start()
+    atexit.register(_writer.stop)
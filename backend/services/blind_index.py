@@ -0,0 +1,46 @@
+import hashlib
+import hmac
+import re
+import unicodedata
+from typing import List, Set
+
+from .encryption_service import CipherRegistry
+
+# Encrypted Document columns covered by the blind index
+INDEXED_FIELDS = ("title", "tags", "category")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# 128-bit truncated HMAC: plenty for equality lookups, half the index size
+TOKEN_HASH_LENGTH = 32
+
+
+def words(text) -> List[str]:
+    """
+    Normalized words in order (with repeats): NFKC, case-folded,
+    split on non-word chars.
+    """
+    if not text:
+        return []
+
+    normalized = unicodedata.normalize("NFKC", str(text)).casefold()
+    return _WORD_RE.findall(normalized)
+
+
+def tokenize(text) -> Set[str]:
+    return set(words(text))
+
+
+def token_hash(token: str) -> str:
+    """
+    Keyed hash of one normalized word. Without the app key the stored
+    hashes can't be matched against a dictionary of words. The key
+    doesn't follow ENCRYPTION_KEY rotation, so stored hashes stay valid.
+    """
+    key = CipherRegistry.index_subkey(b"smartdms-blind-index-v1")
+    digest = hmac.new(key, token.encode(), hashlib.sha256).hexdigest()
+    return digest[:TOKEN_HASH_LENGTH]
+
+
+def blind_tokens(text) -> List[str]:
+    return sorted(token_hash(t) for t in tokenize(text))
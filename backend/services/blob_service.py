@@ -0,0 +1,237 @@
+import hashlib
+import hmac
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Document, DocumentVersion, StoredBlob
+from .encryption_service import CipherRegistry
+from .storage_service import save_encrypted_stream
+
+
+# ======================================================
+# INTERNAL: CONTENT HASH
+# ======================================================
+def _new_hasher():
+    """
+    Keyed content hash. A plain SHA-256 would let anyone with DB access
+    confirm whether a known file is stored; HMAC needs the app key.
+    Keyed like the search index, so dedup survives key rotation.
+    """
+    return hmac.new(
+        CipherRegistry.index_subkey(b"smartdms-blob-hash-v1"),
+        digestmod=hashlib.sha256
+    )
+
+
+class _HashingReader:
+    """
+    Pass chunks through unchanged while hashing and counting them.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = chunks
+        self.hasher = _new_hasher()
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self.hasher.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+
+# ======================================================
+# STORE (DEDUPLICATED)
+# ======================================================
+class EncryptedFile(NamedTuple):
+    """ A freshly encrypted file, not yet registered as a blob """
+    stored_path: str
+    stored_name: str
+    content_hash: str
+    size: int
+
+
+def encrypt_blob(chunks: Iterable[bytes], filename: str) -> EncryptedFile:
+    """
+    Stream plaintext chunks into a new encrypted file while hashing
+    them. No database access, so it can run in worker threads (with an
+    app context for the storage config).
+    """
+    reader = _HashingReader(chunks)
+    stored_path, stored_name = save_encrypted_stream(reader, filename)
+
+    return EncryptedFile(stored_path, stored_name, reader.hasher.hexdigest(), reader.size)
+
+
+def _new_blob(encrypted: EncryptedFile) -> StoredBlob:
+    return StoredBlob(
+        content_hash=encrypted.content_hash,
+        stored_name=encrypted.stored_name,
+        filepath=encrypted.stored_path,
+        size_bytes=encrypted.size,
+        ref_count=0
+    )
+
+
+def _touch(blob_ids: List[int]) -> None:
+    """
+    Mark existing blobs as just reused. Until the new rows pointing at
+    them commit they may look unreferenced; the GC spares blobs touched
+    within its grace period.
+    """
+    if blob_ids:
+        db.session.query(StoredBlob).filter(StoredBlob.id.in_(blob_ids)).update(
+            {StoredBlob.last_used_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+
+
+def register_blob(encrypted: EncryptedFile) -> StoredBlob:
+    """
+    Return the blob for an encrypted file: an existing blob with the
+    same content (the new file is dropped), or a new one.
+    """
+    existing = StoredBlob.query.filter_by(content_hash=encrypted.content_hash).first()
+    if existing:
+        os.remove(encrypted.stored_path)
+        _touch([existing.id])
+        return existing
+
+    blob = _new_blob(encrypted)
+
+    # SAVEPOINT: a concurrent upload of the same content may win the
+    # unique index; fall back to its row without losing the session
+    try:
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        os.remove(encrypted.stored_path)
+        return StoredBlob.query.filter_by(content_hash=encrypted.content_hash).one()
+
+    return blob
+
+
+def register_blobs(files: List[EncryptedFile]) -> List[StoredBlob]:
+    """
+    register_blob() for a batch, in order: one lookup for all hashes and
+    one SAVEPOINT for all new blobs. Identical files within the batch
+    share one blob.
+    """
+    hashes = {f.content_hash for f in files}
+    blobs = {
+        blob.content_hash: blob
+        for blob in StoredBlob.query.filter(StoredBlob.content_hash.in_(hashes))
+    } if hashes else {}
+
+    _touch([blob.id for blob in blobs.values()])
+
+    new_blobs = {}
+    for f in files:
+        if f.content_hash in blobs or f.content_hash in new_blobs:
+            os.remove(f.stored_path)
+        else:
+            new_blobs[f.content_hash] = _new_blob(f)
+
+    try:
+        with db.session.begin_nested():
+            db.session.add_all(new_blobs.values())
+    except IntegrityError:
+        # Lost a race on some hash: settle the new ones one by one
+        for content_hash, blob in new_blobs.items():
+            blobs[content_hash] = register_blob(EncryptedFile(
+                blob.filepath, blob.stored_name, content_hash, blob.size_bytes
+            ))
+    else:
+        blobs.update(new_blobs)
+
+    return [blobs[f.content_hash] for f in files]
+
+
+def store_blob(chunks: Iterable[bytes], filename: str) -> StoredBlob:
+    """
+    Encrypt plaintext chunks and return the blob holding them.
+
+    The content is streamed to a new encrypted file while being hashed.
+    If a blob with the same hash already exists, the new file is dropped
+    and the existing blob is returned instead, so identical content is
+    stored once. No reference is taken; call acquire_blob() for each
+    row that points at the returned blob.
+    """
+    return register_blob(encrypt_blob(chunks, filename))
+
+
+# ======================================================
+# REFERENCE COUNTING
+# ======================================================
+def acquire_blob(blob: StoredBlob, count: int = 1) -> None:
+    """
+    Add references (atomic UPDATE, safe against concurrent requests).
+    """
+    db.session.query(StoredBlob).filter(StoredBlob.id == blob.id).update(
+        {StoredBlob.ref_count: StoredBlob.ref_count + count},
+        synchronize_session=False
+    )
+
+
+def acquire_blobs(counts: Dict[int, int]) -> None:
+    """
+    acquire_blob() for many blobs ({blob id: references}), one
+    executemany UPDATE. Negative counts release.
+    """
+    if not counts:
+        return
+
+    blobs = StoredBlob.__table__
+    db.session.execute(
+        update(blobs)
+        .where(blobs.c.id == bindparam("blob_id"))
+        .values(ref_count=blobs.c.ref_count + bindparam("count")),
+        [{"blob_id": blob_id, "count": n} for blob_id, n in sorted(counts.items())]
+    )
+
+
+def release_document_blobs(criterion) -> None:
+    """
+    Drop the references held by the documents matching `criterion` and
+    by their versions. Call right before deleting those documents.
+    """
+    counts = Counter()
+
+    doc_refs = (
+        db.session.query(Document.blob_id, func.count(Document.id))
+        .filter(criterion, Document.blob_id.isnot(None))
+        .group_by(Document.blob_id)
+    )
+    version_refs = (
+        db.session.query(DocumentVersion.blob_id, func.count(DocumentVersion.id))
+        .filter(
+            DocumentVersion.document_id.in_(select(Document.id).where(criterion)),
+            DocumentVersion.blob_id.isnot(None)
+        )
+        .group_by(DocumentVersion.blob_id)
+    )
+
+    for blob_id, n in [*doc_refs, *version_refs]:
+        counts[blob_id] -= n
+
+    acquire_blobs(counts)
+
+
+def release_blob(blob_id: Optional[int], count: int = 1) -> None:
+    """
+    Drop references. Unreferenced blobs are kept on disk; removing
+    them is a separate clean-up step.
+    """
+    if not blob_id:
+        return
+
+    db.session.query(StoredBlob).filter(StoredBlob.id == blob_id).update(
+        {StoredBlob.ref_count: StoredBlob.ref_count - count},
+        synchronize_session=False
+    )
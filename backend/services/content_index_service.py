@@ -0,0 +1,197 @@
+import math
+from collections import Counter
+from datetime import datetime
+from typing import List, Tuple
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, select
+
+from ..extensions import db
+from ..models import Document, DocumentContentStats, DocumentContentTerm
+from .blind_index import token_hash, words
+from .text_extraction import can_extract, extract_text
+
+# BM25 parameters (usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Postings inserted per statement
+_INSERT_BATCH = 1000
+
+
+# ======================================================
+# INDEXING
+# ======================================================
+def index_document_content(doc: Document, commit: bool = True) -> int:
+    """
+    (Re)build the content postings of one document from its current
+    file. Returns the number of distinct terms indexed.
+    """
+    DocumentContentTerm.query.filter_by(document_id=doc.id).delete(
+        synchronize_session=False
+    )
+    DocumentContentStats.query.filter_by(document_id=doc.id).delete(
+        synchronize_session=False
+    )
+
+    counts = Counter()
+    if can_extract(doc.file_type):
+        counts = Counter(
+            w for w in words(extract_text(
+                doc.filepath, doc.file_type,
+                max_file_size=current_app.config.get("CONTENT_INDEX_MAX_FILE_SIZE")
+            ))
+            if len(w) > 1
+        )
+
+    # Hash each distinct word once, insert postings in multi-row batches
+    rows = [
+        {"term_hash": token_hash(word), "document_id": doc.id, "term_freq": tf}
+        for word, tf in counts.items()
+    ]
+    for i in range(0, len(rows), _INSERT_BATCH):
+        db.session.execute(insert(DocumentContentTerm), rows[i:i + _INSERT_BATCH])
+
+    db.session.add(DocumentContentStats(
+        document_id=doc.id,
+        length=sum(counts.values()),
+        indexed_at=datetime.utcnow()
+    ))
+    if commit:
+        db.session.commit()
+
+    return len(rows)
+
+
+def copy_content_index(source_id: int, target_id: int) -> None:
+    """
+    Copies share the original's content, so they share its postings too:
+    INSERT ... SELECT on the server, nothing is re-extracted.
+    """
+    db.session.execute(
+        insert(DocumentContentTerm).from_select(
+            ["term_hash", "document_id", "term_freq"],
+            select(
+                DocumentContentTerm.term_hash,
+                literal(target_id),
+                DocumentContentTerm.term_freq
+            ).where(DocumentContentTerm.document_id == source_id)
+        )
+    )
+    db.session.execute(
+        insert(DocumentContentStats).from_select(
+            ["document_id", "length", "indexed_at"],
+            select(
+                literal(target_id),
+                DocumentContentStats.length,
+                DocumentContentStats.indexed_at
+            ).where(DocumentContentStats.document_id == source_id)
+        )
+    )
+
+
+def index_document_content_safely(doc: Document) -> None:
+    """
+    Upload paths call this: a document that can't be parsed is still
+    stored, it just isn't searchable by content.
+    """
+    if not current_app.config.get("CONTENT_INDEX_ENABLED", True):
+        return
+
+    try:
+        index_document_content(doc)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Content indexing failed for document {doc.id}: {e}")
+
+
+def index_documents_content_safely(docs: List[Document]) -> None:
+    """
+    index_document_content_safely() for a batch: one SAVEPOINT per
+    document, one commit for all.
+    """
+    if not current_app.config.get("CONTENT_INDEX_ENABLED", True):
+        return
+
+    for doc in docs:
+        try:
+            with db.session.begin_nested():
+                index_document_content(doc, commit=False)
+        except Exception as e:
+            current_app.logger.warning(f"Content indexing failed for document {doc.id}: {e}")
+
+    db.session.commit()
+
+
+# ======================================================
+# SEARCH (BM25)
+# ======================================================
+def search_content(visible_query, text: str, limit: int = 20) -> List[Tuple[Document, float]]:
+    """
+    Rank documents of `visible_query` (already filtered by visibility)
+    against the words of `text` with Okapi BM25.
+    """
+    hashes = sorted({token_hash(w) for w in words(text) if len(w) > 1})
+    if not hashes:
+        return []
+
+    # Corpus statistics: N and average document length
+    total_docs, avg_len = db.session.query(
+        func.count(DocumentContentStats.document_id),
+        func.avg(DocumentContentStats.length)
+    ).one()
+    if not total_docs:
+        return []
+    avg_len = float(avg_len or 1) or 1.0
+
+    # Document frequency per query term (index-only lookups)
+    doc_freq = dict(
+        db.session.query(
+            DocumentContentTerm.term_hash,
+            func.count(DocumentContentTerm.document_id)
+        )
+        .filter(DocumentContentTerm.term_hash.in_(hashes))
+        .group_by(DocumentContentTerm.term_hash)
+        .all()
+    )
+    if not doc_freq:
+        return []
+
+    idf = {
+        h: math.log((total_docs - df + 0.5) / (df + 0.5) + 1)
+        for h, df in doc_freq.items()
+    }
+
+    # Postings of the query terms, restricted to visible documents
+    visible_ids = visible_query.with_entities(Document.id).subquery()
+    postings = (
+        db.session.query(
+            DocumentContentTerm.document_id,
+            DocumentContentTerm.term_hash,
+            DocumentContentTerm.term_freq,
+            DocumentContentStats.length
+        )
+        .join(
+            DocumentContentStats,
+            DocumentContentStats.document_id == DocumentContentTerm.document_id
+        )
+        .join(visible_ids, visible_ids.c.id == DocumentContentTerm.document_id)
+        .filter(DocumentContentTerm.term_hash.in_(list(doc_freq)))
+        .all()
+    )
+
+    scores = {}
+    for doc_id, h, tf, length in postings:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * (length or 0) / avg_len)
+        scores[doc_id] = scores.get(doc_id, 0.0) + idf[h] * tf * (BM25_K1 + 1) / (tf + norm)
+
+    top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+    if not top:
+        return []
+
+    docs = {
+        d.id: d
+        for d in Document.query.filter(Document.id.in_([doc_id for doc_id, _ in top]))
+    }
+
+    return [(docs[doc_id], score) for doc_id, score in top if doc_id in docs]
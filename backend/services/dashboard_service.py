@@ -0,0 +1,568 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from sqlalchemy import and_, bindparam, delete, event, func, inspect, insert, select, union, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models import DashboardRollup, Document, DocumentShare, DocumentVersion, Folder, StoredBlob
+from .storage_service import iter_decrypted_file, plaintext_size
+
+# ======================================================
+# DASHBOARD ROLLUPS
+# ======================================================
+# The dashboard's document counters live in dashboard_rollups, one row
+# per (scope, metric, bucket). Scope 0 is the global (admin) view, any
+# other scope is a user id and counts own uploads + documents shared
+# with that user, each document once.
+#
+# Every flush that inserts / changes / deletes a Document or a
+# DocumentShare turns into +1 / -1 deltas, upserted in the same
+# transaction. Bulk statements that bypass the ORM (folder bin/restore)
+# report themselves through track_bulk_delete_state().
+# `flask dashboard rebuild-rollups` recomputes everything for repairs.
+#
+# Each scope also has a ("version", "") row, bumped whenever that
+# scope's counters, folders or shares change. Cached dashboard widgets are
+# keyed by it (see dashboard_stats.cached_widget).
+
+GLOBAL_SCOPE = 0
+
+_rollups = DashboardRollup.__table__
+_ROLLUP_KEY = ("user_id", "metric", "bucket")
+_INSERT_CHUNK = 1000
+
+# Document columns the counters depend on
+_TRACKED = ("is_deleted", "is_active", "file_type", "created_at", "uploaded_by", "size_bytes")
+
+
+class _DocState(NamedTuple):
+    is_deleted: bool
+    is_active: Optional[bool]
+    file_type: Optional[str]
+    created_at: datetime
+    uploaded_by: int
+    size_bytes: int
+
+
+def normalize_file_type(file_type: Optional[str]) -> str:
+    return (file_type or "").strip().lower() or "other"
+
+
+def _counter_keys(state: Optional[_DocState]):
+    """ (metric, bucket) rows a document counts towards; none once binned """
+    if state is None or state.is_deleted:
+        return []
+
+    keys = [("total", "")]
+    if state.is_active is True:
+        keys.append(("active", ""))
+    elif state.is_active is False:
+        keys.append(("archived", ""))
+
+    keys.append(("uploads", state.created_at.date().isoformat()))
+    keys.append(("type", normalize_file_type(state.file_type)))
+    return keys
+
+
+def _scopes(state: Optional[_DocState], sharees: Iterable[int]) -> Set[int]:
+    if state is None:
+        return set()
+    return {GLOBAL_SCOPE, state.uploaded_by} | set(sharees)
+
+
+def _count_into(deltas, state, sharees, sign: int) -> None:
+    for scope in _scopes(state, sharees):
+        for metric, bucket in _counter_keys(state):
+            deltas[(scope, metric, bucket)] += sign
+
+    # Storage usage: uploader + global only, a share uses no space
+    if state is not None and not state.is_deleted:
+        for scope in {GLOBAL_SCOPE, state.uploaded_by}:
+            deltas[(scope, "files", "")] += sign
+            deltas[(scope, "bytes", "")] += sign * (state.size_bytes or 0)
+
+
+# ======================================================
+# COUNTER UPSERT
+# ======================================================
+def _apply(connection, deltas) -> None:
+    """
+    Add `deltas` {(scope, metric, bucket): n} to the rollup rows in one
+    upsert. Rows are sent in key order so concurrent transactions lock
+    the shared (global) rows in the same order.
+    """
+    rows = [
+        dict(zip(_ROLLUP_KEY, key), value=n)
+        for key, n in sorted(deltas.items())
+        if n
+    ]
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(_rollups)
+        stmt = stmt.on_duplicate_key_update(value=_rollups.c.value + stmt.inserted.value)
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(_rollups)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_ROLLUP_KEY),
+            set_={"value": _rollups.c.value + stmt.excluded.value}
+        )
+    else:
+        # Generic fallback: update, insert the rows that did not exist yet
+        for row in rows:
+            updated = connection.execute(
+                update(_rollups)
+                .where(*(_rollups.c[k] == row[k] for k in _ROLLUP_KEY))
+                .values(value=_rollups.c.value + row["value"])
+            ).rowcount
+            if not updated:
+                connection.execute(insert(_rollups), [row])
+        return
+
+    connection.execute(stmt, rows)
+
+
+def _with_versions(deltas, scopes=()):
+    """ Bump the data version of every scope whose counters moved (+ `scopes`) """
+    touched = {key[0] for key, n in deltas.items() if n} | set(scopes)
+    for scope in touched:
+        deltas[(scope, "version", "")] += 1
+    return deltas
+
+
+def data_version(scope: int) -> int:
+    """ Current data version of a scope (0 until its first change) """
+    value = db.session.execute(
+        select(DashboardRollup.value).where(
+            DashboardRollup.user_id == scope,
+            DashboardRollup.metric == "version",
+            DashboardRollup.bucket == ""
+        )
+    ).scalar()
+    return value or 0
+
+
+def _load_states(session, criterion) -> Dict[int, _DocState]:
+    rows = session.execute(
+        select(Document.id, *(getattr(Document, name) for name in _TRACKED))
+        .where(criterion)
+    )
+    return {row[0]: _DocState(*row[1:]) for row in rows}
+
+
+def _load_sharees(session, doc_ids) -> Dict[int, Set[int]]:
+    sharees = defaultdict(set)
+    if not doc_ids:
+        return sharees
+
+    rows = session.execute(
+        select(DocumentShare.document_id, DocumentShare.shared_with_id)
+        .where(DocumentShare.document_id.in_(list(doc_ids)))
+    )
+    for doc_id, user_id in rows:
+        sharees[doc_id].add(user_id)
+    return sharees
+
+
+# ======================================================
+# INCREMENTAL: ORM FLUSHES
+# ======================================================
+def _state_changed(doc: Document) -> bool:
+    attrs = inspect(doc).attrs
+    return any(attrs[name].history.has_changes() for name in _TRACKED)
+
+
+def _share_document(session, share: DocumentShare) -> Optional[Document]:
+    # Pending shares don't lazy-load their relationship
+    return share.document or session.get(Document, share.document_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_document_changes(session, flush_context, instances):
+    new_docs = [o for o in session.new if isinstance(o, Document)]
+    changed_docs = [o for o in session.dirty if isinstance(o, Document) and _state_changed(o)]
+    deleted_docs = {o for o in session.deleted if isinstance(o, Document)}
+    added_shares = [o for o in session.new if isinstance(o, DocumentShare)]
+    removed_shares = [o for o in session.deleted if isinstance(o, DocumentShare)]
+
+    # Folders have no counters here, but the folder widget is versioned
+    folders = [
+        o for o in (*session.new, *session.deleted) if isinstance(o, Folder)
+    ] + [
+        o for o in session.dirty if isinstance(o, Folder) and session.is_modified(o)
+    ]
+
+    if not (new_docs or changed_docs or deleted_docs or added_shares or removed_shares or folders):
+        return
+
+    with session.no_autoflush:
+        # Pin column defaults, so the counters match what gets inserted
+        for doc in new_docs:
+            if doc.created_at is None:
+                doc.created_at = datetime.utcnow()
+            if doc.is_deleted is None:
+                doc.is_deleted = False
+            if doc.is_active is None:
+                doc.is_active = True
+            if doc.size_bytes is None:
+                doc.size_bytes = 0
+
+        affected = set(new_docs) | set(changed_docs) | deleted_docs
+        added = defaultdict(set)
+        removed = defaultdict(set)
+
+        for shares, target in ((added_shares, added), (removed_shares, removed)):
+            for share in shares:
+                doc = _share_document(session, share)
+                if doc is not None:
+                    target[doc].add(share.shared_with_id)
+                    affected.add(doc)
+
+        # Before the flush the database still holds the old state
+        persisted = [doc.id for doc in affected if doc.id is not None]
+        old_states = _load_states(session, Document.id.in_(persisted)) if persisted else {}
+        old_sharees = _load_sharees(session, persisted)
+
+        deltas = defaultdict(int)
+        for doc in affected:
+            old_state = old_states.get(doc.id)
+            before = old_sharees.get(doc.id, set())
+
+            if doc in deleted_docs:
+                new_state = None
+            else:
+                new_state = _DocState(*(getattr(doc, name) for name in _TRACKED))
+
+            _count_into(deltas, old_state, before, -1)
+            _count_into(deltas, new_state, (before - removed[doc]) | added[doc], +1)
+
+        folder_scopes = {GLOBAL_SCOPE} if folders else set()
+        folder_scopes.update(f.created_by for f in folders if f.created_by is not None)
+
+        # A revoke + grant can leave a sharee's counters unchanged, but
+        # not what they can see
+        share_scopes = {s.shared_with_id for s in (*added_shares, *removed_shares)}
+
+        _apply(session.connection(), _with_versions(deltas, folder_scopes | share_scopes))
+
+
+# ======================================================
+# INCREMENTAL: BULK STATEMENTS
+# ======================================================
+def track_bulk_delete_state(criterion, is_deleted: bool) -> None:
+    """
+    Call right before a bulk UPDATE / DELETE of the documents matching
+    `criterion` that sets is_deleted to `is_deleted` (a hard delete
+    counts as is_deleted=True). Only documents whose state actually
+    flips move the counters.
+    """
+    session = db.session
+    states = _load_states(session, and_(criterion, Document.is_deleted != is_deleted))
+    if not states:
+        return
+
+    sharees = _load_sharees(session, states.keys())
+    sign = -1 if is_deleted else +1
+
+    deltas = defaultdict(int)
+    for doc_id, state in states.items():
+        _count_into(deltas, state._replace(is_deleted=False), sharees.get(doc_id, ()), sign)
+
+    _apply(session.connection(), _with_versions(deltas))
+
+
+def track_bulk_folder_change(folder_ids) -> None:
+    """ Call around a bulk UPDATE / DELETE of folders: bumps their owners' versions """
+    folder_ids = list(folder_ids)
+    if not folder_ids:
+        return
+
+    owners = db.session.execute(
+        select(Folder.created_by)
+        .where(Folder.id.in_(folder_ids), Folder.created_by.isnot(None))
+        .distinct()
+    ).scalars().all()
+
+    _apply(
+        db.session.connection(),
+        _with_versions(defaultdict(int), {GLOBAL_SCOPE, *owners})
+    )
+
+
+# ======================================================
+# FULL REBUILD
+# ======================================================
+def _grouped(source, scope, key):
+    """ (scope, key, documents) over non-deleted documents of `source` """
+    columns = [key, func.count()]
+    group_by = [key]
+    if scope is not None:
+        columns.insert(0, scope)
+        group_by.insert(0, scope)
+
+    rows = db.session.execute(
+        select(*columns)
+        .select_from(source)
+        .where(Document.is_deleted.is_(False))
+        .group_by(*group_by)
+    )
+    for row in rows:
+        if scope is None:
+            yield (GLOBAL_SCOPE, *row)
+        else:
+            yield tuple(row)
+
+
+def rebuild_dashboard_rollups() -> int:
+    """
+    Recompute all rollup rows with grouped queries and replace the table
+    in one transaction. Meant for repairs / first run; returns row count.
+    """
+    visible = union(
+        select(Document.uploaded_by.label("user_id"), Document.id.label("document_id")),
+        select(DocumentShare.shared_with_id, DocumentShare.document_id),
+    ).subquery()
+
+    sources = [
+        (Document.__table__, None),
+        (visible.join(Document, Document.id == visible.c.document_id), visible.c.user_id),
+    ]
+
+    counts = defaultdict(int)
+    for source, scope in sources:
+        for user_id, is_active, n in _grouped(source, scope, Document.is_active):
+            counts[(user_id, "total", "")] += n
+            if is_active is not None:
+                counts[(user_id, "active" if is_active else "archived", "")] += n
+
+        for user_id, day, n in _grouped(source, scope, func.date(Document.created_at)):
+            counts[(user_id, "uploads", str(day))] += n
+
+        for user_id, file_type, n in _grouped(source, scope, Document.file_type):
+            counts[(user_id, "type", normalize_file_type(file_type))] += n
+
+    counts.update(_actual_usage())
+
+    rows = [dict(zip(_ROLLUP_KEY, key), value=n) for key, n in sorted(counts.items())]
+
+    # Data versions survive the rebuild, and move on for every scope
+    versioned = db.session.execute(
+        select(DashboardRollup.user_id).where(DashboardRollup.metric == "version")
+    ).scalars().all()
+
+    db.session.execute(delete(_rollups).where(_rollups.c.metric != "version"))
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        db.session.execute(insert(_rollups), rows[i:i + _INSERT_CHUNK])
+
+    scopes = {key[0] for key in counts} | set(versioned)
+    _apply(db.session.connection(), _with_versions(defaultdict(int), scopes))
+    db.session.commit()
+
+    return len(rows)
+
+
+def ensure_dashboard_rollups() -> None:
+    """ Backfill the rollups when documents exist but were never counted (first run) """
+    counted = (
+        db.session.query(DashboardRollup.user_id)
+        .filter_by(user_id=GLOBAL_SCOPE, metric="total")
+        .first()
+    )
+    if counted is not None:
+        return
+
+    if db.session.query(Document.id).filter(Document.is_deleted.is_(False)).first():
+        rebuild_dashboard_rollups()
+
+
+# ======================================================
+# STORAGE USAGE (files / bytes)
+# ======================================================
+# Owner-only counters: scope 0 = all non-deleted documents, a user scope
+# = that user's own uploads. Sizes are the plaintext sizes recorded on
+# the rows at write time; no file is ever stat()ed to show them.
+def storage_usage(scope: int) -> Tuple[int, int]:
+    """ (files, bytes) of a scope, one indexed read """
+    rows = db.session.execute(
+        select(DashboardRollup.metric, DashboardRollup.value).where(
+            DashboardRollup.user_id == scope,
+            DashboardRollup.metric.in_(("files", "bytes")),
+            DashboardRollup.bucket == ""
+        )
+    )
+    usage = dict(rows.all())
+    return usage.get("files", 0), usage.get("bytes", 0)
+
+
+def _actual_usage() -> Dict[tuple, int]:
+    """ files / bytes rows recounted from the documents table (one grouped query) """
+    usage = defaultdict(int)
+
+    rows = db.session.execute(
+        select(
+            Document.uploaded_by,
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.size_bytes), 0)
+        )
+        .where(Document.is_deleted.is_(False))
+        .group_by(Document.uploaded_by)
+    )
+    for user_id, files, size in rows:
+        for scope in (GLOBAL_SCOPE, user_id):
+            usage[(scope, "files", "")] += files
+            usage[(scope, "bytes", "")] += int(size)
+
+    return usage
+
+
+def _legacy_plaintext_size(path: str) -> int:
+    """
+    Plaintext size of a file stored before dedup: from the frame layout,
+    or by decrypting a Fernet file (its token only bounds the size).
+    0 if the file is missing or unreadable.
+    """
+    try:
+        size = plaintext_size(path)
+        if size is None:
+            size = sum(len(chunk) for chunk in iter_decrypted_file(path))
+    except (OSError, RuntimeError, InvalidToken, InvalidTag, ValueError):
+        # iter_decrypted_file() reports bad / wrong-key files as RuntimeError
+        return 0
+
+    return size
+
+
+def _backfill_sizes(batch_size: int) -> int:
+    """
+    Rows written before size_bytes existed: take the size from their
+    blob, or for files stored before dedup, from the file itself. Those
+    are marked size_checked, so missing or empty files are looked at
+    once, not on every run. Returns the number of rows sized.
+    """
+    sized = 0
+
+    for model in (Document, DocumentVersion):
+        blob_size = (
+            select(StoredBlob.size_bytes)
+            .where(StoredBlob.id == model.blob_id)
+            .scalar_subquery()
+        )
+        sized += db.session.execute(
+            update(model)
+            .where(
+                model.size_bytes == 0,
+                model.blob_id.in_(select(StoredBlob.id).where(StoredBlob.size_bytes > 0))
+            )
+            .values(size_bytes=blob_size)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(model.id, model.filepath)
+                .where(
+                    model.size_bytes == 0,
+                    model.blob_id.is_(None),
+                    model.size_checked.is_(False),
+                    model.id > last_id
+                )
+                .order_by(model.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            sizes = [
+                {"row_id": row_id, "size": _legacy_plaintext_size(path) if path else 0}
+                for row_id, path in rows
+            ]
+
+            table = model.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(size_bytes=bindparam("size"), size_checked=True),
+                sizes
+            )
+            sized += sum(1 for row in sizes if row["size"])
+
+            last_id = rows[-1][0]
+
+    return sized
+
+
+def reconcile_storage_usage(batch_size: int = _INSERT_CHUNK) -> Tuple[int, int]:
+    """
+    Size unsized rows, recount files / bytes per owner and correct the
+    counters by the difference (added, not overwritten, so concurrent
+    uploads are kept). Returns (rows sized, scopes corrected).
+    """
+    sized = _backfill_sizes(batch_size)
+
+    actual = _actual_usage()
+    recorded = {
+        (user_id, metric, bucket): value
+        for user_id, metric, bucket, value in db.session.execute(
+            select(
+                DashboardRollup.user_id,
+                DashboardRollup.metric,
+                DashboardRollup.bucket,
+                DashboardRollup.value
+            ).where(DashboardRollup.metric.in_(("files", "bytes")))
+        )
+    }
+
+    deltas = defaultdict(int)
+    for key in set(actual) | set(recorded):
+        drift = actual.get(key, 0) - recorded.get(key, 0)
+        if drift:
+            deltas[key] = drift
+
+    corrected = {key[0] for key in deltas}
+    _apply(db.session.connection(), _with_versions(deltas))
+    db.session.commit()
+
+    return sized, len(corrected)
+
+
+def start_usage_reconciler(app) -> Optional[threading.Thread]:
+    """
+    Run reconcile_storage_usage() every STORAGE_USAGE_RECONCILE_INTERVAL
+    seconds in a daemon thread. Disabled when the interval is 0 / unset.
+    """
+    interval = app.config.get("STORAGE_USAGE_RECONCILE_INTERVAL") or 0
+    if interval <= 0:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    sized, corrected = reconcile_storage_usage()
+                    if sized or corrected:
+                        app.logger.info(
+                            "Storage usage: %s rows sized, %s counters corrected",
+                            sized, corrected
+                        )
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Storage usage reconcile failed: {e}")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=_loop, name="storage-usage", daemon=True)
+    thread.start()
+    return thread
+
@@ -0,0 +1,299 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, func, or_, select, union
+
+from ..extensions import db
+from ..models import ActivityLog, DashboardRollup, Document, DocumentShare, Folder, User
+from .cache import LocalCache
+from .dashboard_service import GLOBAL_SCOPE, data_version
+
+# ======================================================
+# DASHBOARD STATS ENGINE
+# ======================================================
+# Everything the dashboard shows as a number or a chart, as one typed
+# object, from one of two sources (DASHBOARD_STATS_SOURCE):
+#
+#   "rollups": the precomputed dashboard_rollups rows (2 round trips)
+#   "live":    a single conditional-aggregation SELECT over the user's
+#              visible documents (1 round trip, always exact)
+
+FILE_TYPE_ORDER = [
+    "pdf", "doc", "docx", "xls", "xlsx",
+    "ppt", "pptx", "txt", "png", "jpg",
+    "jpeg", "zip", "other"
+]
+
+CHART_DAYS = 10  # upload trend chart
+WEEK_DAYS = 7    # "uploads this week", today included
+RECENT_FOLDERS = 5
+RECENT_ACTIVITIES = 10
+
+
+class DashboardStats(NamedTuple):
+    total_docs: int
+    active_docs: int
+    archived_docs: int
+    uploads_week: int
+    total_users: int
+    total_folders: int
+    uploads_per_day: List[Tuple[str, int]]    # oldest first, CHART_DAYS entries
+    type_distribution: List[Tuple[str, int]]  # FILE_TYPE_ORDER, non-zero only
+
+
+def stats_scope(user) -> int:
+    """ Rollup / cache scope: global for admins, else the user """
+    return GLOBAL_SCOPE if user.is_admin else user.id
+
+
+def _chart_days(today: date) -> List[date]:
+    return [today - timedelta(days=CHART_DAYS - 1 - i) for i in range(CHART_DAYS)]
+
+
+def _build(total, active, archived, per_day: Dict[str, int], types: Dict[str, int],
+           users, folders, days: List[date]) -> DashboardStats:
+    uploads_per_day = [(d.isoformat(), per_day.get(d.isoformat(), 0)) for d in days]
+
+    type_distribution = [
+        (ext, types[ext]) for ext in FILE_TYPE_ORDER if types.get(ext, 0) > 0
+    ]
+
+    return DashboardStats(
+        total_docs=total,
+        active_docs=active,
+        archived_docs=archived,
+        uploads_week=sum(count for _, count in uploads_per_day[-WEEK_DAYS:]),
+        total_users=users,
+        total_folders=folders,
+        uploads_per_day=uploads_per_day,
+        # Fallback for empty state
+        type_distribution=type_distribution or [("other", 0)]
+    )
+
+
+def _side_counts(user):
+    """ Scalar subqueries: all users, and the folders the user sees """
+    folders = select(func.count(Folder.id)).where(Folder.is_deleted.is_(False))
+    if not user.is_admin:
+        folders = folders.where(Folder.created_by == user.id)
+
+    return (
+        select(func.count(User.id)).scalar_subquery(),
+        folders.scalar_subquery(),
+    )
+
+
+# ======================================================
+# LIVE: ONE AGGREGATE QUERY
+# ======================================================
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _visible_documents(user):
+    """ Ids of the user's own documents + documents shared with them """
+    return union(
+        select(Document.id.label("document_id")).where(Document.uploaded_by == user.id),
+        select(DocumentShare.document_id).where(DocumentShare.shared_with_id == user.id),
+    ).cte("visible_documents")
+
+
+def live_dashboard_stats(user, today: Optional[date] = None) -> DashboardStats:
+    """
+    All dashboard figures in a single SELECT: one pass over the visible,
+    non-deleted documents with a SUM(CASE ...) column per counter, day
+    and file type, plus the user / folder counts as scalar subqueries.
+    """
+    today = today or datetime.utcnow().date()
+    days = _chart_days(today)
+
+    # [day 0 start, ..., day N start, tomorrow start]: range predicates, index friendly
+    bounds = [datetime.combine(d, time.min) for d in days]
+    bounds.append(datetime.combine(today + timedelta(days=1), time.min))
+
+    file_type = func.lower(func.trim(func.coalesce(Document.file_type, "")))
+
+    day_columns = [
+        _count_if(and_(Document.created_at >= start, Document.created_at < end))
+        for start, end in zip(bounds, bounds[1:])
+    ]
+    type_columns = [
+        _count_if(file_type.in_(["", "other"]) if ext == "other" else file_type == ext)
+        for ext in FILE_TYPE_ORDER
+    ]
+
+    stmt = (
+        select(
+            func.count(Document.id),
+            _count_if(Document.is_active.is_(True)),
+            _count_if(Document.is_active.is_(False)),
+            *_side_counts(user),
+            *day_columns,
+            *type_columns,
+        )
+        .select_from(Document)
+        .where(Document.is_deleted.is_(False))
+    )
+
+    if not user.is_admin:
+        visible = _visible_documents(user)
+        stmt = stmt.join(visible, visible.c.document_id == Document.id)
+
+    row = list(db.session.execute(stmt).one())
+
+    total, active, archived, users, folders = row[:5]
+    day_counts = row[5:5 + len(days)]
+    type_counts = row[5 + len(days):]
+
+    return _build(
+        total, active, archived,
+        per_day={d.isoformat(): n for d, n in zip(days, day_counts)},
+        types=dict(zip(FILE_TYPE_ORDER, type_counts)),
+        users=users,
+        folders=folders,
+        days=days
+    )
+
+
+# ======================================================
+# ROLLUPS: PRECOMPUTED COUNTERS
+# ======================================================
+def rollup_dashboard_stats(user, today: Optional[date] = None) -> DashboardStats:
+    """
+    Dashboard figures from dashboard_rollups: one indexed range read of
+    the user's (or the global) rows, plus the user / folder counts.
+    """
+    today = today or datetime.utcnow().date()
+    days = _chart_days(today)
+    scope = stats_scope(user)
+
+    rows = db.session.execute(
+        select(DashboardRollup.metric, DashboardRollup.bucket, DashboardRollup.value)
+        .where(
+            DashboardRollup.user_id == scope,
+            or_(
+                DashboardRollup.metric != "uploads",
+                DashboardRollup.bucket >= days[0].isoformat()
+            )
+        )
+    )
+
+    scalars = {}
+    per_day = {}
+    types = {}
+    for metric, bucket, value in rows:
+        if metric == "uploads":
+            per_day[bucket] = value
+        elif metric == "type":
+            types[bucket] = value
+        else:
+            scalars[metric] = value
+
+    users, folders = db.session.execute(select(*_side_counts(user))).one()
+
+    return _build(
+        scalars.get("total", 0),
+        scalars.get("active", 0),
+        scalars.get("archived", 0),
+        per_day=per_day,
+        types=types,
+        users=users,
+        folders=folders,
+        days=days
+    )
+
+
+def dashboard_stats(user, today: Optional[date] = None) -> DashboardStats:
+    if current_app.config.get("DASHBOARD_STATS_SOURCE", "rollups") == "live":
+        return live_dashboard_stats(user, today)
+    return rollup_dashboard_stats(user, today)
+
+
+# ======================================================
+# WIDGET CACHE
+# ======================================================
+# Dashboard widgets are cached per scope as plain values (never ORM
+# objects). Keys carry the scope's data version, so any document or
+# folder change makes the next load miss; the TTL only bounds what the
+# version doesn't cover (user count, activity log) and memory.
+def set_widget_cache(app, backend) -> None:
+    """ Swap in a shared backend (get / set / delete, like LocalCache) """
+    app.extensions["dashboard_cache"] = backend
+
+
+def _cache():
+    cache = current_app.extensions.get("dashboard_cache")
+    if cache is None:
+        cache = current_app.extensions["dashboard_cache"] = LocalCache(
+            maxsize=current_app.config.get("DASHBOARD_CACHE_SIZE", 4096),
+            ttl=current_app.config.get("DASHBOARD_CACHE_TTL", 300)
+        )
+    return cache
+
+
+def cached_widget(name: str, user, build, versioned: bool = True, ttl: Optional[float] = None):
+    scope = stats_scope(user)
+    version = data_version(scope) if versioned else "-"
+    key = f"dashboard:{name}:{scope}:{version}"
+
+    value = _cache().get(key)
+    if value is None:
+        value = build(user)
+        _cache().set(key, value, ttl)
+    return value
+
+
+def cached_dashboard_stats(user) -> DashboardStats:
+    # Day in the key: the chart window moves at midnight
+    today = datetime.utcnow().date()
+    return cached_widget(
+        f"stats:{today.isoformat()}", user,
+        lambda u: dashboard_stats(u, today)
+    )
+
+
+def _recent_folders(user) -> List[dict]:
+    query = Folder.query.filter(
+        Folder.is_deleted.is_(False),
+        Folder.parent_id.is_(None)  # Only root folders in recent view
+    )
+    if not user.is_admin:
+        # Employees only see folders they created
+        query = query.filter(Folder.created_by == user.id)
+
+    folders = query.order_by(Folder.created_at.desc()).limit(RECENT_FOLDERS).all()
+    return [
+        {"id": f.id, "name": f.name, "created_at": f.created_at.isoformat()}
+        for f in folders
+    ]
+
+
+def recent_folders(user) -> List[dict]:
+    return cached_widget("folders", user, _recent_folders)
+
+
+def _recent_activities(user) -> List[dict]:
+    query = ActivityLog.query
+    if not user.is_admin:
+        query = query.filter(ActivityLog.user_id == user.id)
+
+    logs = query.order_by(ActivityLog.created_at.desc()).limit(RECENT_ACTIVITIES).all()
+    return [
+        {
+            "action": log.action,
+            "user_id": log.user_id,
+            "document_id": log.document_id,
+            "ist_time": log.ist_time.strftime("%Y-%m-%d %H:%M") if log.ist_time else None,
+        }
+        for log in logs
+    ]
+
+
+def recent_activities(user) -> List[dict]:
+    # Not versioned: the audit log grows on almost every request
+    return cached_widget(
+        "activity", user, _recent_activities,
+        versioned=False,
+        ttl=current_app.config.get("DASHBOARD_ACTIVITY_TTL", 15)
+    )
@@ -1,12 +1,32 @@
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import joinedload, load_only
 from werkzeug.datastructures import FileStorage
 
+from ..config import allowed_file
 from ..extensions import db
-from ..models import Document, DocumentVersion, User
-from .storage_service import save_encrypted_file
+from ..models import (
+    Document, DocumentSearchToken, DocumentShare,
+    DocumentVersion, StoredBlob, User
+)
+from .blind_index import blind_tokens
+from .encryption_service import EncryptionService
+from .storage_service import FRAME_SIZE, read_chunks, iter_decrypted_file
+from .blob_service import (
+    store_blob, acquire_blob, acquire_blobs, release_blob,
+    encrypt_blob, register_blobs
+)
 from .activity_service import log_activity
 from .notification_service import notify_user
+from .content_index_service import (
+    copy_content_index, index_document_content_safely, index_documents_content_safely
+)
 
 
 # ======================================================
@@ -27,11 +47,9 @@ class InvalidFileTypeError(Exception):
     pass
 
 
-def _validate_file(file_storage: FileStorage):
-    if not file_storage or not file_storage.filename:
-        raise InvalidFileTypeError("No file selected")
-
-    _, ext = os.path.splitext(file_storage.filename)
+def validate_filename(filename: str) -> str:
+    """ Extension of an uploadable file name, or InvalidFileTypeError """
+    _, ext = os.path.splitext(filename)
     ext = ext.replace(".", "").lower()
 
     if ext not in ALLOWED_EXTENSIONS:
@@ -42,6 +60,256 @@ def _validate_file(file_storage: FileStorage):
     return ext
 
 
+def _validate_file(file_storage: FileStorage):
+    if not file_storage or not file_storage.filename:
+        raise InvalidFileTypeError("No file selected")
+
+    return validate_filename(file_storage.filename)
+
+
+def _store_upload(file_storage: FileStorage) -> StoredBlob:
+    if not allowed_file(file_storage.filename):
+        raise ValueError("File type not allowed")
+
+    frame_size = current_app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+
+    return store_blob(
+        read_chunks(file_storage.stream, frame_size),
+        file_storage.filename
+    )
+
+
+# ======================================================
+# COPY DOCUMENT (METADATA ONLY)
+# ======================================================
+def _adopt_legacy_file(doc: Document) -> StoredBlob:
+    """
+    Move a file stored before dedup into a blob, and point every row
+    still using that file (the document, its version rows, older
+    copies) at the blob, so it's only ever converted once. The old
+    file is left to the storage GC.
+    """
+    legacy_path = doc.filepath
+    blob = store_blob(iter_decrypted_file(legacy_path), doc.filename)
+
+    values = {"stored_name": blob.stored_name, "filepath": blob.filepath, "blob_id": blob.id}
+    adopted = 0
+    for model in (Document, DocumentVersion):
+        adopted += (
+            model.query
+            .filter(model.filepath == legacy_path, model.blob_id.is_(None))
+            .update(values, synchronize_session=False)
+        )
+
+    acquire_blob(blob, adopted)
+    db.session.refresh(doc, ["stored_name", "filepath", "blob_id"])
+    return blob
+
+def copy_document_row(
+    doc: Document,
+    user_id: int,
+    folder_id: int | None,
+    is_active: bool = True,
+) -> Document:
+    """
+    Create a copy of a document that shares the original's stored content.
+    Files stored before dedup (no blob) are streamed into a blob once.
+    """
+    if doc.blob_id:
+        blob = db.session.get(StoredBlob, doc.blob_id)
+    else:
+        blob = _adopt_legacy_file(doc)
+
+    new_doc = Document(
+        title=doc.title,
+        tags=doc.tags,
+        filename=doc.filename,
+        stored_name=blob.stored_name,
+        filepath=blob.filepath,
+        blob_id=blob.id,
+        size_bytes=blob.size_bytes,
+        file_type=doc.file_type,
+        uploaded_by=user_id,
+        folder_id=folder_id,
+        version=1,
+        is_active=is_active
+    )
+
+    db.session.add(new_doc)
+    acquire_blob(blob)
+
+    db.session.flush()
+    copy_content_index(doc.id, new_doc.id)
+
+    return new_doc
+
+
+# ======================================================
+# VISIBILITY
+# ======================================================
+def visible_documents_query(user: User):
+    """
+    Non-deleted documents the user may see: everything for admins,
+    otherwise own uploads + documents shared with them.
+    """
+    query = Document.query.filter(Document.is_deleted.is_(False))
+
+    if user.is_admin:
+        return query
+
+    user_id = int(user.id)
+    return query.filter(
+        or_(
+            Document.uploaded_by == user_id,
+            Document.id.in_(
+                db.session.query(DocumentShare.document_id)
+                .filter(DocumentShare.shared_with_id == user_id)
+            )
+        )
+    )
+
+
+# ======================================================
+# SERIALIZATION (SPARSE FIELDS)
+# ======================================================
+# field name -> (columns it needs, getter). Only requested fields are
+# read, so unrequested encrypted columns are neither loaded nor decrypted.
+_DOCUMENT_FIELDS = {
+    "id": ((Document.id,), lambda d: d.id),
+    "title": ((Document._title,), lambda d: d.title),
+    "tags": ((Document._tags,), lambda d: d.tags),
+    "category": ((Document._category,), lambda d: d.category),
+    "filename": ((Document.filename,), lambda d: d.filename),
+    "file_type": ((Document.file_type,), lambda d: d.file_type),
+    "folder_id": ((Document.folder_id,), lambda d: d.folder_id),
+    "version": ((Document.version,), lambda d: d.version),
+    "status": ((Document.status,), lambda d: d.status),
+    "is_active": ((Document.is_active,), lambda d: d.is_active),
+    "is_deleted": ((Document.is_deleted,), lambda d: d.is_deleted),
+    "uploaded_by": ((Document.uploaded_by,), lambda d: d.uploaded_by),
+    "uploader": (
+        (Document.uploaded_by,),
+        lambda d: d.uploader.username if d.uploader else None
+    ),
+    "download_count": ((Document.download_count,), lambda d: d.download_count or 0),
+    "created_at": ((Document.created_at,), lambda d: d.created_at.isoformat()),
+    "updated_at": (
+        (Document.updated_at,),
+        lambda d: d.updated_at.isoformat() if d.updated_at else None
+    ),
+}
+
+DOCUMENT_FIELDS = tuple(_DOCUMENT_FIELDS)
+
+# List views: everything except the uploader (a relationship)
+DEFAULT_DOCUMENT_FIELDS = (
+    "id", "title", "tags", "category", "file_type", "folder_id", "status",
+    "is_active", "is_deleted", "uploaded_by", "created_at", "updated_at",
+)
+
+
+def document_load_options(fields):
+    """
+    Loader options for serializing `fields`: load_only() the columns
+    they need (plus the keyset columns) and eager-load the uploader
+    in the same query when it is requested.
+    """
+    columns = {c.key: c for c in (Document.id, Document.created_at)}
+    for name in fields:
+        columns.update((c.key, c) for c in _DOCUMENT_FIELDS[name][0])
+
+    options = [load_only(*columns.values())]
+    if "uploader" in fields:
+        options.append(
+            joinedload(Document.uploader).load_only(User.id, User.username)
+        )
+    return options
+
+
+def document_to_dict(doc: Document, fields=DEFAULT_DOCUMENT_FIELDS) -> dict:
+    """ JSON shape of a document row, restricted to `fields` """
+    return {name: _DOCUMENT_FIELDS[name][1](doc) for name in fields}
+
+
+# ======================================================
+# SEARCH (BLIND INDEX)
+# ======================================================
+def apply_search(query, text: str, fields=("title", "tags")):
+    """
+    Restrict a Document query to rows containing every word of `text`
+    in any of `fields`. Titles/tags are encrypted, so the match runs on
+    the HMAC word index (an indexed join, no decryption).
+    """
+    hashes = blind_tokens(text)
+    if not hashes:
+        return query
+
+    matches = (
+        db.session.query(DocumentSearchToken.document_id)
+        .filter(
+            DocumentSearchToken.token_hash.in_(hashes),
+            DocumentSearchToken.field.in_(fields)
+        )
+        .group_by(DocumentSearchToken.document_id)
+        .having(func.count(func.distinct(DocumentSearchToken.token_hash)) == len(hashes))
+        .subquery()
+    )
+
+    return query.join(matches, Document.id == matches.c.document_id)
+
+
+# ======================================================
+# KEY ROTATION
+# ======================================================
+def rotate_document_fields(batch_size: int = 500) -> int:
+    """
+    Re-encrypt the encrypted Document columns under the primary
+    ENCRYPTION_KEY, in committed keyset batches, so old keys can be
+    retired. Values that don't decrypt are left as they are. The blind
+    index uses the separate index key and stays valid.
+    Returns the number of rows rewritten.
+    """
+    table = Document.__table__
+    columns = (table.c.title, table.c.tags, table.c.category)
+    rotated = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, *columns)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            old = row._mapping
+            values = {f"new_{c.name}": EncryptionService.rotate_text(old[c]) for c in columns}
+            if any(values[f"new_{c.name}"] != old[c] for c in columns):
+                updates.append({"row_id": old[table.c.id], **values})
+
+        if updates:
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(
+                    **{c.name: bindparam(f"new_{c.name}") for c in columns},
+                    # Not a content change: keep updated_at (and listing ETags)
+                    updated_at=table.c.updated_at
+                ),
+                updates
+            )
+            rotated += len(updates)
+
+        db.session.commit()
+        last_id = rows[-1][0]
+
+    return rotated
+
+
 # ======================================================
 # CREATE DOCUMENT (FOLDER-AWARE)
 # ======================================================
@@ -60,9 +328,30 @@ def create_document(
     ext = _validate_file(file_storage)
 
     # ------------------------------
-    # SAVE FILE
+    # SAVE FILE (DEDUPLICATED)
     # ------------------------------
-    stored_path, stored_name = save_encrypted_file(file_storage)
+    blob = _store_upload(file_storage)
+
+    return create_document_from_blob(
+        user, title, tags, file_storage.filename, ext, blob,
+        folder_id=folder_id, status=status
+    )
+
+
+def create_document_from_blob(
+    user: User,
+    title: str,
+    tags: str | None,
+    filename: str,
+    ext: str,
+    blob: StoredBlob,
+    folder_id: int | None = None,
+    status: str = "uploaded",
+) -> Document:
+    """
+    Second half of create_document(), for content that is already
+    stored (e.g. a finished resumable upload).
+    """
 
     # ------------------------------
     # DOCUMENT (VERSION = 1)
@@ -70,9 +359,11 @@ def create_document(
     doc = Document(
         title=title,
         tags=tags,
-        filename=file_storage.filename,
-        stored_name=stored_name,
-        filepath=stored_path,
+        filename=filename,
+        stored_name=blob.stored_name,
+        filepath=blob.filepath,
+        blob_id=blob.id,
+        size_bytes=blob.size_bytes,
         file_type=ext,
         uploaded_by=user.id,
         folder_id=folder_id,
@@ -91,20 +382,29 @@ def create_document(
     version_row = DocumentVersion(
         document_id=doc.id,
         version=1,
-        stored_name=stored_name,
-        filepath=stored_path,
+        stored_name=blob.stored_name,
+        filepath=blob.filepath,
+        blob_id=blob.id,
+        size_bytes=blob.size_bytes,
     )
 
     db.session.add(version_row)
+    acquire_blob(blob, 2)  # document + version row
     db.session.commit()
 
+    # ------------------------------
+    # CONTENT SEARCH INDEX
+    # ------------------------------
+    index_document_content_safely(doc)
+
     # ------------------------------
     # ACTIVITY + NOTIFICATION
     # ------------------------------
     log_activity(
         action="upload",
         document_id=doc.id,
-        details="Document uploaded"
+        details="Document uploaded",
+        user_id=user.id
     )
 
     notify_user(
@@ -115,6 +415,167 @@ def create_document(
     return doc
 
 
+# ======================================================
+# BATCH UPLOAD (MULTI-FILE)
+# ======================================================
+class UploadResult(NamedTuple):
+    filename: str
+    document: Optional[Document] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.document is not None
+
+
+def ingest_uploads(
+    user: User,
+    title: str,
+    tags: str | None,
+    files: List[FileStorage],
+    folder_id: int | None = None,
+    status: str = "uploaded",
+) -> List[UploadResult]:
+    """
+    Upload several files as separate documents ("Title", "Title (2)", ...).
+
+    Files are encrypted concurrently (UPLOAD_WORKERS threads, no DB
+    access there), then every blob, document and version row is written
+    in one transaction. One activity entry and one notification cover
+    the whole batch. Returns one result per non-empty file, in order;
+    a file that fails doesn't stop the others.
+    """
+    app = current_app._get_current_object()
+    frame_size = app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+
+    results = {}
+    pending = []
+
+    # ------------------------------
+    # FILE VALIDATION
+    # ------------------------------
+    for i, file_storage in enumerate(files):
+        if not file_storage or not file_storage.filename:
+            continue
+        try:
+            ext = _validate_file(file_storage)
+            if not allowed_file(file_storage.filename):
+                raise InvalidFileTypeError(f"File type '.{ext}' is not allowed")
+        except InvalidFileTypeError as e:
+            results[i] = UploadResult(file_storage.filename, error=str(e))
+            continue
+        pending.append((i, file_storage, ext))
+
+    # ------------------------------
+    # ENCRYPT (PARALLEL)
+    # ------------------------------
+    def _encrypt(file_storage):
+        with app.app_context():
+            return encrypt_blob(
+                read_chunks(file_storage.stream, frame_size),
+                file_storage.filename
+            )
+
+    encrypted = []
+    if pending:
+        workers = min(app.config.get("UPLOAD_WORKERS", 4), len(pending))
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="upload") as pool:
+            futures = [pool.submit(_encrypt, f) for _, f, _ in pending]
+
+        for (i, file_storage, ext), future in zip(pending, futures):
+            try:
+                encrypted.append((i, file_storage, ext, future.result()))
+            except Exception as e:
+                app.logger.error(f"Encrypting upload '{file_storage.filename}' failed: {e}")
+                results[i] = UploadResult(file_storage.filename, error="Could not store file")
+
+    # ------------------------------
+    # BLOBS + DOCUMENTS + VERSIONS (ONE TRANSACTION)
+    # ------------------------------
+    docs = []
+    if encrypted:
+        try:
+            blobs = register_blobs([new_file for *_, new_file in encrypted])
+            now = datetime.utcnow()
+
+            for (i, file_storage, ext, _), blob in zip(encrypted, blobs):
+                docs.append(Document(
+                    title=title if i == 0 else f"{title} ({i + 1})",
+                    tags=tags,
+                    filename=file_storage.filename,
+                    stored_name=blob.stored_name,
+                    filepath=blob.filepath,
+                    blob_id=blob.id,
+                    size_bytes=blob.size_bytes,
+                    file_type=ext,
+                    uploaded_by=user.id,
+                    folder_id=folder_id,
+                    version=1,
+                    is_active=True,
+                    status=status,
+                    created_at=now,
+                ))
+
+            db.session.add_all(docs)
+            db.session.flush()
+
+            db.session.add_all([
+                DocumentVersion(
+                    document_id=doc.id,
+                    version=1,
+                    stored_name=doc.stored_name,
+                    filepath=doc.filepath,
+                    blob_id=doc.blob_id,
+                    size_bytes=doc.size_bytes,
+                )
+                for doc in docs
+            ])
+
+            # document + version row per file
+            acquire_blobs(Counter(blob.id for blob in blobs for _ in range(2)))
+            db.session.commit()
+
+        except Exception as exc:
+            db.session.rollback()
+            app.logger.error(f"Saving {len(encrypted)} uploads failed: {exc}")
+            docs = []
+            for i, file_storage, _, new_file in encrypted:
+                # New files whose blob rows were rolled back
+                if os.path.exists(new_file.stored_path):
+                    os.remove(new_file.stored_path)
+                results[i] = UploadResult(file_storage.filename, error="Could not save document")
+
+        for (i, file_storage, _, _), doc in zip(encrypted, docs):
+            results[i] = UploadResult(file_storage.filename, document=doc)
+
+    if not docs:
+        return [results[i] for i in sorted(results)]
+
+    # ------------------------------
+    # CONTENT SEARCH INDEX
+    # ------------------------------
+    index_documents_content_safely(docs)
+
+    # ------------------------------
+    # ACTIVITY + NOTIFICATION (ONE EACH)
+    # ------------------------------
+    if len(docs) == 1:
+        log_activity(
+            action="upload",
+            document_id=docs[0].id,
+            details="Document uploaded"
+        )
+        notify_user(user, f"Document '{docs[0].title}' uploaded successfully.")
+    else:
+        log_activity(
+            action="upload",
+            details=f"{len(docs)} documents uploaded (ids {', '.join(str(d.id) for d in docs)})"
+        )
+        notify_user(user, f"{len(docs)} documents uploaded successfully.")
+
+    return [results[i] for i in sorted(results)]
+
+
 # ======================================================
 # UPDATE DOCUMENT FILE (NEW VERSION)
 # ======================================================
@@ -128,24 +589,42 @@ def update_document_file(
     # ------------------------------
     ext = _validate_file(file_storage)
 
-    new_version = (doc.version or 1) + 1
-
     # ------------------------------
-    # SAVE FILE
+    # SAVE FILE (DEDUPLICATED)
     # ------------------------------
-    stored_path, stored_name = save_encrypted_file(
-        file_storage,
-        version_suffix=f"_v{new_version}"
-    )
+    blob = _store_upload(file_storage)
+
+    return update_document_from_blob(doc, file_storage.filename, ext, blob)
+
+
+def update_document_from_blob(
+    doc: Document,
+    filename: str,
+    ext: str,
+    blob: StoredBlob,
+    user_id: int | None = None,
+) -> Document:
+    """
+    Second half of update_document_file(), for content that is already
+    stored (e.g. a finished resumable upload). `user_id` attributes the
+    activity entry outside a request.
+    """
+    new_version = (doc.version or 1) + 1
 
     # ------------------------------
     # UPDATE DOCUMENT
     # ------------------------------
+    # The document row's reference moves to the new blob;
+    # older version rows keep theirs.
+    release_blob(doc.blob_id)
+
     doc.version = new_version
     doc.file_type = ext
-    doc.filename = file_storage.filename
-    doc.stored_name = stored_name
-    doc.filepath = stored_path
+    doc.filename = filename
+    doc.stored_name = blob.stored_name
+    doc.filepath = blob.filepath
+    doc.blob_id = blob.id
+    doc.size_bytes = blob.size_bytes
     doc.updated_at = datetime.utcnow()
 
     # ------------------------------
@@ -154,20 +633,29 @@ def update_document_file(
     version_row = DocumentVersion(
         document_id=doc.id,
         version=new_version,
-        stored_name=stored_name,
-        filepath=stored_path,
+        stored_name=blob.stored_name,
+        filepath=blob.filepath,
+        blob_id=blob.id,
+        size_bytes=blob.size_bytes,
     )
 
     db.session.add(version_row)
+    acquire_blob(blob, 2)  # document + version row
     db.session.commit()
 
+    # ------------------------------
+    # CONTENT SEARCH INDEX
+    # ------------------------------
+    index_document_content_safely(doc)
+
     # ------------------------------
     # ACTIVITY + NOTIFICATION
     # ------------------------------
     log_activity(
         "update",
         document_id=doc.id,
-        details=f"Updated file to version {new_version}"
+        details=f"Updated file to version {new_version}",
+        user_id=user_id
     )
 
     notify_user(
@@ -1,15 +1,150 @@
 import os
 import base64
 import hashlib
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 
 # New Imports for CryptoJS compatibility
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 
 # Existing Imports
-from cryptography.fernet import Fernet, InvalidToken
-from flask import current_app
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from flask import current_app, has_app_context
+
+from ..config import Config
+
+
+def _as_bytes(key) -> bytes:
+    return key.encode() if isinstance(key, str) else key
+
+
+class CipherRegistry:
+    """
+    Process-wide cache of cipher objects, keyed by key ID.
+
+    Building a Fernet / deriving an HKDF key is far more expensive than
+    the actual AES work on a short title, so every cipher is built once
+    per key and reused by all requests and threads.
+
+    Key rotation: ENCRYPTION_KEY is the primary (used for new data),
+    ENCRYPTION_OLD_KEYS are still accepted for decryption.
+    """
+
+    _lock = threading.Lock()
+    _fernets: Dict[str, Fernet] = {}
+    _multi: Dict[Tuple[bytes, ...], MultiFernet] = {}
+    _subkeys: Dict[Tuple[str, bytes, int], bytes] = {}
+    _aeads: Dict[Tuple[str, bytes], AESGCM] = {}
+
+    # ----------------------------
+    # KEYS
+    # ----------------------------
+    @staticmethod
+    def key_id(key: bytes) -> str:
+        """ Short, non-secret identifier for a key """
+        return hashlib.sha256(key).hexdigest()[:16]
+
+    @staticmethod
+    def active_keys() -> List[bytes]:
+        """ [primary, *old] keys from the app config (or Config outside an app) """
+        config = current_app.config if has_app_context() else vars(Config)
+
+        primary = config.get("ENCRYPTION_KEY")
+        if not primary:
+            raise RuntimeError("ENCRYPTION_KEY is not set in config")
+
+        old = config.get("ENCRYPTION_OLD_KEYS") or ()
+        return [_as_bytes(primary)] + [_as_bytes(k) for k in old]
+
+    @classmethod
+    def index_key(cls) -> bytes:
+        """ Stable key for stored hashes: SEARCH_INDEX_KEY, else the primary key """
+        config = current_app.config if has_app_context() else vars(Config)
+
+        key = config.get("SEARCH_INDEX_KEY")
+        return _as_bytes(key) if key else cls.active_keys()[0]
+
+    # ----------------------------
+    # FERNET (TEXT + LEGACY FILES)
+    # ----------------------------
+    @classmethod
+    def _fernet_for(cls, key: bytes) -> Fernet:
+        kid = cls.key_id(key)
+        fernet = cls._fernets.get(kid)
+        if fernet is None:
+            with cls._lock:
+                fernet = cls._fernets.setdefault(kid, Fernet(key))
+        return fernet
+
+    @classmethod
+    def fernet(cls) -> MultiFernet:
+        """ Encrypts with the primary key, decrypts with any active key """
+        # Hot path (every encrypted column access): the raw key tuple is
+        # the lookup key, key IDs are only computed on a miss
+        keys = tuple(cls.active_keys())
+
+        multi = cls._multi.get(keys)
+        if multi is None:
+            multi = MultiFernet([cls._fernet_for(k) for k in keys])
+            with cls._lock:
+                multi = cls._multi.setdefault(keys, multi)
+        return multi
+
+    # ----------------------------
+    # DERIVED KEYS (FILES, HASHES)
+    # ----------------------------
+    @classmethod
+    def subkey(cls, info: bytes, length: int = 32, key: Optional[bytes] = None) -> bytes:
+        """
+        Purpose-bound key derived from a master key with HKDF.
+        Defaults to the primary key.
+        """
+        if key is None:
+            key = cls.active_keys()[0]
+
+        cache_key = (cls.key_id(key), info, length)
+        derived = cls._subkeys.get(cache_key)
+        if derived is None:
+            derived = HKDF(
+                algorithm=hashes.SHA256(),
+                length=length,
+                salt=None,
+                info=info,
+            ).derive(base64.urlsafe_b64decode(key))
+            with cls._lock:
+                derived = cls._subkeys.setdefault(cache_key, derived)
+        return derived
+
+    @classmethod
+    def index_subkey(cls, info: bytes, length: int = 32) -> bytes:
+        """ subkey() of the index key: survives ENCRYPTION_KEY rotation """
+        return cls.subkey(info, length, key=cls.index_key())
+
+    @classmethod
+    def aeads(cls, info: bytes) -> List[AESGCM]:
+        """ AES-GCM ciphers for every active key, primary first """
+        result = []
+        for key in cls.active_keys():
+            cache_key = (cls.key_id(key), info)
+            aead = cls._aeads.get(cache_key)
+            if aead is None:
+                aead = AESGCM(cls.subkey(info, key=key))
+                with cls._lock:
+                    aead = cls._aeads.setdefault(cache_key, aead)
+            result.append(aead)
+        return result
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._fernets.clear()
+            cls._multi.clear()
+            cls._subkeys.clear()
+            cls._aeads.clear()
 
 
 class EncryptionService:
@@ -24,20 +159,11 @@ class EncryptionService:
     # 1. INTERNAL: GET CIPHER (Fernet)
     # ============================
     @staticmethod
-    def _get_fernet_cipher():
+    def _get_fernet_cipher() -> MultiFernet:
         """
-        Get Fernet cipher using secret key from config (For Server-Side Storage)
+        Get cached Fernet cipher for server-side storage (see CipherRegistry)
         """
-        key = current_app.config.get("ENCRYPTION_KEY")
-
-        if not key:
-            raise RuntimeError("ENCRYPTION_KEY is not set in config")
-
-        # Ensure bytes
-        if isinstance(key, str):
-            key = key.encode()
-
-        return Fernet(key)
+        return CipherRegistry.fernet()
 
     # ============================
     # 2. FRONTEND PASSWORD DECRYPTION (NEW & CRITICAL)
@@ -111,6 +237,19 @@ class EncryptionService:
         except (InvalidToken, ValueError):
             return value
 
+    @staticmethod
+    def rotate_text(value):
+        """ Re-encrypt DB text under the primary key (after key rotation) """
+        if not value:
+            return value
+
+        cipher = EncryptionService._get_fernet_cipher()
+
+        try:
+            return cipher.rotate(value.encode()).decode()
+        except (InvalidToken, ValueError):
+            return value
+
     # ============================
     # 4. FILE ENCRYPTION (Storage)
     # ============================
@@ -0,0 +1,150 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy.orm import load_only
+
+from ..extensions import db
+from ..models import Document, Folder
+from .storage_service import iter_decrypted_file
+from .zip_stream import DEFLATED, STORED, ZipMember, stream_zip
+
+# ======================================================
+# ZIP EXPORT (FOLDERS + SELECTIONS)
+# ======================================================
+# Files are decrypted one after another straight into the ZIP stream;
+# document rows are read in keyset batches. Memory stays flat and the
+# first bytes go out before any file is decrypted.
+
+# Already compressed: deflating them again only costs CPU
+_STORED_TYPES = {"pdf", "docx", "xlsx", "pptx", "jpg", "jpeg", "png", "zip"}
+
+_EXPORT_COLUMNS = (
+    Document.id, Document.filename, Document.filepath, Document.file_type,
+    Document.folder_id, Document.created_at, Document.updated_at,
+)
+
+ERRORS_NAME = "_export_errors.txt"
+
+
+def _safe(name: Optional[str]) -> str:
+    """ One path component: no separators, no '.' / '..' """
+    name = (name or "").replace("/", "_").replace("\\", "_").strip()
+    return "_" if name in ("", ".", "..") else name
+
+
+def _unique(name: str, used: Set[str]) -> str:
+    """ "a.pdf", then "a (2).pdf", ... within one directory """
+    candidate = name
+    stem, dot, ext = name.rpartition(".")
+    if not dot or not stem:
+        stem, ext = name, ""
+
+    n = 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({n}).{ext}" if ext else f"{stem} ({n})"
+        n += 1
+
+    used.add(candidate.lower())
+    return candidate
+
+
+def _iter_documents(criterion, batch_size: int) -> Iterator[Document]:
+    """ Non-deleted documents matching `criterion`, in id order, batch by batch """
+    last_id = 0
+    while True:
+        batch = (
+            Document.query
+            .options(load_only(*_EXPORT_COLUMNS))
+            .filter(criterion, Document.is_deleted.is_(False), Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return
+
+        for doc in batch:
+            yield doc
+            db.session.expunge(doc)  # keep the session (and memory) flat
+
+        last_id = batch[-1].id
+
+
+def _document_member(doc: Document, path: str, errors: List[str]) -> Optional[ZipMember]:
+    try:
+        # Opens the file and checks its header: a missing file is skipped
+        # before anything of it is written
+        chunks = iter_decrypted_file(doc.filepath)
+    except RuntimeError as e:
+        errors.append(f"{path}: {e}")
+        return None
+
+    method = STORED if (doc.file_type or "").lower() in _STORED_TYPES else DEFLATED
+    return ZipMember(path, doc.updated_at or doc.created_at, chunks, method)
+
+
+def _folder_paths(root: Folder, prefix: str, used: Set[str]) -> Dict[int, str]:
+    """ folder id -> "Root/Sub/" for the non-deleted subtree of root """
+    paths = {root.id: prefix + _unique(_safe(root.name), used) + "/"}
+    children_used: Dict[int, Set[str]] = {root.id: set()}
+
+    # Parents come first; deleted folders hide their whole subtree
+    for folder in root.all_descendants():
+        if folder.is_deleted or folder.parent_id not in paths:
+            continue
+        name = _unique(_safe(folder.name), children_used[folder.parent_id])
+        paths[folder.id] = paths[folder.parent_id] + name + "/"
+        children_used[folder.id] = set()
+
+    return paths
+
+
+def export_members(folders: Iterable[Folder], document_ids: Iterable[int]) -> Iterator[ZipMember]:
+    """
+    ZIP members for a selection: each folder as a top-level directory
+    with its subtree, the documents at the top level. Files that can't
+    be read are listed in _export_errors.txt instead.
+    """
+    batch_size = current_app.config.get("EXPORT_BATCH_SIZE", 200)
+    top_used = {ERRORS_NAME.lower()}
+    errors: List[str] = []
+
+    for root in folders:
+        paths = _folder_paths(root, "", top_used)
+        for folder_id, path in paths.items():
+            yield ZipMember(path, None, None)
+
+        used = {folder_id: set() for folder_id in paths}
+        for doc in _iter_documents(Document.folder_id.in_(list(paths)), batch_size):
+            name = _unique(_safe(doc.filename), used[doc.folder_id])
+            member = _document_member(doc, paths[doc.folder_id] + name, errors)
+            if member:
+                yield member
+
+    document_ids = list(document_ids)
+    if document_ids:
+        for doc in _iter_documents(Document.id.in_(document_ids), batch_size):
+            member = _document_member(doc, _unique(_safe(doc.filename), top_used), errors)
+            if member:
+                yield member
+
+    if errors:
+        yield ZipMember(ERRORS_NAME, None, ["\n".join(errors).encode("utf-8") + b"\n"])
+
+
+def export_zip(folders: Iterable[Folder], document_ids: Iterable[int]) -> Iterator[bytes]:
+    return stream_zip(
+        export_members(folders, document_ids),
+        compress_level=current_app.config.get("EXPORT_ZIP_COMPRESSION", 6)
+    )
+
+
+def export_response(folders: Iterable[Folder], document_ids: Iterable[int], filename: str) -> Response:
+    """ Streamed ZIP download (no Content-Length: the size isn't known up front) """
+    response = Response(
+        stream_with_context(export_zip(folders, document_ids)),
+        mimetype="application/zip",
+        direct_passthrough=True
+    )
+    response.headers.set("Content-Disposition", "attachment", filename=filename)
+    return response
@@ -0,0 +1,357 @@
+from datetime import datetime
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, select
+
+from ..extensions import db
+from ..models import Document, Folder, FolderClosure
+from ..models.folder_tree import remove_nodes
+from .dashboard_service import track_bulk_delete_state, track_bulk_folder_change
+from .activity_service import log_activity
+from .blob_service import release_document_blobs
+from .document_service import copy_document_row
+from .job_service import JobCancelled, job_handler
+
+
+# ======================================================
+# SUBTREE LOOKUP
+# ======================================================
+def subtree_ids_of(root_ids: Iterable[int]):
+    """
+    SELECT of every folder id under (and including) the given roots.
+    One closure-table query, whatever the depth.
+    """
+    return (
+        select(FolderClosure.descendant_id)
+        .where(FolderClosure.ancestor_id.in_(list(root_ids)))
+        .distinct()
+    )
+
+
+# ======================================================
+# SOFT DELETE / RESTORE (RECYCLE BIN)
+# ======================================================
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _chunk_size() -> int:
+    return current_app.config.get("FOLDER_BULK_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def _set_subtree_state(root_ids: Iterable[int], values: dict) -> Tuple[int, int]:
+    """
+    Apply is_deleted / deleted_at `values` to the folders of the subtrees
+    and every document inside them.
+
+    Rows are updated by primary key in chunks, so no single statement
+    locks a huge range, and no ORM objects are loaded. The caller commits:
+    all chunks land in one transaction. Returns (folders, documents).
+    """
+    root_ids = list(root_ids)
+    if not root_ids:
+        return 0, 0
+
+    chunk = _chunk_size()
+    folder_ids = db.session.execute(subtree_ids_of(root_ids)).scalars().all()
+
+    track_bulk_folder_change(folder_ids)
+
+    folders = 0
+    for i in range(0, len(folder_ids), chunk):
+        folders += Folder.query.filter(
+            Folder.id.in_(folder_ids[i:i + chunk])
+        ).update(
+            {getattr(Folder, k): v for k, v in values.items()},
+            synchronize_session=False
+        )
+
+    # Documents: keyset over the id, inside the subtree's folders
+    documents = 0
+    last_id = 0
+    while True:
+        doc_ids = db.session.execute(
+            select(Document.id)
+            .where(
+                Document.folder_id.in_(subtree_ids_of(root_ids)),
+                Document.id > last_id
+            )
+            .order_by(Document.id)
+            .limit(chunk)
+        ).scalars().all()
+        if not doc_ids:
+            break
+
+        if "is_deleted" in values:
+            track_bulk_delete_state(Document.id.in_(doc_ids), values["is_deleted"])
+
+        documents += Document.query.filter(Document.id.in_(doc_ids)).update(
+            {getattr(Document, k): v for k, v in values.items()},
+            synchronize_session=False
+        )
+        last_id = doc_ids[-1]
+
+    # Loaded instances (e.g. the folder of the request) are stale now
+    db.session.expire_all()
+
+    return folders, documents
+
+
+def soft_delete_subtrees(root_ids: Iterable[int], now: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Bin folders, their subfolders and every document inside them.
+    Everything gets the same deleted_at, so one bin action can be told
+    apart from the next.
+    """
+    return _set_subtree_state(
+        root_ids,
+        {"is_deleted": True, "deleted_at": now or datetime.utcnow()}
+    )
+
+
+def restore_subtrees(root_ids: Iterable[int]) -> Tuple[int, int]:
+    return _set_subtree_state(root_ids, {"is_deleted": False, "deleted_at": None})
+
+
+# ======================================================
+# PERMANENT DELETE
+# ======================================================
+def hard_delete_subtrees(root_ids: Iterable[int]) -> int:
+    """
+    Permanently delete folders, subfolders and their documents.
+    Child rows (versions, comments, shares, index rows) go with the
+    FK cascades; files are removed later by `flask storage gc`.
+    Returns the number of folders deleted.
+    """
+    root_ids = list(root_ids)
+    if not root_ids:
+        return 0
+
+    # Materialized first: the closure rows vanish with the folders
+    ids = db.session.execute(subtree_ids_of(root_ids)).scalars().all()
+    if not ids:
+        return 0
+
+    # Documents first, otherwise ON DELETE SET NULL would move them to root
+    track_bulk_delete_state(Document.folder_id.in_(ids), True)
+    track_bulk_folder_change(ids)
+    release_document_blobs(Document.folder_id.in_(ids))
+    Document.query.filter(Document.folder_id.in_(ids)).delete(
+        synchronize_session=False
+    )
+    remove_nodes(db.session.connection(), ids)
+    deleted = Folder.query.filter(Folder.id.in_(ids)).delete(
+        synchronize_session=False
+    )
+
+    return deleted
+
+
+# ======================================================
+# COPY
+# ======================================================
+class CloneResult(NamedTuple):
+    folder: Folder
+    failed: List[int]  # ids of source documents that weren't copied
+
+
+def clone_subtree(
+    folder: Folder,
+    parent_id: Optional[int],
+    user_id: int,
+    state: Optional[dict] = None,
+    step: Optional[Callable[[int, dict], None]] = None,
+) -> "CloneResult":
+    """
+    Copy a folder with its (non-deleted) subfolders and documents.
+    Copies are metadata-only and share the originals' encrypted blobs.
+    Documents that fail to copy are logged, skipped and returned.
+
+    Documents are read in keyset batches. `step(done, state)` is called
+    after each copied document and may commit (job checkpoints); passing
+    the last committed `state` back resumes the copy right after it.
+    """
+    batch_size = current_app.config.get("JOB_CHECKPOINT_SIZE", 100)
+
+    # Plain tuples: ORM rows would expire at every checkpoint commit
+    sources = [
+        (f.id, f.parent_id, f.name, f.is_deleted)
+        for f in [folder] + folder.all_descendants()
+    ]
+    root_id = sources[0][0]
+
+    state = state or {}
+    new_ids = {int(k): v for k, v in state.get("new_ids", {}).items()}  # old id -> new id
+    finished = set(state.get("finished", []))
+    last_doc = state.get("last_doc", 0)  # last copied document of the current folder
+    done = state.get("done", 0)
+    failed = list(state.get("failed", []))  # documents that couldn't be copied
+
+    def _state():
+        return {
+            "new_ids": {str(k): v for k, v in new_ids.items()},  # JSON keys
+            "finished": sorted(finished),
+            "last_doc": last_doc,
+            "done": done,
+            "failed": list(failed),
+        }
+
+    # Parents always come first
+    for source_id, source_parent, name, is_deleted in sources:
+        if source_id in finished:
+            continue
+
+        if source_id == root_id:
+            target_parent = parent_id
+            name = f"{name} (copy)" if parent_id == source_parent else name
+        else:
+            # Skip deleted folders and everything below them
+            if is_deleted or source_parent not in new_ids:
+                continue
+            target_parent = new_ids[source_parent]
+
+        if source_id not in new_ids:
+            new_folder = Folder(name=name, created_by=user_id, parent_id=target_parent)
+            db.session.add(new_folder)
+            db.session.flush()  # new id for children + documents
+            new_ids[source_id] = new_folder.id
+
+        while True:
+            docs = (
+                Document.query
+                .filter(
+                    Document.folder_id == source_id,
+                    Document.is_deleted == False,
+                    Document.id > last_doc
+                )
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not docs:
+                break
+
+            for doc in docs:
+                doc_id = doc.id
+                try:
+                    copy_document_row(
+                        doc,
+                        user_id=user_id,  # The copier becomes the owner of the copy
+                        folder_id=new_ids[source_id],
+                        is_active=doc.is_active
+                    )
+                except Exception as e:
+                    # Continue cloning other files even if one fails
+                    current_app.logger.error(f"Error cloning document {doc_id}: {e}")
+                    failed.append(doc_id)
+
+                last_doc = doc_id
+                done += 1
+                if step:
+                    step(done, _state())
+
+        finished.add(source_id)
+        last_doc = 0
+
+    return CloneResult(db.session.get(Folder, new_ids[root_id]), failed)
+
+
+@job_handler("folder_copy")
+def copy_folder_job(job, ctx) -> dict:
+    """ Background folder copy; params {"folder_id", "parent_id"} """
+    folder = db.session.get(Folder, job.params["folder_id"])
+    if folder is None or folder.is_deleted:
+        raise ValueError("The folder no longer exists")
+
+    if job.progress_total is None:
+        job.progress_total = (
+            db.session.query(func.count(Document.id))
+            .filter(
+                Document.folder_id.in_(subtree_ids_of([folder.id])),
+                Document.is_deleted.is_(False)
+            )
+            .scalar()
+        )
+
+    try:
+        copy, failed = clone_subtree(
+            folder, job.params.get("parent_id"), job.user_id,
+            state=job.checkpoint, step=ctx.step
+        )
+    except JobCancelled:
+        # The part copied so far goes to the recycle bin
+        db.session.rollback()
+        copied_root = ((job.checkpoint or {}).get("new_ids") or {}).get(str(folder.id))
+        if copied_root:
+            soft_delete_subtrees([copied_root])
+            db.session.commit()
+        raise
+
+    log_activity(
+        action="folder_copy",
+        document_id=None,
+        details=f"Copied folder '{folder.name}'"
+        + (f" ({len(failed)} documents failed)" if failed else ""),
+        user_id=job.user_id
+    )
+
+    return {"folder_id": copy.id, "failed": len(failed), "failed_ids": failed[:100]}
+
+
+# ======================================================
+# CLOSURE TABLE MAINTENANCE
+# ======================================================
+def rebuild_folder_tree() -> int:
+    """
+    Recompute the whole closure table from folders.parent_id,
+    one INSERT ... SELECT per tree level. Returns the row count.
+    """
+    closure = FolderClosure.__table__
+    folders = Folder.__table__
+
+    db.session.execute(closure.delete())
+    db.session.execute(
+        insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                folders.c.id.label("ancestor_id"),
+                folders.c.id.label("descendant_id"),
+                literal(0)
+            )
+        )
+    )
+
+    depth = 0
+    while True:
+        # Extend every path of length `depth` by one child
+        added = db.session.execute(
+            insert(closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(closure.c.ancestor_id, folders.c.id, literal(depth + 1))
+                .select_from(
+                    closure.join(folders, folders.c.parent_id == closure.c.descendant_id)
+                )
+                .where(closure.c.depth == depth)
+            )
+        ).rowcount
+        if not added:
+            break
+        depth += 1
+
+    db.session.commit()
+
+    return db.session.query(func.count()).select_from(closure).scalar()
+
+
+def ensure_folder_tree() -> None:
+    """ Backfill the closure table when it is missing folders (first run) """
+    folders = db.session.query(func.count(Folder.id)).scalar()
+    nodes = (
+        db.session.query(func.count())
+        .select_from(FolderClosure)
+        .filter(FolderClosure.depth == 0)
+        .scalar()
+    )
+
+    if folders != nodes:
+        rebuild_folder_tree()
@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, exists, func, or_, select
+
+from ..extensions import db
+from ..models import Document, DocumentVersion, StoredBlob, StorageSweep
+from .blob_service import acquire_blobs
+from .job_service import held_blobs
+
+
+# ======================================================
+# DEFAULTS
+# ======================================================
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+DEFAULT_GRACE_SECONDS = 3600
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+# ======================================================
+# STEP 1: BLOB REFERENCE COUNTS
+# ======================================================
+def _unreferenced_blob_filter(cutoff: datetime, held: Iterable[int]):
+    """
+    No row or unfinished job (`held`) points at the blob, and it wasn't
+    created / reused after `cutoff`: a blob returned by store_blob()
+    has no references until the upload's transaction commits its rows.
+    """
+    return and_(
+        ~exists().where(Document.blob_id == StoredBlob.id),
+        ~exists().where(DocumentVersion.blob_id == StoredBlob.id),
+        StoredBlob.id.notin_(list(held)),
+        StoredBlob.created_at < cutoff,
+        or_(StoredBlob.last_used_at.is_(None), StoredBlob.last_used_at < cutoff),
+    )
+
+
+def _reconcile_blobs(dry_run: bool, grace_seconds: int) -> int:
+    """
+    Correct drift in the blob reference counts (rows removed by
+    database cascades bypass release_document_blobs) and drop blobs
+    nobody uses. Returns the number of blob rows removed (or
+    removable, on dry run).
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    held = held_blobs()  # e.g. the archive of a running ZIP import
+
+    if dry_run:
+        return (
+            db.session.query(func.count(StoredBlob.id))
+            .filter(_unreferenced_blob_filter(cutoff, held))
+            .scalar()
+        )
+
+    doc_refs = (
+        select(func.count(Document.id))
+        .where(Document.blob_id == StoredBlob.id)
+        .scalar_subquery()
+    )
+    version_refs = (
+        select(func.count(DocumentVersion.id))
+        .where(DocumentVersion.blob_id == StoredBlob.id)
+        .scalar_subquery()
+    )
+
+    db.session.query(StoredBlob).update(
+        {StoredBlob.ref_count: doc_refs + version_refs},
+        synchronize_session=False
+    )
+    acquire_blobs(held)
+
+    # Re-checked at delete time, so a concurrent copy can't lose its blob
+    removed = (
+        db.session.query(StoredBlob)
+        .filter(_unreferenced_blob_filter(cutoff, held))
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return removed
+
+
+# ======================================================
+# STEP 2: DIFF DISK AGAINST DB
+# ======================================================
+def _referenced_paths(batch_size: int) -> Set[str]:
+    """
+    Every filepath still referenced by a row, loaded in batches.
+    """
+    paths = set()
+
+    for column in (Document.filepath, DocumentVersion.filepath, StoredBlob.filepath):
+        rows = db.session.query(column).execution_options(yield_per=batch_size)
+        for (path,) in rows:
+            if path:
+                paths.add(_norm(path))
+
+    return paths
+
+
+def _scan_upload_folder(upload_folder: str) -> Iterator[os.DirEntry]:
+    if not os.path.isdir(upload_folder):
+        return
+
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def _find_orphans(
+    upload_folder: str,
+    referenced: Set[str],
+    grace_seconds: int
+) -> Tuple[List[Tuple[str, int]], int, int]:
+    """
+    Returns (orphans as (path, size), files_total, bytes_total).
+    Files younger than the grace period are never orphans: an upload
+    writes its file before its row is committed.
+    """
+    cutoff = time.time() - grace_seconds
+    orphans = []
+    files_total = 0
+    bytes_total = 0
+
+    for entry in _scan_upload_folder(upload_folder):
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+
+        files_total += 1
+        bytes_total += stat.st_size
+
+        if _norm(entry.path) in referenced or stat.st_mtime > cutoff:
+            continue
+
+        orphans.append((entry.path, stat.st_size))
+
+    return orphans, files_total, bytes_total
+
+
+# ======================================================
+# STEP 3: UNLINK (PARALLEL, RATE LIMITED)
+# ======================================================
+def _unlink(item: Tuple[str, int]) -> int:
+    path, size = item
+    try:
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except OSError:
+        return -1
+
+
+def _remove_orphans(
+    orphans: List[Tuple[str, int]],
+    batch_size: int,
+    workers: int,
+    max_per_second: Optional[float]
+) -> Tuple[int, int]:
+    removed = 0
+    reclaimed = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(orphans), batch_size):
+            batch = orphans[i:i + batch_size]
+            started = time.monotonic()
+
+            for size in pool.map(_unlink, batch):
+                if size >= 0:
+                    removed += 1
+                    reclaimed += size
+
+            # Rate limit: a batch may not go faster than max_per_second
+            if max_per_second:
+                budget = len(batch) / max_per_second
+                elapsed = time.monotonic() - started
+                if elapsed < budget:
+                    time.sleep(budget - elapsed)
+
+    return removed, reclaimed
+
+
+# ======================================================
+# PUBLIC: SWEEP
+# ======================================================
+def sweep_orphans(
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    max_per_second: Optional[float] = None,
+    grace_seconds: Optional[int] = None
+) -> StorageSweep:
+    """
+    Remove encrypted files under UPLOAD_FOLDER that no Document,
+    DocumentVersion or StoredBlob row references any more.
+    The result is stored as a StorageSweep row and returned.
+    """
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get(
+            "STORAGE_GC_GRACE_SECONDS", DEFAULT_GRACE_SECONDS
+        )
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    sweep = StorageSweep(dry_run=dry_run, started_at=datetime.utcnow())
+
+    sweep.blobs_removed = _reconcile_blobs(dry_run, grace_seconds)
+
+    referenced = _referenced_paths(batch_size)
+    orphans, files_total, bytes_total = _find_orphans(
+        upload_folder, referenced, grace_seconds
+    )
+    sweep.orphans_found = len(orphans)
+
+    if not dry_run and orphans:
+        removed, reclaimed = _remove_orphans(
+            orphans, batch_size, workers, max_per_second
+        )
+        sweep.orphans_removed = removed
+        sweep.bytes_reclaimed = reclaimed
+        files_total -= removed
+        bytes_total -= reclaimed
+
+    sweep.files_total = files_total
+    sweep.bytes_total = bytes_total
+    sweep.finished_at = datetime.utcnow()
+
+    db.session.add(sweep)
+    db.session.commit()
+
+    current_app.logger.info(
+        "Storage sweep: %s orphans found, %s removed, %s bytes reclaimed%s",
+        sweep.orphans_found, sweep.orphans_removed, sweep.bytes_reclaimed,
+        " (dry run)" if dry_run else ""
+    )
+
+    return sweep
+
+
+def latest_sweep() -> Optional[StorageSweep]:
+    return StorageSweep.query.order_by(StorageSweep.id.desc()).first()
+
+
+# ======================================================
+# BACKGROUND JOB
+# ======================================================
+def start_background_sweeper(app) -> Optional[threading.Thread]:
+    """
+    Run sweep_orphans() every STORAGE_GC_INTERVAL seconds in a daemon
+    thread. Disabled when the interval is 0 / unset.
+    """
+    interval = app.config.get("STORAGE_GC_INTERVAL") or 0
+    if interval <= 0:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    sweep_orphans(
+                        max_per_second=app.config.get("STORAGE_GC_RATE")
+                    )
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Storage sweep failed: {e}")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=_loop, name="storage-gc", daemon=True)
+    thread.start()
+    return thread
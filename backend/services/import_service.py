@@ -0,0 +1,477 @@
+import io
+import os
+import threading
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+
+from ..config import allowed_file
+from ..extensions import db
+from ..models import Document, DocumentVersion, Folder, StoredBlob, User
+from .activity_service import log_activity
+from .blob_service import (
+    acquire_blob, acquire_blobs, encrypt_blob,
+    register_blobs, release_blob, store_blob
+)
+from .content_index_service import index_documents_content_safely
+from .document_service import InvalidFileTypeError, validate_filename
+from .folder_service import soft_delete_subtrees
+from .job_service import JobCancelled, enqueue_job, job_handler
+from .notification_service import notify_user
+from .storage_service import FRAME_SIZE, iter_decrypted_file, plaintext_size, read_chunks
+
+# ======================================================
+# ZIP IMPORT (FOLDERS + DOCUMENTS)
+# ======================================================
+# An uploaded archive is stored like any other file (encrypted blob),
+# then a background job reads it in place:
+#
+#   - the central directory is checked against the member / size limits
+#     before anything is created
+#   - the folder hierarchy is created in one pass, level by level
+#   - members are encrypted in parallel (UPLOAD_WORKERS threads), and
+#     their blob / document / version rows written one batch per
+#     checkpoint, so an interrupted import resumes after the last batch
+#
+# The archive is never decrypted to disk: zipfile reads it through a
+# seekable reader that decrypts only the frames it touches.
+
+_SKIPPED_NAMES = {"__macosx", ".ds_store", "thumbs.db", "desktop.ini"}
+
+_MAX_NAME = 255  # folder / file name columns
+
+# Reported skip reasons kept in the job (the count is always exact)
+_MAX_REPORTED = 100
+
+DEFAULT_MAX_MEMBERS = 20000
+DEFAULT_MAX_MEMBER_SIZE = 512 * 1024 * 1024
+DEFAULT_MAX_TOTAL_SIZE = 20 * 1024 * 1024 * 1024
+
+
+class ArchiveError(Exception):
+    pass
+
+
+# ======================================================
+# SEEKABLE READER OVER AN ENCRYPTED FILE
+# ======================================================
+class _DecryptedReader(io.RawIOBase):
+    """
+    Read-only, seekable plaintext view of a framed encrypted file.
+    Reads decrypt the frames covering the requested span; the last
+    decrypted window is kept, so zipfile's small header reads don't
+    decrypt the same frame again and again.
+    """
+
+    def __init__(self, filepath: str, window: int = FRAME_SIZE):
+        size = plaintext_size(filepath)
+        if size is None:
+            raise ArchiveError("The archive is stored in a format that can't be read in place")
+
+        self.filepath = filepath
+        self.size = size
+        self.window = window
+        self._pos = 0
+        self._cache_start = 0
+        self._cache = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def _load(self, pos: int, length: int) -> None:
+        start = pos - pos % self.window
+        stop = min(self.size, max(pos + length, start + self.window))
+        self._cache = b"".join(iter_decrypted_file(self.filepath, start, stop))
+        self._cache_start = start
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        if self._pos >= end:
+            return b""
+
+        cache_end = self._cache_start + len(self._cache)
+        if not (self._cache_start <= self._pos and end <= cache_end):
+            self._load(self._pos, end - self._pos)
+
+        offset = self._pos - self._cache_start
+        data = self._cache[offset:offset + end - self._pos]
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _open_archive(filepath: str) -> zipfile.ZipFile:
+    try:
+        return zipfile.ZipFile(_DecryptedReader(filepath))
+    except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+        raise ArchiveError(f"Not a valid ZIP archive: {e}")
+
+
+# ======================================================
+# PLAN (CENTRAL DIRECTORY ONLY)
+# ======================================================
+class ImportMember(NamedTuple):
+    index: int          # position in the archive's infolist()
+    folder: str         # "a/b" ("" = the import root)
+    filename: str
+    ext: str
+    size: int
+
+
+def _split_path(name: str) -> List[str]:
+    """ Member path components, without empty / "." / ".." parts """
+    return [
+        part.strip() for part in name.replace("\\", "/").split("/")
+        if part.strip() not in ("", ".", "..")
+    ]
+
+
+def _is_skipped(parts: List[str]) -> bool:
+    """ OS metadata (__MACOSX/, .DS_Store, ...) and hidden entries """
+    return any(p.lower() in _SKIPPED_NAMES or p.startswith(".") for p in parts)
+
+
+class ImportPlan(NamedTuple):
+    root: Optional[str]         # the archive's single top-level folder, if any
+    folders: List[str]          # paths below the root, parents first
+    members: List[ImportMember]
+    skipped: List[str]          # reasons, one per skipped file
+
+
+def _strip_common_root(folders: set, members: List[ImportMember]) -> Tuple[Optional[str], set, List[ImportMember]]:
+    """
+    "Share.zip" holding "Share/..." becomes one folder "Share", not
+    "Share/Share": a single top-level folder is used as the import root.
+    """
+    tops = {path.split("/", 1)[0] for path in folders}
+    if len(tops) != 1 or any(m.folder == "" for m in members):
+        return None, folders, members
+
+    root = tops.pop()
+    prefix = root + "/"
+    return (
+        root,
+        {path[len(prefix):] for path in folders if path != root},
+        [m._replace(folder=m.folder[len(prefix):] if m.folder != root else "") for m in members],
+    )
+
+
+def plan_import(zf: zipfile.ZipFile) -> ImportPlan:
+    """
+    Folders, importable members and skip reasons, from the central
+    directory. Raises ArchiveError when the archive as a whole is over
+    IMPORT_MAX_MEMBERS / IMPORT_MAX_TOTAL_SIZE; members over
+    IMPORT_MAX_MEMBER_SIZE are skipped.
+
+    The declared sizes can be trusted: zipfile never returns more than
+    file_size bytes of a member and fails the CRC check if the data
+    doesn't match, so a "zip bomb" can't expand past its declared size.
+    """
+    config = current_app.config
+    max_members = config.get("IMPORT_MAX_MEMBERS", DEFAULT_MAX_MEMBERS)
+    max_member_size = config.get("IMPORT_MAX_MEMBER_SIZE", DEFAULT_MAX_MEMBER_SIZE)
+    max_total_size = config.get("IMPORT_MAX_TOTAL_SIZE", DEFAULT_MAX_TOTAL_SIZE)
+
+    folders = set()
+    members: List[ImportMember] = []
+    skipped: List[str] = []
+    total = 0
+
+    for index, info in enumerate(zf.infolist()):
+        parts = _split_path(info.filename)
+        if not parts or _is_skipped(parts):
+            continue
+
+        folder_parts = parts if info.is_dir() else parts[:-1]
+        for depth in range(1, len(folder_parts) + 1):
+            folders.add("/".join(folder_parts[:depth]))
+
+        if info.is_dir():
+            continue
+
+        filename = parts[-1]
+        if len(filename) > _MAX_NAME:
+            skipped.append(f"{info.filename}: file name is too long")
+            continue
+
+        try:
+            ext = validate_filename(filename)
+            if not allowed_file(filename):
+                raise InvalidFileTypeError(f"File type '.{ext}' is not allowed")
+        except InvalidFileTypeError as e:
+            skipped.append(f"{info.filename}: {e}")
+            continue
+
+        if info.flag_bits & 0x1:
+            skipped.append(f"{info.filename}: encrypted members are not supported")
+            continue
+
+        if max_member_size and info.file_size > max_member_size:
+            skipped.append(f"{info.filename}: larger than {max_member_size} bytes")
+            continue
+
+        members.append(ImportMember(index, "/".join(folder_parts), filename, ext, info.file_size))
+        total += info.file_size
+
+    if max_members and len(members) > max_members:
+        raise ArchiveError(f"The archive has {len(members)} files; at most {max_members} can be imported at once")
+    if max_total_size and total > max_total_size:
+        raise ArchiveError(f"The archive expands to {total} bytes; at most {max_total_size} can be imported at once")
+
+    root, folders, members = _strip_common_root(folders, members)
+
+    # Parents before children
+    return ImportPlan(root, sorted(folders, key=lambda p: (p.count("/"), p)), members, skipped)
+
+
+def _create_folders(root_name: str, parent_id: Optional[int], paths: List[str], user_id: int) -> Dict[str, int]:
+    """ The import root plus every folder path below it; one flush per level """
+    root = Folder(name=root_name[:_MAX_NAME], created_by=user_id, parent_id=parent_id)
+    db.session.add(root)
+    db.session.flush()
+
+    ids = {"": root.id}
+    level: List[Tuple[str, Folder]] = []
+    depth = 0
+
+    for path in paths + [None]:
+        if path is None or path.count("/") != depth:
+            db.session.add_all(f for _, f in level)
+            db.session.flush()
+            ids.update((p, f.id) for p, f in level)
+            level = []
+            if path is None:
+                break
+            depth = path.count("/")
+
+        parent, _, name = path.rpartition("/")
+        level.append((path, Folder(name=name[:_MAX_NAME], created_by=user_id, parent_id=ids[parent])))
+
+    return ids
+
+
+# ======================================================
+# MEMBERS -> DOCUMENTS
+# ======================================================
+def _iter_member(zf: zipfile.ZipFile, index: int, chunk_size: int) -> Iterator[bytes]:
+    with zf.open(zf.infolist()[index]) as member:
+        while True:
+            chunk = member.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _documents_for(user_id: int, members: List[ImportMember], blobs: List[StoredBlob], folder_ids: Dict[str, int]) -> List[Document]:
+    now = datetime.utcnow()
+    docs = [
+        Document(
+            title=os.path.splitext(m.filename)[0] or m.filename,
+            filename=m.filename,
+            stored_name=blob.stored_name,
+            filepath=blob.filepath,
+            blob_id=blob.id,
+            size_bytes=blob.size_bytes,
+            file_type=m.ext,
+            uploaded_by=user_id,
+            folder_id=folder_ids[m.folder],
+            version=1,
+            is_active=True,
+            status="uploaded",
+            created_at=now,
+        )
+        for m, blob in zip(members, blobs)
+    ]
+    db.session.add_all(docs)
+    db.session.flush()
+
+    db.session.add_all([
+        DocumentVersion(
+            document_id=doc.id,
+            version=1,
+            stored_name=doc.stored_name,
+            filepath=doc.filepath,
+            blob_id=doc.blob_id,
+            size_bytes=doc.size_bytes,
+        )
+        for doc in docs
+    ])
+
+    # document + version row per file
+    acquire_blobs(Counter(blob.id for blob in blobs for _ in range(2)))
+    return docs
+
+
+def start_zip_import(user: User, blob: StoredBlob, archive_name: str, parent_id: Optional[int] = None):
+    """
+    Queue the import of a stored archive below `parent_id`. The job
+    holds a reference on the archive blob until it finishes.
+    """
+    acquire_blob(blob)
+    return enqueue_job("zip_import", user, {
+        "blob_id": blob.id,
+        "archive_name": archive_name,
+        "parent_id": parent_id,
+    })
+
+
+def import_archive(user: User, file_storage: FileStorage, parent_id: Optional[int] = None):
+    """ Store an uploaded .zip (form upload) and queue its import """
+    if not file_storage or not file_storage.filename:
+        raise ArchiveError("No file selected")
+    if not file_storage.filename.lower().endswith(".zip"):
+        raise ArchiveError("Only .zip archives can be imported")
+
+    frame_size = current_app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+    blob = store_blob(read_chunks(file_storage.stream, frame_size), file_storage.filename)
+    return start_zip_import(user, blob, file_storage.filename, parent_id)
+
+
+@job_handler("zip_import")
+def zip_import_job(job, ctx) -> dict:
+    """ Background ZIP import; params {"blob_id", "archive_name", "parent_id"} """
+    app = current_app._get_current_object()
+    params = job.params
+    archive = db.session.get(StoredBlob, params["blob_id"])
+    if archive is None:
+        raise ArchiveError("The archive is no longer stored")
+
+    try:
+        result = _run_import(app, job, ctx, archive.filepath)
+    except JobCancelled:
+        # The part imported so far goes to the recycle bin
+        db.session.rollback()
+        root_id = ((job.checkpoint or {}).get("folder_ids") or {}).get("")
+        if root_id:
+            soft_delete_subtrees([root_id])
+        release_blob(params["blob_id"])
+        db.session.commit()
+        raise
+    except Exception:
+        db.session.rollback()
+        release_blob(params["blob_id"])
+        db.session.commit()
+        raise
+
+    release_blob(params["blob_id"])
+    db.session.commit()
+
+    log_activity(
+        action="zip_import",
+        document_id=None,
+        details=f"Imported {result['imported']} documents from '{params['archive_name']}'",
+        user_id=job.user_id
+    )
+    notify_user(
+        db.session.get(User, job.user_id),
+        f"Import of '{params['archive_name']}' finished: {result['imported']} documents"
+        + (f", {result['skipped']} files skipped." if result["skipped"] else ".")
+    )
+    return result
+
+
+def _snapshot(state: dict) -> dict:
+    """ Copy for Job.checkpoint: a JSON value changed in place isn't saved """
+    return {**state, "errors": list(state["errors"])}
+
+
+def _run_import(app, job, ctx, archive_path: str) -> dict:
+    frame_size = app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+
+    with _open_archive(archive_path) as zf:
+        plan = plan_import(zf)
+    members = plan.members
+
+    if job.checkpoint is None:
+        archive_name = job.params["archive_name"]
+        folder_ids = _create_folders(
+            plan.root or os.path.splitext(archive_name)[0] or archive_name,
+            job.params.get("parent_id"), plan.folders, job.user_id
+        )
+        state = {
+            "folder_ids": folder_ids,
+            "next": 0,
+            "imported": 0,
+            "skipped": len(plan.skipped),
+            "errors": plan.skipped[:_MAX_REPORTED],
+        }
+        job.progress_total = len(members)
+        ctx.checkpoint(0, _snapshot(state))
+    else:
+        state = _snapshot(job.checkpoint)
+
+    folder_ids = state["folder_ids"]
+
+    # Each worker thread reads through its own ZipFile: one file position each
+    local = threading.local()
+    opened = []
+
+    def _encrypt(member: ImportMember):
+        with app.app_context():
+            if not hasattr(local, "zf"):
+                local.zf = _open_archive(archive_path)
+                opened.append(local.zf)
+            return encrypt_blob(_iter_member(local.zf, member.index, frame_size), member.filename)
+
+    workers = max(app.config.get("UPLOAD_WORKERS", 4), 1)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-import") as pool:
+            while state["next"] < len(members):
+                batch = members[state["next"]:state["next"] + ctx.batch]
+                futures = [pool.submit(_encrypt, m) for m in batch]
+
+                encrypted = []
+                for member, future in zip(batch, futures):
+                    try:
+                        encrypted.append((member, future.result()))
+                    except Exception as e:
+                        app.logger.error(f"Importing '{member.filename}' failed: {e}")
+                        state["skipped"] += 1
+                        if len(state["errors"]) < _MAX_REPORTED:
+                            state["errors"].append(f"{member.folder}/{member.filename}".lstrip("/") + ": could not be read")
+
+                docs = []
+                if encrypted:
+                    blobs = register_blobs([f for _, f in encrypted])
+                    docs = _documents_for(job.user_id, [m for m, _ in encrypted], blobs, folder_ids)
+
+                state["next"] += len(batch)
+                state["imported"] += len(docs)
+                ctx.checkpoint(state["next"], _snapshot(state))
+
+                index_documents_content_safely(docs)
+    finally:
+        for zf in opened:
+            zf.close()
+
+    return {
+        "folder_id": folder_ids[""],
+        "imported": state["imported"],
+        "skipped": state["skipped"],
+        "errors": state["errors"],
+    }
@@ -0,0 +1,289 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import update
+
+from ..extensions import db
+from ..models import Job, User
+
+# ======================================================
+# BACKGROUND JOBS
+# ======================================================
+# Heavy operations are queued as rows in `jobs` and run by worker
+# threads (JOB_WORKERS per process), outside any HTTP request. Workers
+# claim a job with a conditional UPDATE, so several processes can share
+# the table. A handler commits its work through JobContext.checkpoint(),
+# which also records progress / resume state and notices cancellation.
+
+FINISHED = ("done", "failed", "cancelled")
+
+_HANDLERS: Dict[str, Callable] = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(kind: str):
+    """
+    Register `fn(job, ctx) -> result` for jobs of `kind`. The returned
+    value (JSON) is stored as the job's result.
+    """
+    def register(fn):
+        _HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class JobContext:
+    """ Passed to handlers: checkpoint commits and when to make them """
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.batch = current_app.config.get("JOB_CHECKPOINT_SIZE", 100)
+        self.interval = current_app.config.get("JOB_CHECKPOINT_SECONDS", 30)
+        self._last_done = job.progress_done
+        self._last_at = time.monotonic()
+
+    def checkpoint(self, done: int, state: Optional[dict] = None) -> None:
+        """
+        Commit everything done so far with the progress and the state a
+        restarted job resumes from; raise JobCancelled if cancellation
+        was requested meanwhile.
+        """
+        self.job.progress_done = done
+        self.job.checkpoint = state
+        self.job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+        self._last_done = done
+        self._last_at = time.monotonic()
+
+        cancelled = (
+            db.session.query(Job.cancel_requested)
+            .filter(Job.id == self.job.id)
+            .scalar()
+        )
+        if cancelled:
+            raise JobCancelled()
+
+    def step(self, done: int, state: Optional[dict] = None) -> None:
+        """ checkpoint() every JOB_CHECKPOINT_SIZE items or JOB_CHECKPOINT_SECONDS """
+        if (
+            done - self._last_done >= self.batch
+            or time.monotonic() - self._last_at >= self.interval
+        ):
+            self.checkpoint(done, state)
+
+
+# ======================================================
+# QUEUE
+# ======================================================
+def enqueue_job(kind: str, user: User, params: dict, total: Optional[int] = None) -> Job:
+    if kind not in _HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+
+    job = Job(kind=kind, user_id=user.id, params=params, progress_total=total)
+    db.session.add(job)
+    db.session.commit()
+
+    workers = current_app.extensions.get("job_workers")
+    if workers is not None and current_app.config.get("JOB_WORKERS"):
+        workers.wake()
+
+    return job
+
+
+def held_blobs() -> Counter:
+    """
+    Blob references held by unfinished jobs ({blob id: jobs}), from
+    params["blob_id"]. The GC counts them like document rows.
+    """
+    held = Counter()
+    for (params,) in db.session.query(Job.params).filter(Job.status.notin_(FINISHED)):
+        blob_id = (params or {}).get("blob_id")
+        if blob_id:
+            held[blob_id] += 1
+    return held
+
+
+def cancel_job(job: Job) -> None:
+    """ Queued jobs stop at once, running ones at their next checkpoint """
+    if job.status == "queued":
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "queued")
+            .values(status="cancelled", cancel_requested=True, finished_at=datetime.utcnow())
+        )
+    elif job.status == "running":
+        job.cancel_requested = True
+    db.session.commit()
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress_done": job.progress_done,
+        "progress_total": job.progress_total,
+        "result": job.result,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _requeue_stale() -> int:
+    """ Running jobs whose worker died (no heartbeat) go back to the queue """
+    stale = current_app.config.get("JOB_STALE_SECONDS", 300)
+    cutoff = datetime.utcnow() - timedelta(seconds=stale)
+
+    requeued = db.session.execute(
+        update(Job)
+        .where(Job.status == "running", Job.heartbeat_at < cutoff)
+        .values(status="queued")
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+def _claim_next(worker: str) -> Optional[int]:
+    candidates = (
+        db.session.query(Job.id)
+        .filter(Job.status == "queued")
+        .order_by(Job.id)
+        .limit(10)
+        .all()
+    )
+
+    now = datetime.utcnow()
+    for (job_id,) in candidates:
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+
+        if claimed:
+            current_app.logger.info("Job %s claimed by %s", job_id, worker)
+            return job_id
+
+    return None
+
+
+def run_job(job_id: int) -> Job:
+    """ Run a claimed (status running) job to its end """
+    job = db.session.get(Job, job_id)
+    job.started_at = job.started_at or datetime.utcnow()
+    db.session.commit()
+
+    try:
+        job.result = _HANDLERS[job.kind](job, JobContext(job))
+        job.status = "done"
+        if job.progress_total is not None:
+            job.progress_done = job.progress_total
+
+    except JobCancelled:
+        db.session.rollback()
+        job.status = "cancelled"
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Job {job_id} ({job.kind}) failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def run_pending_jobs(worker: str = "inline") -> int:
+    """ Run queued jobs in this thread until the queue is empty """
+    _requeue_stale()
+
+    count = 0
+    while True:
+        job_id = _claim_next(worker)
+        if job_id is None:
+            return count
+        run_job(job_id)
+        db.session.expunge_all()
+        count += 1
+
+
+# ======================================================
+# WORKER THREADS
+# ======================================================
+class JobWorkers:
+    """
+    Daemon threads polling the job table every JOB_POLL_INTERVAL
+    seconds, or at once when a job is queued from this process.
+    Started on the first enqueue, or at app start if jobs are waiting.
+    """
+
+    def __init__(self, app: Flask, count: int, poll_interval: float):
+        self.app = app
+        self.count = count
+        self.poll_interval = poll_interval
+        self.threads = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.threads:
+                return
+            for i in range(self.count):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def wake(self) -> None:
+        self.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        name = f"{os.getpid()}:{threading.current_thread().name}"
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+            with self.app.app_context():
+                try:
+                    run_pending_jobs(name)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f"Job worker error: {e}")
+                finally:
+                    db.session.remove()
+
+
+def init_job_workers(app: Flask) -> Optional[JobWorkers]:
+    """
+    Set up the job workers (JOB_WORKERS threads; 0 = jobs only run via
+    `flask jobs run`). Workers start right away when jobs are waiting,
+    e.g. ones interrupted by the last shutdown.
+    """
+    count = app.config.get("JOB_WORKERS") or 0
+    if count <= 0:
+        return None
+
+    workers = app.extensions["job_workers"] = JobWorkers(
+        app, count, app.config.get("JOB_POLL_INTERVAL", 2)
+    )
+
+    with app.app_context():
+        waiting = db.session.query(Job.id).filter(Job.status.in_(("queued", "running"))).first()
+    if waiting is not None:
+        workers.start()
+
+    return workers
@@ -1,24 +1,218 @@
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Union
+
 from flask import current_app
+from sqlalchemy import insert
+
 from ..extensions import db
 from ..models import Notification, User
+from ..models.notification import IST
+from .cache import LocalCache
 
+DEFAULT_COALESCE_SECONDS = 600
 
-def notify_user(user: User, message: str) -> None:
+# Bell dropdown size
+RECENT_LIMIT = 10
+
+
+# ======================================================
+# UNREAD CACHE (BELL + BADGE)
+# ======================================================
+# Every rendered page shows the unread count and latest unread
+# messages. They are cached per user (plain dicts, never ORM objects)
+# and dropped whenever that user's notifications change; the TTL bounds
+# staleness across processes when the local cache is used.
+def set_unread_cache(app, backend) -> None:
+    """ Swap in a shared backend (get / set / delete, like LocalCache) """
+    app.extensions["notification_cache"] = backend
+
+
+def _cache():
+    cache = current_app.extensions.get("notification_cache")
+    if cache is None:
+        cache = current_app.extensions["notification_cache"] = LocalCache(
+            maxsize=current_app.config.get("NOTIFICATION_CACHE_SIZE", 4096),
+            ttl=current_app.config.get("NOTIFICATION_CACHE_TTL", 30)
+        )
+    return cache
+
+
+def _cache_key(user_id: int) -> str:
+    return f"notifications:unread:{user_id}"
+
+
+def unread_summary(user_id: int) -> dict:
     """
-    Create a notification for a user.
+    {"count": unread total, "recent": latest RECENT_LIMIT unread as dicts}
     """
+    key = _cache_key(user_id)
+    summary = _cache().get(key)
+    if summary is not None:
+        return summary
 
-    if not user:
-        return
+    unread = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.is_read.is_(False)
+    )
+    recent = unread.order_by(Notification.created_at.desc()).limit(RECENT_LIMIT).all()
+
+    # A short first page is the whole list: no COUNT needed
+    count = len(recent) if len(recent) < RECENT_LIMIT else unread.count()
+
+    summary = {
+        "count": count,
+        "recent": [
+            {
+                "id": n.id,
+                "message": n.message,
+                "repeat_count": n.repeat_count,
+                "created_at": n.created_at,
+            }
+            for n in recent
+        ],
+    }
+    _cache().set(key, summary)
+    return summary
+
+
+def invalidate_unread(user_ids: Iterable[int]) -> None:
+    cache = _cache()
+    for user_id in user_ids:
+        cache.delete(_cache_key(user_id))
+
+
+
+# ======================================================
+# PUSH CHANNEL (IN-PROCESS PUB/SUB)
+# ======================================================
+class NotificationBroker:
+    """
+    Wakes the open notification streams of a user. Messages only say
+    "look again" (plus ids of coalesced rows that changed); the stream
+    reads the rows themselves, so a full or missed queue loses nothing.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> queue.Queue:
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(q)
+        return q
+
+    def unsubscribe(self, user_id: int, q: queue.Queue) -> None:
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids: Iterable[int], updated: Optional[dict] = None) -> None:
+        """ updated: {user_id: notification id bumped by coalescing} """
+        updated = updated or {}
+        with self._lock:
+            targets = [(uid, list(self._subscribers.get(uid, ()))) for uid in user_ids]
 
+        for user_id, subs in targets:
+            for q in subs:
+                try:
+                    q.put_nowait(updated.get(user_id))
+                except queue.Full:
+                    pass  # the stream re-reads the table anyway
+
+    def connections(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+broker = NotificationBroker()
+
+
+def _user_ids(users: Iterable[Union[User, int]]) -> list:
+    """ Unique ids, order kept; accepts User objects or plain ids """
+    ids = (u if isinstance(u, int) else getattr(u, "id", None) for u in users)
+    return list(dict.fromkeys(i for i in ids if i is not None))
+
+
+def notify_many(users: Iterable[Union[User, int]], message: str) -> int:
+    """
+    Notify many users with one commit.
+
+    A user who already has the same unread message from within
+    NOTIFICATION_COALESCE_SECONDS gets that row bumped (repeat_count + 1,
+    moved to the top) instead of a new one. Everyone else gets a row
+    from a single multi-row INSERT. Returns the number of new rows.
+    """
     if not current_app.config.get("ENABLE_NOTIFICATIONS", True):
-        return
+        return 0
 
-    note = Notification(
-        user_id=user.id,
-        message=message,
-        is_read=False
-    )
+    user_ids = _user_ids(users)
+    if not user_ids:
+        return 0
+
+    message = message[:255]
+    now = datetime.now(IST)
+    window = current_app.config.get("NOTIFICATION_COALESCE_SECONDS", DEFAULT_COALESCE_SECONDS)
+
+    coalesced = {}
+    if window:
+        rows = (
+            db.session.query(Notification.id, Notification.user_id)
+            .filter(
+                Notification.user_id.in_(user_ids),
+                Notification.is_read.is_(False),
+                Notification.message == message,
+                Notification.created_at >= now - timedelta(seconds=window)
+            )
+            .order_by(Notification.created_at.desc())
+            .all()
+        )
+        for note_id, user_id in rows:
+            coalesced.setdefault(user_id, note_id)  # newest per user
+
+    if coalesced:
+        Notification.query.filter(Notification.id.in_(list(coalesced.values()))).update(
+            {
+                Notification.repeat_count: Notification.repeat_count + 1,
+                Notification.created_at: now,
+            },
+            synchronize_session=False
+        )
+
+    new_rows = [
+        {
+            "user_id": user_id,
+            "message": message,
+            "repeat_count": 1,
+            "is_read": False,
+            "created_at": now,
+        }
+        for user_id in user_ids
+        if user_id not in coalesced
+    ]
+    if new_rows:
+        db.session.execute(insert(Notification), new_rows)
 
-    db.session.add(note)
     db.session.commit()
+    invalidate_unread(user_ids)
+    broker.publish(user_ids, updated=coalesced)
+
+    return len(new_rows)
+
+
+def notify_user(user: User, message: str) -> None:
+    """
+    Create a notification for a user.
+    """
+
+    if not user:
+        return
+
+    notify_many([user], message)
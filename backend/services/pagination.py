@@ -0,0 +1,133 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from flask import abort, current_app, jsonify, make_response, request, url_for
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+# ======================================================
+# CURSORS
+# ======================================================
+# A cursor is the (sort value, id) of the last row of the previous page,
+# as url-safe base64 JSON. Clients must treat it as opaque.
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+# ======================================================
+# PAGINATE
+# ======================================================
+def page_size(requested: Optional[int] = None) -> int:
+    """ Requested size clamped to 1..MAX_PAGE_SIZE, else PAGE_SIZE """
+    default = current_app.config.get("PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    maximum = current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE)
+
+    if not requested or requested < 1:
+        return default
+    return min(requested, maximum)
+
+
+def paginate(query, sort_column, id_column, cursor: Optional[str] = None, per_page: Optional[int] = None) -> Page:
+    """
+    Keyset pagination, newest first: rows strictly after the cursor in
+    (sort_column DESC, id_column DESC) order. No OFFSET, so page 1000
+    costs the same index range scan as page 1.
+
+    sort_column must be NOT NULL and should not change once written
+    (created_at), otherwise rows can move between pages.
+    """
+    per_page = page_size(per_page)
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    # One extra row tells whether another page exists
+    rows = (
+        query
+        .order_by(sort_column.desc(), id_column.desc())
+        .limit(per_page + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+
+    return Page(rows, next_cursor)
+
+
+def request_page(query, sort_column, id_column) -> Page:
+    """ paginate() with ?cursor= and ?per_page= from the current request """
+    try:
+        return paginate(
+            query,
+            sort_column,
+            id_column,
+            cursor=request.args.get("cursor") or None,
+            per_page=request.args.get("per_page", type=int)
+        )
+    except InvalidCursorError:
+        # Same error shape as the JSON API's other 400s
+        if request.blueprint == "api" or wants_json():
+            abort(make_response(jsonify(success=False, error="Invalid cursor"), 400))
+        abort(400, description="Invalid cursor")
+
+
+def pager_links(page: Page) -> dict:
+    """
+    URLs for the pager component: same endpoint and filters,
+    with the next cursor / without any cursor.
+    """
+    args = {**request.view_args, **request.args.to_dict()}
+    args.pop("cursor", None)
+
+    return {
+        "next": url_for(request.endpoint, **args, cursor=page.next_cursor) if page.has_more else None,
+        "first": url_for(request.endpoint, **args) if request.args.get("cursor") else None,
+    }
+
+
+def wants_json() -> bool:
+    """ ?format=json, or an Accept header that prefers JSON over HTML """
+    if request.args.get("format") == "json":
+        return True
+
+    accept = request.accept_mimetypes
+    return accept["application/json"] > accept["text/html"]
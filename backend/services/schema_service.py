@@ -0,0 +1,90 @@
+from typing import List
+
+from sqlalchemy import Column, inspect, literal, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+
+from ..extensions import db
+
+# ======================================================
+# SCHEMA UPGRADE (NO MIGRATIONS)
+# ======================================================
+# db.create_all() creates missing tables but never alters existing
+# ones. Columns and indexes added to a model after its table was first
+# created are added here, idempotently, on startup (and by
+# `flask schema upgrade`). Foreign keys of added columns are not
+# created; the application does not rely on them.
+
+
+def _default_clause(column: Column, dialect):
+    """ DEFAULT for an added NOT NULL column: the server default, or the scalar model default """
+    if column.server_default is not None:
+        return column.server_default
+
+    default = column.default
+    if default is not None and default.is_scalar:
+        rendered = literal(default.arg, column.type).compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        )
+        return text(str(rendered))
+
+    raise RuntimeError(
+        f"Can't add NOT NULL column {column.table.name}.{column.name} "
+        "to existing rows: it has no scalar default"
+    )
+
+
+def _add_column_sql(column: Column, dialect) -> str:
+    added = Column(
+        column.name,
+        column.type,
+        nullable=column.nullable,
+        server_default=None if column.nullable else _default_clause(column, dialect),
+    )
+    ddl = CreateColumn(added).compile(dialect=dialect)
+    table = dialect.identifier_preparer.quote(column.table.name)
+    return f"ALTER TABLE {table} ADD COLUMN {ddl}"
+
+
+def upgrade_schema() -> List[str]:
+    """
+    Add model columns and indexes missing from existing tables.
+    Returns what was added ("table.column" / index names).
+    """
+    engine = db.engine
+    existing = set(inspect(engine).get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing:
+            continue  # created by create_all()
+
+        inspector = inspect(engine)
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(_add_column_sql(column, engine.dialect)))
+            except DBAPIError:
+                # Another worker added it first
+                if column.name not in {c["name"] for c in inspect(engine).get_columns(table.name)}:
+                    raise
+                continue
+            added.append(f"{table.name}.{column.name}")
+
+        indexes = {i["name"] for i in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            try:
+                index.create(bind=engine)
+            except DBAPIError:
+                if index.name not in {i["name"] for i in inspect(engine).get_indexes(table.name)}:
+                    raise
+                continue
+            added.append(index.name)
+
+    return added
@@ -1,89 +1,323 @@
 import os
+import struct
 import uuid  # [SECURITY ENHANCEMENT] Unique IDs ke liye
-from typing import Tuple
-from cryptography.fernet import Fernet, InvalidToken
+from typing import Iterable, Iterator, Optional, Tuple
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken, MultiFernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from flask import current_app
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
-from ..config import allowed_file, Config
+from ..config import allowed_file
+from .encryption_service import CipherRegistry
 
 
 # =========================
-# INTERNAL: GET FERNET
+# FRAMED CONTAINER FORMAT
 # =========================
-def _get_fernet() -> Fernet:
+# Layout on disk:
+#   header  = MAGIC(4) | VERSION(1) | FRAME_SIZE(4) | NONCE_PREFIX(8)
+#   frames  = [AES-GCM(ciphertext + 16 byte tag)] * N
+#
+# Every frame except the last holds exactly FRAME_SIZE plaintext bytes,
+# so frame N always starts at HEADER_SIZE + N * (FRAME_SIZE + TAG_SIZE).
+# The frame index and a "last frame" flag are bound into the AAD, which
+# makes reordering, truncation and appending detectable.
+FRAME_MAGIC = b"SDMF"
+FRAME_VERSION = 1
+FRAME_SIZE = 1024 * 1024  # 1 MB plaintext per frame
+TAG_SIZE = 16
+
+_HEADER = struct.Struct(">4sBI8s")
+HEADER_SIZE = _HEADER.size
+
+
+# =========================
+# INTERNAL: CIPHERS (CACHED)
+# =========================
+_FRAME_KEY_INFO = b"smartdms-file-frames-v1"
+
+
+def _get_fernet() -> MultiFernet:
+    """
+    Returns the shared Fernet cipher (legacy single-blob files).
+    """
+    return CipherRegistry.fernet()
+
+
+def _get_frame_cipher() -> AESGCM:
+    """
+    Returns AES-GCM cipher for writing the framed container.
     """
-    Returns Fernet instance using application ENCRYPTION_KEY.
+    return CipherRegistry.aeads(_FRAME_KEY_INFO)[0]
+
+
+def _frame_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + struct.pack(">I", index)
+
+
+def _frame_aad(header: bytes, index: int, is_last: bool) -> bytes:
+    return header + struct.pack(">I?", index, is_last)
+
+
+def _iter_plain_frames(
+    chunks: Iterable[bytes],
+    frame_size: int
+) -> Iterator[Tuple[bytes, bool]]:
     """
-    # Key valid hai ya nahi, ye Config file mein check ho chuka hai
-    key = Config.ENCRYPTION_KEY
+    Re-slice arbitrary chunks into (frame, is_last) pairs.
+    Only one frame worth of plaintext is buffered at a time.
+    """
+    buf = bytearray()
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf += chunk
+        while len(buf) > frame_size:
+            yield bytes(buf[:frame_size]), False
+            del buf[:frame_size]
+
+    # Final frame (may be empty for a zero-byte file)
+    yield bytes(buf), True
 
-    if isinstance(key, str):
-        key = key.encode()
 
-    return Fernet(key)
+def read_chunks(stream, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
 
 
 # =========================
-# SAVE ENCRYPTED FILE
+# SAVE ENCRYPTED STREAM
 # =========================
-def save_encrypted_file(
-    file_storage: FileStorage,
+def save_encrypted_stream(
+    chunks: Iterable[bytes],
+    filename: str,
     version_suffix: str = ""
 ) -> Tuple[str, str]:
-
-    if not file_storage or file_storage.filename == "":
-        raise ValueError("No file provided")
-
-    if not allowed_file(file_storage.filename):
-        raise ValueError("File type not allowed")
-
+    """
+    Encrypt plaintext chunks frame by frame into a new stored file.
+    Peak memory stays at one frame regardless of file size.
+    """
     upload_folder = current_app.config["UPLOAD_FOLDER"]
     os.makedirs(upload_folder, exist_ok=True)
 
-    original_name = secure_filename(file_storage.filename)
+    original_name = secure_filename(filename)
     name, ext = os.path.splitext(original_name)
 
-    # [SECURITY FIX] 
+    # [SECURITY FIX]
     # File ko Disk par Random UUID naam se save karein.
     # Isse "File Overwrite" aur "Predictable Filename" attacks ruk jate hain.
     # Original naam Database mein rahega, Disk par nahi.
     unique_filename = f"{uuid.uuid4().hex}{ext}"
-    
+
     stored_path = os.path.join(upload_folder, unique_filename)
+    temp_path = f"{stored_path}.part"
+
+    frame_size = current_app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+    nonce_prefix = os.urandom(8)
+    header = _HEADER.pack(FRAME_MAGIC, FRAME_VERSION, frame_size, nonce_prefix)
+    cipher = _get_frame_cipher()
 
-    # 🔐 Encrypt file data
-    # Note: 32MB limit Config mein hai, isliye RAM full hone ka risk kam hai.
-    data = file_storage.read()
-    fernet = _get_fernet()
-    encrypted = fernet.encrypt(data)
+    # 🔐 Encrypt frame by frame into a temp file, then rename.
+    # Half-written files never appear under their final name.
+    try:
+        with open(temp_path, "wb") as f_out:
+            f_out.write(header)
 
-    with open(stored_path, "wb") as f_out:
-        f_out.write(encrypted)
+            for index, (frame, is_last) in enumerate(
+                _iter_plain_frames(chunks, frame_size)
+            ):
+                f_out.write(cipher.encrypt(
+                    _frame_nonce(nonce_prefix, index),
+                    frame,
+                    _frame_aad(header, index, is_last)
+                ))
+
+        os.replace(temp_path, stored_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
     # Return stored_path AND unique_filename (taaki DB mein update ho sake)
     return stored_path, unique_filename
 
 
 # =========================
-# DECRYPT FILE
+# SAVE ENCRYPTED FILE
 # =========================
-def decrypt_file(filepath: str) -> bytes:
+def save_encrypted_file(
+    file_storage: FileStorage,
+    version_suffix: str = ""
+) -> Tuple[str, str]:
+
+    if not file_storage or file_storage.filename == "":
+        raise ValueError("No file provided")
+
+    if not allowed_file(file_storage.filename):
+        raise ValueError("File type not allowed")
+
+    frame_size = current_app.config.get("STORAGE_FRAME_SIZE", FRAME_SIZE)
+
+    return save_encrypted_stream(
+        read_chunks(file_storage.stream, frame_size),
+        file_storage.filename,
+        version_suffix=version_suffix
+    )
+
+
+# =========================
+# STREAMING DECRYPT
+# =========================
+def _frame_layout(frame_size: int, file_size: int) -> Tuple[int, int]:
+    """
+    Returns (frame_count, plaintext_size) for a framed file of file_size bytes.
+    """
+    body = file_size - HEADER_SIZE
+    frames = max(1, -(-body // (frame_size + TAG_SIZE)))
+    return frames, body - frames * TAG_SIZE
+
+
+def iter_decrypted_file(
+    filepath: str,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Yield plaintext chunks of a stored file.
+
+    Framed files are decrypted one frame at a time. When a byte range
+    [start, stop) is given, only the frames covering it are read and
+    decrypted. Legacy single-blob Fernet files are still supported
+    (decrypted in one piece, then sliced).
+
+    The file is opened and its header checked before returning, so a
+    missing or foreign file fails here and not halfway through a response.
+    """
     # [SECURITY CHECK] Path Traversal defense already done via 'secure_filename' during upload.
     # Agar hacker ne DB manually edit karke path '/etc/passwd' kar diya,
     # toh bhi decrypt fail ho jayega kyunki '/etc/passwd' encrypted nahi hai.
-    
     try:
-        with open(filepath, "rb") as f_in:
-            encrypted = f_in.read()
+        f_in = open(filepath, "rb")
     except FileNotFoundError:
         raise RuntimeError("File not found on server.")
 
-    fernet = _get_fernet()
+    header = f_in.read(HEADER_SIZE)
 
-    try:
-        return fernet.decrypt(encrypted)
-    except InvalidToken:
-        # If key mismatch or corrupted file
-        raise RuntimeError("Unable to decrypt file. Invalid encryption key or corrupted file.")
\ No newline at end of file
+    if header[:len(FRAME_MAGIC)] != FRAME_MAGIC:
+        # Legacy Fernet blob
+        with f_in:
+            encrypted = header + f_in.read()
+        try:
+            data = _get_fernet().decrypt(encrypted)
+        except InvalidToken:
+            raise RuntimeError("Unable to decrypt file. Invalid encryption key or corrupted file.")
+        return iter([data[start:stop]])
+
+    if len(header) < HEADER_SIZE:
+        f_in.close()
+        raise RuntimeError("Unable to decrypt file. Invalid encryption key or corrupted file.")
+
+    _, version, frame_size, nonce_prefix = _HEADER.unpack(header)
+    if version != FRAME_VERSION:
+        f_in.close()
+        raise RuntimeError(f"Unsupported storage format version {version}.")
+
+    total_frames, size = _frame_layout(frame_size, os.fstat(f_in.fileno()).st_size)
+
+    if start == 0 and stop is None:
+        # Full read: every frame (also authenticates empty files)
+        return _iter_frames(
+            f_in, header, frame_size, nonce_prefix,
+            0, total_frames - 1, total_frames
+        )
+
+    stop = size if stop is None else min(stop, size)
+    if start >= stop:
+        f_in.close()
+        return iter([])
+
+    return _iter_frames(
+        f_in, header, frame_size, nonce_prefix,
+        start // frame_size, (stop - 1) // frame_size, total_frames,
+        skip=start % frame_size, length=stop - start
+    )
+
+
+def _iter_frames(
+    f_in,
+    header: bytes,
+    frame_size: int,
+    nonce_prefix: bytes,
+    first_index: int,
+    last_index: int,
+    total_frames: int,
+    skip: int = 0,
+    length: Optional[int] = None
+) -> Iterator[bytes]:
+    # Primary key first; after a key rotation older files still open
+    ciphers = CipherRegistry.aeads(_FRAME_KEY_INFO)
+    block_size = frame_size + TAG_SIZE
+    remaining = length
+
+    with f_in:
+        f_in.seek(HEADER_SIZE + first_index * block_size)
+
+        for index in range(first_index, last_index + 1):
+            block = f_in.read(block_size)
+            nonce = _frame_nonce(nonce_prefix, index)
+            aad = _frame_aad(header, index, index == total_frames - 1)
+
+            for cipher in ciphers:
+                try:
+                    plain = cipher.decrypt(nonce, block, aad)
+                    break
+                except InvalidTag:
+                    continue
+            else:
+                raise RuntimeError("Unable to decrypt file. Invalid encryption key or corrupted file.")
+
+            # Stick with the key that worked for the rest of the file
+            ciphers = [cipher]
+
+            # Trim to the requested byte range
+            if index == first_index and skip:
+                plain = plain[skip:]
+            if remaining is not None:
+                plain = plain[:remaining]
+                remaining -= len(plain)
+
+            yield plain
+
+
+def plaintext_size(filepath: str) -> Optional[int]:
+    """
+    Decrypted size of a framed file, computed from its on-disk size.
+    Returns None for legacy Fernet files.
+    """
+    with open(filepath, "rb") as f_in:
+        header = f_in.read(HEADER_SIZE)
+
+    if len(header) < HEADER_SIZE or header[:len(FRAME_MAGIC)] != FRAME_MAGIC:
+        return None
+
+    _, _, frame_size, _ = _HEADER.unpack(header)
+    _, size = _frame_layout(frame_size, os.path.getsize(filepath))
+
+    return size
+
+
+# =========================
+# DECRYPT FILE
+# =========================
+def decrypt_file(filepath: str) -> bytes:
+    """
+    Decrypt a whole stored file into memory.
+    Prefer iter_decrypted_file() for anything that may be large.
+    """
+    return b"".join(iter_decrypted_file(filepath))
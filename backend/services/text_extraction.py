@@ -0,0 +1,203 @@
+import re
+import tempfile
+import zipfile
+import zlib
+from typing import Callable, Dict, Iterator, Optional
+from xml.etree import ElementTree
+
+from .storage_service import iter_decrypted_file, plaintext_size
+
+# Extracted text is capped so one huge spreadsheet can't bloat the index
+MAX_TEXT_CHARS = 2 * 1024 * 1024
+
+# Decompressed bytes (XML parts, PDF streams) read per document. A small
+# file can inflate to gigabytes ("zip bomb"); whatever lies past the
+# budget is not indexed.
+MAX_INFLATED_BYTES = 64 * 1024 * 1024
+
+# Spool decrypted files in memory up to this size, then on disk
+_SPOOL_SIZE = 4 * 1024 * 1024
+
+
+# ======================================================
+# PLAIN TEXT
+# ======================================================
+def _extract_txt(f) -> str:
+    data = f.read(MAX_TEXT_CHARS)
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="ignore")
+
+
+# ======================================================
+# OFFICE OPEN XML (docx / xlsx / pptx)
+# ======================================================
+def _xml_text(xml_bytes: bytes, tag_suffix: str) -> Iterator[str]:
+    """ Text of every element whose tag ends with tag_suffix (e.g. '}t') """
+    try:
+        root = ElementTree.fromstring(xml_bytes)
+    except ElementTree.ParseError:
+        return
+
+    for el in root.iter():
+        if el.tag.endswith(tag_suffix) and el.text:
+            yield el.text
+
+
+def _extract_ooxml(f, members: Callable[[str], bool], tag_suffix: str) -> str:
+    parts = []
+    size = 0
+    budget = MAX_INFLATED_BYTES
+
+    try:
+        with zipfile.ZipFile(f) as zf:
+            for name in sorted(zf.namelist()):
+                if not members(name):
+                    continue
+
+                # Bounded read: a part larger than what's left of the
+                # budget is skipped (cut-off XML wouldn't parse anyway)
+                with zf.open(name) as part:
+                    xml_bytes = part.read(budget + 1)
+                if len(xml_bytes) > budget:
+                    break
+                budget -= len(xml_bytes)
+
+                for text in _xml_text(xml_bytes, tag_suffix):
+                    parts.append(text)
+                    size += len(text)
+                    if size >= MAX_TEXT_CHARS:
+                        return " ".join(parts)
+    except zipfile.BadZipFile:
+        return ""
+
+    return " ".join(parts)
+
+
+def _extract_docx(f) -> str:
+    return _extract_ooxml(
+        f,
+        lambda n: n.startswith("word/") and n.endswith(".xml")
+        and ("document" in n or "header" in n or "footer" in n),
+        "}t"
+    )
+
+
+def _extract_xlsx(f) -> str:
+    # Cell strings live in the shared string table; inline strings in sheets
+    return _extract_ooxml(
+        f,
+        lambda n: n == "xl/sharedStrings.xml"
+        or (n.startswith("xl/worksheets/") and n.endswith(".xml")),
+        "}t"
+    )
+
+
+def _extract_pptx(f) -> str:
+    return _extract_ooxml(
+        f,
+        lambda n: n.startswith("ppt/slides/") and n.endswith(".xml"),
+        "}t"
+    )
+
+
+# ======================================================
+# PDF (text operators only, no external dependency)
+# ======================================================
+_PDF_STREAM_RE = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+_PDF_TEXT_RE = re.compile(rb"\((?:\\.|[^\\)])*\)\s*(?:Tj|'|\")|\[(?:\\.|[^\]])*\]\s*TJ", re.S)
+_PDF_STRING_RE = re.compile(rb"\(((?:\\.|[^\\)])*)\)", re.S)
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"", b"f": b""}
+
+
+def _pdf_unescape(raw: bytes) -> bytes:
+    def repl(m):
+        esc = m.group(1)
+        if esc[:1].isdigit():
+            return bytes([int(esc, 8) & 0xFF])
+        return _PDF_ESCAPES.get(esc, esc)
+
+    return re.sub(rb"\\([0-7]{1,3}|.)", repl, raw, flags=re.S)
+
+
+def _extract_pdf(f) -> str:
+    """
+    Best-effort: inflate content streams and collect the literal strings
+    of Tj/TJ text operators. Scanned PDFs and CID-encoded fonts yield
+    little or nothing (no OCR).
+    """
+    data = f.read()  # extract_text() only gets here below max_file_size
+    parts = []
+    size = 0
+    budget = MAX_INFLATED_BYTES
+
+    for m in _PDF_STREAM_RE.finditer(data):
+        stream = m.group(1)
+        try:
+            # Inflate at most what's left of the budget
+            stream = zlib.decompressobj().decompress(stream, budget)
+        except zlib.error:
+            pass
+
+        budget -= len(stream)
+        if budget <= 0:
+            break
+
+        for op in _PDF_TEXT_RE.finditer(stream):
+            for s in _PDF_STRING_RE.finditer(op.group(0)):
+                text = _pdf_unescape(s.group(1)).decode("latin-1")
+                parts.append(text)
+                size += len(text)
+
+        if size >= MAX_TEXT_CHARS:
+            break
+
+    return " ".join(parts)
+
+
+_EXTRACTORS: Dict[str, Callable] = {
+    "txt": _extract_txt,
+    "csv": _extract_txt,
+    "docx": _extract_docx,
+    "xlsx": _extract_xlsx,
+    "pptx": _extract_pptx,
+    "pdf": _extract_pdf,
+}
+
+
+def can_extract(file_type: Optional[str]) -> bool:
+    return (file_type or "").lower() in _EXTRACTORS
+
+
+# ======================================================
+# PUBLIC
+# ======================================================
+def extract_text(filepath: str, file_type: Optional[str], max_file_size: Optional[int] = None) -> str:
+    """
+    Plain text of a stored (encrypted) file, or "" when the type is not
+    supported or the file is larger than max_file_size. The file is
+    decrypted into a spooled temp file, so large documents don't sit
+    in memory.
+    """
+    extractor = _EXTRACTORS.get((file_type or "").lower())
+    if not extractor:
+        return ""
+
+    if max_file_size:
+        size = plaintext_size(filepath)
+        if size is not None and size > max_file_size:
+            return ""
+
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as spool:
+        written = 0
+        for chunk in iter_decrypted_file(filepath):
+            written += len(chunk)
+            if max_file_size and written > max_file_size:
+                return ""  # legacy file: size only known while reading
+            spool.write(chunk)
+        spool.seek(0)
+
+        return extractor(spool)[:MAX_TEXT_CHARS]
@@ -0,0 +1,337 @@
+import hashlib
+import os
+import secrets
+import shutil
+import struct
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from flask import current_app
+
+from ..config import allowed_file
+from ..extensions import db
+from ..models import Document, Job, UploadSession, User
+from .blob_service import store_blob
+from .document_service import (
+    InvalidFileTypeError, create_document_from_blob,
+    update_document_from_blob, validate_filename
+)
+from .encryption_service import CipherRegistry
+from .import_service import start_zip_import
+from .job_service import enqueue_job, job_handler
+
+# ======================================================
+# RESUMABLE (CHUNKED) UPLOADS
+# ======================================================
+# init -> PUT chunk at offset (repeat, resume after a drop) -> finalize.
+#
+# Each chunk is staged as its own file, AES-GCM encrypted with a staging
+# subkey and bound to its (upload, offset), so plaintext never sits on
+# disk and chunks can't be swapped between uploads. Finalize streams
+# the chunks into the normal deduplicated blob storage.
+
+_STAGING_KEY_INFO = b"smartdms-upload-staging-v1"
+_NONCE_SIZE = 12
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadOffsetError(UploadError):
+    """ The chunk doesn't start where the server expects it """
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+# ======================================================
+# STAGING FILES
+# ======================================================
+def _staging_dir(upload: UploadSession) -> str:
+    return os.path.join(current_app.config["UPLOAD_STAGING_FOLDER"], upload.id)
+
+
+def _chunk_aad(upload: UploadSession, offset: int) -> bytes:
+    return upload.id.encode() + struct.pack(">Q", offset)
+
+
+def _chunk_path(upload: UploadSession, offset: int) -> str:
+    # Zero-padded: directory order == offset order
+    return os.path.join(_staging_dir(upload), f"{offset:016d}.chunk")
+
+
+def _write_chunk_file(upload: UploadSession, offset: int, data: bytes) -> None:
+    nonce = os.urandom(_NONCE_SIZE)
+    cipher = CipherRegistry.aeads(_STAGING_KEY_INFO)[0]
+    path = _chunk_path(upload, offset)
+    temp_path = f"{path}.part"
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(temp_path, "wb") as f:
+        f.write(nonce + cipher.encrypt(nonce, data, _chunk_aad(upload, offset)))
+    os.replace(temp_path, path)
+
+
+def _read_chunk_file(upload: UploadSession, offset: int, path: str) -> bytes:
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    nonce, encrypted = raw[:_NONCE_SIZE], raw[_NONCE_SIZE:]
+    for cipher in CipherRegistry.aeads(_STAGING_KEY_INFO):
+        try:
+            return cipher.decrypt(nonce, encrypted, _chunk_aad(upload, offset))
+        except InvalidTag:
+            continue
+    raise UploadError(f"Staged chunk at offset {offset} is corrupt")
+
+
+def _iter_staged(upload: UploadSession) -> Iterator[bytes]:
+    """ Plaintext of the staged chunks, in order, one chunk in memory """
+    staging = _staging_dir(upload)
+    names = sorted(os.listdir(staging)) if os.path.isdir(staging) else []
+
+    offset = 0
+    for name in names:
+        if not name.endswith(".chunk"):
+            continue
+
+        chunk_offset = int(name.split(".", 1)[0])
+        if chunk_offset != offset:
+            raise UploadError(f"Missing data at offset {offset}")
+
+        data = _read_chunk_file(upload, chunk_offset, os.path.join(staging, name))
+        offset += len(data)
+        yield data
+
+    if offset != upload.total_size:
+        raise UploadError(f"Missing data at offset {offset}")
+
+
+def _remove_staging(upload: UploadSession) -> None:
+    shutil.rmtree(_staging_dir(upload), ignore_errors=True)
+
+
+# ======================================================
+# PROTOCOL
+# ======================================================
+def get_upload(upload_id: str, user: User, lock: bool = False) -> Optional[UploadSession]:
+    """ The user's upload, if it exists and hasn't expired """
+    query = UploadSession.query.filter_by(id=upload_id, user_id=user.id)
+    if lock:
+        # Serialises chunk writes of one upload
+        query = query.with_for_update()
+
+    upload = query.first()
+    if upload is None:
+        return None
+
+    ttl = current_app.config.get("UPLOAD_SESSION_TTL", 24 * 3600)
+    if upload.updated_at < datetime.utcnow() - timedelta(seconds=ttl):
+        return None
+    return upload
+
+
+def start_upload(
+    user: User,
+    filename: str,
+    total_size: int,
+    folder_id: Optional[int] = None,
+    document: Optional[Document] = None,
+    for_import: bool = False,
+) -> UploadSession:
+    """
+    Open an upload of `total_size` bytes: a new document in `folder_id`,
+    a new version of `document`, or (for_import) a .zip archive to be
+    imported into `folder_id` with import_upload().
+    """
+    # Archives are only accepted for ZIP import, and only archives are:
+    # rejected here, before the client sends the whole file
+    if for_import:
+        if document is not None or not filename.lower().endswith(".zip"):
+            raise UploadError("Only new .zip uploads can be imported")
+    else:
+        validate_filename(filename)
+    if not allowed_file(filename):
+        raise InvalidFileTypeError("File type not allowed")
+
+    max_size = current_app.config.get("UPLOAD_MAX_SIZE")
+    if total_size < 0 or (max_size and total_size > max_size):
+        raise UploadError("File is too large")
+
+    upload = UploadSession(
+        id=secrets.token_hex(16),
+        user_id=user.id,
+        filename=filename,
+        total_size=total_size,
+        received=0,
+        folder_id=None if document else folder_id,
+        document_id=document.id if document else None,
+    )
+    db.session.add(upload)
+    db.session.commit()
+
+    return upload
+
+
+def read_chunk(stream, checksum: Optional[str] = None) -> bytes:
+    """
+    Read one chunk body (at most UPLOAD_CHUNK_SIZE) and check it against
+    its hex SHA-256, when the client sent one.
+    """
+    limit = current_app.config.get("UPLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+    data = stream.read(limit + 1)
+    if not data:
+        raise UploadError("Empty chunk")
+    if len(data) > limit:
+        raise UploadError(f"Chunks are limited to {limit} bytes")
+
+    if checksum and hashlib.sha256(data).hexdigest() != checksum.strip().lower():
+        raise UploadError("Checksum mismatch")
+
+    return data
+
+
+def write_chunk(upload: UploadSession, offset: int, data: bytes) -> int:
+    """
+    Stage a chunk starting at `offset`; returns the next expected offset.
+    `upload` should be loaded with get_upload(..., lock=True).
+    """
+    if offset != upload.received:
+        raise UploadOffsetError(upload.received)
+    if offset + len(data) > upload.total_size:
+        raise UploadError("Chunk exceeds the declared file size")
+
+    _write_chunk_file(upload, offset, data)
+
+    upload.received = offset + len(data)
+    upload.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    return upload.received
+
+
+def _check_finalizable(upload: UploadSession) -> str:
+    """ Complete, a document type, and its target document still there """
+    if upload.received != upload.total_size:
+        raise UploadOffsetError(upload.received)
+
+    ext = validate_filename(upload.filename)
+
+    if upload.document_id:
+        doc = db.session.get(Document, upload.document_id)
+        if doc is None or doc.is_deleted:
+            raise UploadError("The document no longer exists")
+
+    return ext
+
+
+def queue_finalize(
+    upload: UploadSession,
+    user: User,
+    title: Optional[str] = None,
+    tags: Optional[str] = None,
+) -> Job:
+    """
+    Check the upload and finalize it in a background job: storing up to
+    UPLOAD_MAX_SIZE (re-encrypt + hash) and indexing it doesn't fit in a
+    request. The job's result is {"document_id", "version"}.
+    """
+    _check_finalizable(upload)
+
+    # Not purged as expired while the job waits
+    upload.updated_at = datetime.utcnow()
+    return enqueue_job("upload_finalize", user, {
+        "upload_id": upload.id,
+        "title": title,
+        "tags": tags,
+    })
+
+
+@job_handler("upload_finalize")
+def finalize_upload_job(job, ctx) -> dict:
+    """ params {"upload_id", "title", "tags"} """
+    user = db.session.get(User, job.user_id)
+    upload = get_upload(job.params["upload_id"], user, lock=True) if user else None
+    if upload is None:
+        raise UploadError("Upload not found or expired")
+
+    doc = finalize_upload(upload, user, title=job.params.get("title"), tags=job.params.get("tags"))
+    return {"document_id": doc.id, "version": doc.version}
+
+
+def finalize_upload(
+    upload: UploadSession,
+    user: User,
+    title: Optional[str] = None,
+    tags: Optional[str] = None,
+    status: str = "uploaded",
+) -> Document:
+    """
+    Store the complete file and create the document (or new version)
+    through the same path as a direct upload.
+    """
+    ext = _check_finalizable(upload)
+    blob = store_blob(_iter_staged(upload), upload.filename)
+
+    # Removed in the same commit as the document is created
+    db.session.delete(upload)
+
+    if upload.document_id:
+        doc = db.session.get(Document, upload.document_id)
+        doc = update_document_from_blob(doc, upload.filename, ext, blob, user_id=user.id)
+    else:
+        doc = create_document_from_blob(
+            user, title, tags, upload.filename, ext, blob,
+            folder_id=upload.folder_id, status=status
+        )
+
+    _remove_staging(upload)
+    return doc
+
+
+def import_upload(upload: UploadSession, user: User) -> Job:
+    """
+    Store a complete .zip upload and queue its import (folders and
+    documents) into the upload's folder.
+    """
+    if upload.received != upload.total_size:
+        raise UploadOffsetError(upload.received)
+    if upload.document_id or not upload.filename.lower().endswith(".zip"):
+        raise UploadError("Only new .zip uploads can be imported")
+
+    blob = store_blob(_iter_staged(upload), upload.filename)
+
+    # Removed in the same commit as the job is queued
+    db.session.delete(upload)
+    job = start_zip_import(user, blob, upload.filename, upload.folder_id)
+
+    _remove_staging(upload)
+    return job
+
+
+def abort_upload(upload: UploadSession) -> None:
+    db.session.delete(upload)
+    db.session.commit()
+    _remove_staging(upload)
+
+
+def purge_expired_uploads() -> int:
+    """ Drop uploads idle for longer than UPLOAD_SESSION_TTL """
+    ttl = current_app.config.get("UPLOAD_SESSION_TTL", 24 * 3600)
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        db.session.delete(upload)
+    db.session.commit()
+
+    for upload in expired:
+        _remove_staging(upload)
+
+    return len(expired)
@@ -0,0 +1,137 @@
+import struct
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# ======================================================
+# STREAMING ZIP WRITER
+# ======================================================
+# Writes a ZIP archive as a generator of bytes, member after member,
+# without knowing sizes in advance and without seeking:
+#
+#   - every member has a data descriptor (flag bit 3): CRC and sizes
+#     follow the data instead of preceding it
+#   - every member is ZIP64 (8-byte sizes / offsets), so neither single
+#     files nor the archive are limited to 4 GB
+#
+# Only one compressed chunk is held in memory at a time.
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIQQ")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_END = struct.Struct("<IHHHHIIH")
+
+_VERSION = 45           # 4.5: ZIP64
+_FLAGS = 0x0008 | 0x0800  # data descriptor | UTF-8 names
+_ZIP64_EXTRA_ID = 0x0001
+_MAX32 = 0xFFFFFFFF
+_MAX16 = 0xFFFF
+
+STORED = 0
+DEFLATED = 8
+
+_DIR_ATTRS = (0o40755 << 16) | 0x10
+_FILE_ATTRS = 0o100644 << 16
+
+
+class ZipMember(NamedTuple):
+    name: str                         # "a/b.pdf", or "a/" for a folder
+    modified: Optional[datetime]
+    chunks: Optional[Iterable[bytes]]  # None for a folder
+    method: int = DEFLATED
+
+
+def _dos_time(dt: Optional[datetime]):
+    dt = dt or datetime.utcnow()
+    if dt.year < 1980:
+        dt = datetime(1980, 1, 1)
+    return (
+        (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+        ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day,
+    )
+
+
+def stream_zip(members: Iterable[ZipMember], compress_level: int = 6) -> Iterator[bytes]:
+    offset = 0
+    central = []
+
+    for member in members:
+        name = member.name.encode("utf-8")
+        is_dir = member.chunks is None
+        method = STORED if is_dir else member.method
+        mod_time, mod_date = _dos_time(member.modified)
+
+        # Sizes are in the data descriptor; the ZIP64 extra only marks the member
+        local = _LOCAL_HEADER.pack(
+            0x04034B50, _VERSION, _FLAGS, method, mod_time, mod_date,
+            0, _MAX32, _MAX32, len(name), 20
+        ) + name + struct.pack("<HHQQ", _ZIP64_EXTRA_ID, 16, 0, 0)
+
+        header_offset = offset
+        yield local
+        offset += len(local)
+
+        crc = 0
+        size = 0
+        compressed = 0
+
+        if not is_dir:
+            compressor = (
+                zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+                if method == DEFLATED else None
+            )
+            for chunk in member.chunks:
+                if not chunk:
+                    continue
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+
+                out = compressor.compress(chunk) if compressor else chunk
+                if out:
+                    compressed += len(out)
+                    yield out
+
+            if compressor:
+                out = compressor.flush()
+                compressed += len(out)
+                yield out
+
+        descriptor = _DATA_DESCRIPTOR.pack(0x08074B50, crc, compressed, size)
+        yield descriptor
+        offset += compressed + len(descriptor)
+
+        central.append((name, method, mod_time, mod_date, crc, compressed, size, header_offset, is_dir))
+
+    # ------------------------------
+    # CENTRAL DIRECTORY
+    # ------------------------------
+    central_offset = offset
+    for name, method, mod_time, mod_date, crc, compressed, size, header_offset, is_dir in central:
+        entry = _CENTRAL_HEADER.pack(
+            0x02014B50, (3 << 8) | _VERSION, _VERSION, _FLAGS, method,
+            mod_time, mod_date, crc, _MAX32, _MAX32,
+            len(name), 28, 0, 0, 0,
+            _DIR_ATTRS if is_dir else _FILE_ATTRS,
+            _MAX32
+        ) + name + struct.pack("<HHQQQ", _ZIP64_EXTRA_ID, 24, size, compressed, header_offset)
+
+        yield entry
+        offset += len(entry)
+
+    central_size = offset - central_offset
+
+    # ------------------------------
+    # END RECORDS (ZIP64 + CLASSIC)
+    # ------------------------------
+    yield _ZIP64_END.pack(
+        0x06064B50, _ZIP64_END.size - 12, (3 << 8) | _VERSION, _VERSION, 0, 0,
+        len(central), len(central), central_size, central_offset
+    )
+    yield _ZIP64_LOCATOR.pack(0x07064B50, 0, offset, 1)
+    yield _END.pack(
+        0x06054B50, 0, 0,
+        min(len(central), _MAX16), min(len(central), _MAX16),
+        min(central_size, _MAX32), _MAX32, 0
+    )
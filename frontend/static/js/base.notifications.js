@@ -6,7 +6,6 @@
 document.addEventListener("DOMContentLoaded", () => {
   const btn = document.getElementById("notifBtn");
   const dropdown = document.getElementById("notifDropdown");
-  const badge = btn ? btn.querySelector(".badge") : null;
   const csrfToken =
     document.querySelector('meta[name="csrf-token"]')?.content ||
     document.getElementById("csrfToken")?.value;
@@ -36,7 +35,7 @@ document.addEventListener("DOMContentLoaded", () => {
       credentials: "same-origin"
     })
       .then(() => {
-        if (badge) badge.remove();
+        updateBadge(0);
       })
       .catch(() => {
         console.warn("Failed to mark notifications as read");
@@ -117,6 +116,115 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  /* ----------------------------------
+     LIVE UPDATES (SERVER-SENT EVENTS)
+     EventSource reconnects by itself and
+     resumes via Last-Event-ID. Only when
+     the server enables the stream;
+     otherwise the bell polls.
+  ---------------------------------- */
+  const pollSeconds = parseInt(btn.dataset.pollSeconds, 10) || 0;
+
+  if (window.EventSource && btn.dataset.stream === "1") {
+    const source = new EventSource("/notifications/stream");
+
+    source.addEventListener("notification", (e) => {
+      let note;
+      try {
+        note = JSON.parse(e.data);
+      } catch {
+        return;
+      }
+      showNotification(note);
+    });
+  }
+
+  else if (pollSeconds > 0) {
+    setInterval(pollUnread, pollSeconds * 1000);
+  }
+
+  function pollUnread() {
+    if (document.hidden) return;
+
+    fetch("/notifications/unread", {
+      headers: { "Accept": "application/json" },
+      credentials: "same-origin"
+    })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (!data) return;
+        // Oldest first, so the newest ends up on top
+        data.recent
+          .slice()
+          .reverse()
+          .forEach((note) => {
+            const shown = dropdown.querySelector(`.notif-item[data-id="${note.id}"]`);
+            if (!shown || shown.dataset.count !== String(note.count)) {
+              showNotification({ ...note, unread: data.count });
+            }
+          });
+        updateBadge(data.count);
+      })
+      .catch(() => {
+        console.warn("Failed to poll notifications");
+      });
+  }
+
+  function showNotification(note) {
+    // Coalesced repeat: drop the old entry, it comes back on top
+    dropdown
+      .querySelector(`.notif-item[data-id="${note.id}"]`)
+      ?.remove();
+
+    dropdown.querySelector(".notif-empty")?.remove();
+
+    if (!dropdown.querySelector("#notifClearAll")) {
+      dropdown.insertAdjacentHTML(
+        "afterbegin",
+        `<div class="notif-actions text-end px-2 mb-2">
+          <button id="notifClearAll" class="btn btn-sm btn-link text-danger">
+            Clear all
+          </button>
+        </div>`
+      );
+    }
+
+    const item = document.createElement("div");
+    item.className = "notif-item d-flex justify-content-between gap-2";
+    item.dataset.id = note.id;
+    item.dataset.count = note.count || 1;
+    item.innerHTML = `
+      <div class="flex-grow-1">
+        <div class="fw-semibold"></div>
+        <small class="text-muted"></small>
+      </div>
+      <button class="notif-delete btn btn-sm text-muted">
+        <i class="bi bi-x-lg"></i>
+      </button>
+    `;
+    // textContent: messages may contain user-supplied titles
+    item.querySelector(".fw-semibold").textContent =
+      note.count > 1 ? `${note.message} (×${note.count})` : note.message;
+    item.querySelector("small").textContent = note.created_at;
+
+    dropdown.querySelector(".notif-actions").after(item);
+    updateBadge(note.unread);
+  }
+
+  function updateBadge(count) {
+    let current = btn.querySelector(".badge");
+    if (!count) {
+      current?.remove();
+      return;
+    }
+    if (!current) {
+      current = document.createElement("span");
+      current.className = "badge bg-danger";
+      btn.appendChild(current);
+    }
+    current.textContent = count;
+  }
+
   /* ----------------------------------
      EMPTY STATE HANDLER
   ---------------------------------- */
@@ -27,10 +27,12 @@ document.addEventListener("DOMContentLoaded", () => {
 
   if (!labels.length || !counts.length) return;
 
-  const total = counts.reduce((a, b) => a + b, 0);
-  const percentages = counts.map(v =>
-    total > 0 ? Math.round((v / total) * 100) : 0
-  );
+  const toPercentages = (values) => {
+    const total = values.reduce((a, b) => a + b, 0);
+    return values.map(v => (total > 0 ? Math.round((v / total) * 100) : 0));
+  };
+
+  const percentages = toPercentages(counts);
 
   // 🎨 Dynamic color palette (safe for any number of types)
   const COLORS = [
@@ -43,11 +45,12 @@ document.addEventListener("DOMContentLoaded", () => {
     "#ea580c", // orange
   ];
 
-  const bgColors = labels.map(
+  const colorsFor = (values) => values.map(
     (_, i) => COLORS[i % COLORS.length]
   );
+  const bgColors = colorsFor(labels);
 
-  new Chart(canvas, {
+  const chart = new Chart(canvas, {
     type: "bar",
     data: {
       labels: labels.map((l, i) => `${percentages[i]}% ${l}`),
@@ -86,4 +89,15 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  // Auto-refresh from /dashboard/widgets/filetypes
+  if (typeof pollWidget === "function") {
+    pollWidget(canvas, data => {
+      const pct = toPercentages(data.counts);
+      chart.data.labels = data.labels.map((l, i) => `${pct[i]}% ${l}`);
+      chart.data.datasets[0].data = pct;
+      chart.data.datasets[0].backgroundColor = colorsFor(data.labels);
+      chart.update();
+    });
+  }
+
 });
@@ -25,6 +25,24 @@ function showSuccess(msg) {
   alert(msg);
 }
 
+// Poll a background job (e.g. folder copy) until it finishes
+function waitForJob(statusUrl, onDone) {
+  fetch(statusUrl)
+    .then(r => r.json())
+    .then(d => {
+      if (!d.success) return showError(d.error);
+
+      const job = d.job;
+      if (job.status === "done") return onDone(job);
+      if (job.status === "failed") return showError(job.error);
+      if (job.status === "cancelled") return showError("Job cancelled");
+
+      document.body.style.cursor = "progress";
+      setTimeout(() => waitForJob(statusUrl, onDone), 1000);
+    })
+    .catch(() => showError());
+}
+
 function openCreateFolderModal(parentId = null) {
   const modalEl = document.getElementById("createFolderModal");
   if (!modalEl) return showError("Create folder modal not found");
@@ -282,11 +300,19 @@ document.addEventListener("DOMContentLoaded", () => {
         })
         .then(r => r.json())
         .then(d => {
-          if (d.success) {
-            clearClipboard();
-            location.reload();
+          if (!d.success) return showError(d.error);
+
+          clearClipboard();
+          if (d.job_id) {
+            // Folder copies run in the background
+            waitForJob(d.status_url, (job) => {
+              if (job.result?.failed) {
+                alert(`${job.result.failed} document(s) could not be copied.`);
+              }
+              location.reload();
+            });
           } else {
-            showError(d.error);
+            location.reload();
           }
         })
         .catch(() => showError());
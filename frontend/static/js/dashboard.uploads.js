@@ -36,7 +36,7 @@ document.addEventListener("DOMContentLoaded", () => {
   blueGradient.addColorStop(1, "rgba(30, 58, 138, 0.05)");
 
   // Create chart
-  new Chart(ctx, {
+  const chart = new Chart(ctx, {
     type: "line",
     data: {
       labels: labels,
@@ -80,4 +80,13 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  // Auto-refresh from /dashboard/widgets/uploads
+  if (typeof pollWidget === "function") {
+    pollWidget(canvas, data => {
+      chart.data.labels = data.labels;
+      chart.data.datasets[0].data = data.counts;
+      chart.update();
+    });
+  }
+
 });
@@ -0,0 +1,37 @@
+/* ===========================
+   DASHBOARD WIDGET REFRESH
+   Polls /dashboard/widgets/<name> (server-side cached,
+   so a refresh is cheap until the data actually changes)
+=========================== */
+
+function pollWidget(el, onData) {
+  if (!el || !el.dataset.source) return;
+
+  const seconds = parseInt(el.dataset.refresh || "0", 10);
+  if (!seconds) return;
+
+  const refresh = () => {
+    // Background tabs don't need fresh numbers
+    if (document.hidden) return;
+
+    fetch(el.dataset.source, { headers: { "Accept": "application/json" } })
+      .then(res => (res.ok ? res.json() : null))
+      .then(payload => {
+        if (payload && payload.success) onData(payload.data);
+      })
+      .catch(err => console.warn("Widget refresh failed", err));
+  };
+
+  setInterval(refresh, seconds * 1000);
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  const stats = document.getElementById("dashboardStats");
+
+  pollWidget(stats, data => {
+    stats.querySelectorAll("[data-stat]").forEach(el => {
+      const value = data[el.dataset.stat];
+      if (value !== undefined) el.textContent = value;
+    });
+  });
+});
@@ -0,0 +1,75 @@
+import threading
+
+from backend.models import ActivityLog
+from backend.services import activity_service
+from backend.services.activity_service import ActivityWriter, activity_log_stats, log_activity
+
+
+def _outside_request(app, *events):
+    """ Log from a worker thread with only an app context, like a job """
+    def run():
+        with app.app_context():
+            for action, kwargs in events:
+                log_activity(action, **kwargs)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+
+
+def _actions():
+    return [a.action for a in ActivityLog.query.order_by(ActivityLog.id)]
+
+
+def test_request_events_are_written_once_at_teardown(app):
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        log_activity("view", document_id=1)
+        log_activity("download", document_id=1, user_id=5)
+        assert _actions() == []
+
+    rows = ActivityLog.query.order_by(ActivityLog.id).all()
+    assert [(r.action, r.user_id, r.ip_address) for r in rows] == [
+        ("view", None, "10.0.0.7"),
+        ("download", 5, "10.0.0.7"),
+    ]
+
+
+def test_events_outside_a_request_are_written_right_away(app):
+    _outside_request(app, ("import", {"details": "job 1", "user_id": 3}))
+
+    row = ActivityLog.query.one()
+    assert (row.action, row.user_id, row.ip_address) == ("import", 3, None)
+
+
+def test_background_writer_batches_and_keeps_queued_rows(app, monkeypatch):
+    batches = []
+    monkeypatch.setattr(activity_service, "_write_rows", lambda rows: rows and batches.append(len(rows)))
+
+    writer = ActivityWriter(app, maxsize=10, batch_size=3, put_timeout=0)
+    monkeypatch.setattr(activity_service, "_writer", writer)
+    _outside_request(app, *((f"event-{n}", {"user_id": 1}) for n in range(5)))
+    assert activity_log_stats()["queued"] == 5
+
+    # Stopping drains the queue before the thread ends
+    writer.start()
+    writer.stop()
+    assert batches == [3, 2]
+    assert not writer.thread.is_alive()
+
+
+def test_background_writer_counts_dropped_rows(app, monkeypatch):
+    writer = ActivityWriter(app, maxsize=2, batch_size=10, put_timeout=0)
+    monkeypatch.setattr(activity_service, "_writer", writer)
+    before = activity_log_stats()
+
+    _outside_request(app, *((action, {"user_id": 1}) for action in ("a", "b", "c")))
+
+    after = activity_log_stats()
+    assert after["logged"] - before["logged"] == 3
+    assert after["dropped"] - before["dropped"] == 1
+    assert after["queued"] == 2
+
+    writer.start()
+    writer.stop()
+    assert _actions() == ["a", "b"]
+    assert activity_log_stats()["written"] - before["written"] == 2
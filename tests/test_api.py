@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from backend.extensions import db
+from backend.models import Document, DocumentShare, User
+
+
+def _login(client, user_id):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+
+
+def _setup():
+    alice = User(username="alice", email="alice@example.com", password_hash="x")
+    bob = User(username="bob", email="bob@example.com", password_hash="x")
+    db.session.add_all([alice, bob])
+    db.session.commit()
+
+    # Alice's own newest document pins count, max(id) and max(updated_at)
+    now = datetime.utcnow()
+    docs = [
+        Document(title=title, filename=f"{title}.pdf", stored_name=title, filepath=f"/tmp/{title}",
+                 file_type="pdf", uploaded_by=owner.id, updated_at=now - timedelta(days=age))
+        for title, owner, age in (("one", bob, 2), ("two", bob, 2), ("mine", alice, 0))
+    ]
+    db.session.add_all(docs)
+    db.session.flush()
+    db.session.add(DocumentShare(document_id=docs[0].id, shared_with_id=alice.id))
+    db.session.commit()
+    return alice, bob, docs
+
+
+def _titles(response):
+    return sorted(d["title"] for d in response.get_json()["documents"])
+
+
+def test_listing_etag_follows_shares_and_uploader_names(app, client):
+    alice, bob, (one, two, _) = _setup()
+    _login(client, alice.id)
+
+    first = client.get("/api/documents")
+    assert _titles(first) == ["mine", "one"]
+    etag = first.headers["ETag"]
+    assert client.get("/api/documents", headers={"If-None-Match": etag}).status_code == 304
+
+    # Revoke one share and grant another: same count, ids and timestamps
+    db.session.delete(DocumentShare.query.filter_by(document_id=one.id).one())
+    db.session.add(DocumentShare(document_id=two.id, shared_with_id=alice.id))
+    db.session.commit()
+
+    moved = client.get("/api/documents", headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert _titles(moved) == ["mine", "two"]
+
+    # The uploader's name is only part of the validator when requested
+    url = "/api/documents?fields=id,uploader"
+    listed = client.get(url)
+    assert sorted(listed.get_json()["documents"][0]) == ["id", "uploader"]
+    titles_etag = client.get("/api/documents?fields=id,title").headers["ETag"]
+
+    db.session.get(User, bob.id).username = "robert"
+    db.session.commit()
+
+    renamed = client.get(url, headers={"If-None-Match": listed.headers["ETag"]})
+    assert renamed.status_code == 200
+    assert {d["uploader"] for d in renamed.get_json()["documents"]} == {"alice", "robert"}
+    unchanged = client.get("/api/documents?fields=id,title", headers={"If-None-Match": titles_etag})
+    assert unchanged.status_code == 304
+
+
+def test_listing_filters_are_validated(app, client):
+    alice, _, _ = _setup()
+    _login(client, alice.id)
+
+    assert _titles(client.get("/api/documents?folder=root&file_type=PDF")) == ["mine", "one"]
+
+    for query in ("folder=abc", "created_after=yesterday", "fields=id,secret", "fields=,", "cursor=bogus"):
+        response = client.get(f"/api/documents?{query}")
+        assert response.status_code == 400, query
+        assert response.get_json()["success"] is False
+
+    # List pages asked for JSON report a bad cursor the same way
+    response = client.get("/documents/?format=json&cursor=bogus")
+    assert response.status_code == 400
+    assert response.get_json() == {"success": False, "error": "Invalid cursor"}
@@ -0,0 +1,175 @@
+from sqlalchemy import event
+
+from backend.extensions import db
+from backend.models import DashboardRollup, Document, DocumentShare, StoredBlob, User
+from backend.services.dashboard_service import (
+    rebuild_dashboard_rollups, reconcile_storage_usage, storage_usage
+)
+from backend.services.dashboard_stats import (
+    cached_dashboard_stats, live_dashboard_stats, rollup_dashboard_stats
+)
+
+
+def _user(name):
+    user = User(username=name, email=f"{name}@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _rollups():
+    return sorted(
+        (r.user_id, r.metric, r.bucket, r.value)
+        for r in DashboardRollup.query
+        if r.value and r.metric != "version"
+    )
+
+
+def _documents(alice, bob):
+
+    docs = [
+        Document(
+            title=f"Doc {i}",
+            filename="a.txt",
+            stored_name="a.txt",
+            filepath="/tmp/a.txt",
+            file_type=["pdf", " PDF", None][i % 3],
+            uploaded_by=alice.id
+        )
+        for i in range(4)
+    ]
+    db.session.add_all(docs)
+    db.session.add(DocumentShare(document=docs[0], shared_with_id=bob.id))
+    db.session.commit()
+
+    docs[1].is_active = False
+    docs[2].is_deleted = True
+    db.session.commit()
+
+
+def test_rollups_follow_document_changes(app):
+    alice, bob = _user("alice"), _user("bobby")
+    _documents(alice, bob)
+
+    stats = rollup_dashboard_stats(bob)
+    assert (stats.total_docs, stats.active_docs, stats.archived_docs) == (1, 1, 0)
+
+    stats = rollup_dashboard_stats(alice)
+    assert (stats.total_docs, stats.active_docs, stats.archived_docs) == (3, 2, 1)
+    assert stats.type_distribution == [("pdf", 3)]
+    assert stats.uploads_week == 3
+
+    # Incremental counters agree with a full recount
+    incremental = _rollups()
+    rebuild_dashboard_rollups()
+    assert _rollups() == incremental
+
+
+def test_live_stats_match_rollups_in_one_query(app):
+    alice, bob = _user("alice"), _user("bobby")
+    _documents(alice, bob)
+
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        for user in (alice, bob):
+            db.session.refresh(user)  # loaded, like current_user
+            statements.clear()
+            live = live_dashboard_stats(user)
+            assert len(statements) == 1
+
+            statements.clear()
+            assert rollup_dashboard_stats(user) == live
+            assert len(statements) == 2
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+
+def test_widget_cache_follows_data_version(app):
+    alice = _user("alice")
+
+    with app.test_request_context():
+        assert cached_dashboard_stats(alice).total_docs == 0
+
+    with app.test_request_context():
+        assert cached_dashboard_stats(alice).total_docs == 0
+    cache = app.extensions["dashboard_cache"]
+    assert cache.hits == 1
+
+    db.session.add(Document(
+        title="New",
+        filename="a.txt",
+        stored_name="a.txt",
+        filepath="/tmp/a.txt",
+        uploaded_by=alice.id
+    ))
+    db.session.commit()
+
+    with app.test_request_context():
+        assert cached_dashboard_stats(alice).total_docs == 1
+
+
+def test_storage_usage_counters_and_reconcile(app):
+    alice = _user("alice")
+
+    blob = StoredBlob(
+        content_hash="0" * 64,
+        stored_name="b.enc",
+        filepath="/tmp/b.enc",
+        size_bytes=300,
+        ref_count=1
+    )
+    db.session.add(blob)
+    db.session.flush()
+
+    sized = Document(title="A", filename="a.txt", stored_name="a", filepath="/tmp/a",
+                     size_bytes=100, uploaded_by=alice.id)
+    legacy = Document(title="B", filename="b.txt", stored_name="b.enc", filepath=blob.filepath,
+                      blob_id=blob.id, uploaded_by=alice.id)
+    db.session.add_all([sized, legacy])
+    db.session.commit()
+
+    # Written incrementally; the legacy row has no size yet
+    assert storage_usage(alice.id) == (2, 100)
+
+    assert reconcile_storage_usage() == (1, 2)
+    assert storage_usage(alice.id) == storage_usage(0) == (2, 400)
+
+    sized.is_deleted = True
+    db.session.commit()
+    assert storage_usage(alice.id) == (1, 300)
+    assert reconcile_storage_usage() == (0, 0)
+
+
+
+def test_reconcile_sizes_legacy_files_by_plaintext(app, tmp_path):
+    from backend.services.storage_service import _get_fernet, save_encrypted_stream
+
+    app.config["UPLOAD_FOLDER"] = str(tmp_path)
+    alice = _user("alice")
+
+    framed, _ = save_encrypted_stream([b"x" * 1000], "a.txt")
+    fernet = tmp_path / "old.txt"
+    fernet.write_bytes(_get_fernet().encrypt(b"y" * 500))
+    corrupt = tmp_path / "corrupt.txt"
+    corrupt.write_bytes(b"gAAAAA" + b"x" * 100)
+
+    docs = [
+        Document(title=name, filename=f"{name}.txt", stored_name=name, filepath=path,
+                 uploaded_by=alice.id)
+        for name, path in (("framed", framed), ("fernet", str(fernet)),
+                           ("corrupt", str(corrupt)), ("gone", str(tmp_path / "gone.txt")))
+    ]
+    db.session.add_all(docs)
+    db.session.commit()
+
+    assert reconcile_storage_usage() == (2, 2)
+    assert storage_usage(alice.id) == (4, 1500)
+
+    # Undecryptable and missing files are looked at once, not on every run
+    assert [d.size_checked for d in docs] == [True, True, True, True]
+    assert reconcile_storage_usage() == (0, 0)
@@ -1,3 +1,200 @@
 def test_documents_requires_login(client):
     response = client.get("/documents/")
     assert response.status_code in (302, 401)
+
+
+def test_keyset_pages_cover_every_row_once(app):
+    from datetime import datetime
+    from backend.extensions import db
+    from backend.models import Document, User
+    from backend.services.pagination import paginate
+
+    user = User(username="pager", email="pager@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+
+    # Pairs of rows share a created_at, so the id tie-breaker matters
+    for i in range(7):
+        db.session.add(Document(
+            title=f"Doc {i}",
+            filename="a.txt",
+            stored_name="a.txt",
+            filepath="/tmp/a.txt",
+            uploaded_by=user.id,
+            created_at=datetime(2024, 1, 1, 0, 0, i // 2)
+        ))
+    db.session.commit()
+
+    seen, cursor = [], None
+    with app.test_request_context():
+        while True:
+            page = paginate(Document.query, Document.created_at, Document.id, cursor, per_page=3)
+            seen += [d.id for d in page.items]
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+
+
+def test_decrypted_fields_are_not_served_stale(app):
+    from sqlalchemy import update
+    from backend.extensions import db
+    from backend.models import Document
+    from backend.services.encryption_service import EncryptionService
+
+    doc = Document(title="Draft", filename="a.txt", stored_name="a.txt",
+                   filepath="/tmp/a.txt", uploaded_by=1)
+    db.session.add(doc)
+    db.session.commit()
+
+    def change_behind_orm(title):
+        db.session.execute(
+            update(Document)
+            .where(Document.id == doc.id)
+            .values({Document._title: EncryptionService.encrypt_text(title)})
+            .execution_options(synchronize_session=False)
+        )
+
+    # Set: the new value is memoized with its ciphertext, no decrypt
+    Document.decrypt_cache_stats(reset=True)
+    doc.title = "Final"
+    assert doc.title == "Final"
+    assert Document.decrypt_cache_stats() == {"hits": 1, "misses": 0}
+    db.session.commit()
+
+    # Expire: the memo goes with the loaded state
+    assert doc.title == "Final"
+    change_behind_orm("Expired")
+    db.session.expire(doc)
+    assert "_plain_cache" not in doc.__dict__
+    assert doc.title == "Expired"
+
+    # Refresh: same, reloaded right away
+    change_behind_orm("Refreshed")
+    db.session.refresh(doc)
+    assert "_plain_cache" not in doc.__dict__
+    assert doc.title == "Refreshed"
+
+
+def test_keys_rotate_reencrypts_under_the_primary_key(app):
+    from cryptography.fernet import Fernet
+    from backend.extensions import db
+    from backend.models import Document
+
+    runner = app.test_cli_runner()
+    assert "nothing to rotate" in runner.invoke(args=["keys", "rotate"]).output
+
+    old_key = app.config["ENCRYPTION_KEY"]
+    doc = Document(title="Contract", tags="legal", filename="c.pdf", stored_name="c",
+                   filepath="/tmp/c", uploaded_by=1)
+    db.session.add(doc)
+    db.session.commit()
+    doc_id, updated_at = doc.id, doc.updated_at
+
+    app.config.update({"ENCRYPTION_KEY": Fernet.generate_key(), "ENCRYPTION_OLD_KEYS": [old_key]})
+    result = runner.invoke(args=["keys", "rotate", "--batch-size", "1"])
+    assert "1 documents re-encrypted" in result.output, result.output
+
+    # The old key can go: everything decrypts with the new one alone
+    app.config["ENCRYPTION_OLD_KEYS"] = []
+    db.session.expire_all()
+    doc = db.session.get(Document, doc_id)
+    assert (doc.title, doc.tags, doc.category) == ("Contract", "legal", None)
+    assert doc.updated_at == updated_at
+
+
+def test_batch_upload_reports_each_file(app, tmp_path):
+    from io import BytesIO
+    from werkzeug.datastructures import FileStorage
+    from backend.extensions import db
+    from backend.models import DocumentVersion, Notification, StoredBlob, User
+    from backend.services.document_service import ingest_uploads
+
+    app.config.update({"UPLOAD_FOLDER": str(tmp_path), "CONTENT_INDEX_ENABLED": False})
+
+    user = User(username="uploader", email="uploader@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    files = [
+        FileStorage(stream=BytesIO(b"same"), filename="a.txt"),
+        FileStorage(stream=BytesIO(b"evil"), filename="b.exe"),
+        FileStorage(stream=BytesIO(b"same"), filename="c.txt"),
+        FileStorage(stream=BytesIO(b"other"), filename="d.pdf"),
+    ]
+    results = ingest_uploads(user, "Batch", "", files)
+
+    assert [r.ok for r in results] == [True, False, True, True]
+    assert [r.document.title for r in results if r.ok] == ["Batch", "Batch (3)", "Batch (4)"]
+    assert DocumentVersion.query.count() == 3
+
+    # Identical content stored once, referenced by 2 documents + 2 versions
+    same = StoredBlob.query.filter_by(filepath=results[0].document.filepath).one()
+    assert same.ref_count == 4
+    assert len(list(tmp_path.iterdir())) == 2
+
+    assert Notification.query.filter_by(user_id=user.id).count() == 1
+
+
+def test_zip_import_recreates_folders(app, tmp_path):
+    import os
+    import zipfile
+    from io import BytesIO
+    from werkzeug.datastructures import FileStorage
+    from backend.extensions import db
+    from backend.models import Document, Folder, Job, StoredBlob, User
+    from backend.services.gc_service import sweep_orphans
+    from backend.services.import_service import import_archive
+    from backend.services.job_service import run_pending_jobs
+    from backend.services.storage_service import iter_decrypted_file
+
+    app.config.update({
+        "UPLOAD_FOLDER": str(tmp_path),
+        "CONTENT_INDEX_ENABLED": False,
+        "JOB_WORKERS": 0,
+        "JOB_CHECKPOINT_SIZE": 2,
+        "IMPORT_MAX_MEMBER_SIZE": 2 * 1024 * 1024,
+    })
+
+    user = User(username="importer", email="importer@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    big = os.urandom(1536 * 1024)  # spans several storage frames
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("Share/a.txt", "alpha")
+        zf.writestr("Share/Sub/b.txt", "alpha")
+        zf.writestr("Share/Sub/big.pdf", big, zipfile.ZIP_STORED)
+        zf.writestr("Share/Sub/huge.pdf", b"\0" * (3 * 1024 * 1024))
+        zf.writestr("Share/Sub/tool.exe", "MZ")
+        zf.writestr("Share/Empty/", "")
+        zf.writestr("__MACOSX/Share/._a.txt", "meta")
+    archive.seek(0)
+
+    job_id = import_archive(user, FileStorage(stream=archive, filename="Share.zip")).id
+
+    # The queued job's archive survives a sweep, grace period or not
+    sweep_orphans(grace_seconds=0)
+    assert run_pending_jobs() == 1
+
+    job = db.session.get(Job, job_id)
+    assert job.status == "done", job.error
+    assert job.result["imported"] == 3
+    assert job.result["skipped"] == 2
+
+    # The archive's single top-level folder is the import root
+    root = db.session.get(Folder, job.result["folder_id"])
+    paths = {f.id: f.name for f in [root] + root.all_descendants()}
+    assert sorted(paths.values()) == ["Empty", "Share", "Sub"]
+
+    docs = {d.filename: d for d in Document.query.filter(Document.folder_id.in_(list(paths)))}
+    assert sorted(docs) == ["a.txt", "b.txt", "big.pdf"]
+    assert b"".join(iter_decrypted_file(docs["big.pdf"].filepath)) == big
+
+    # Same content stored once; the archive blob is no longer referenced
+    assert docs["a.txt"].blob_id == docs["b.txt"].blob_id
+    archive_blob = StoredBlob.query.filter(StoredBlob.id.notin_([d.blob_id for d in docs.values()])).one()
+    assert archive_blob.ref_count == 0
@@ -82,3 +82,144 @@ def test_delete_folder_request_succeeds(client, app):
     with app.app_context():
         folder_after = Folder.query.get(folder_id)
         assert folder_after is not None
+
+
+def test_folder_closure_follows_moves(app):
+    from backend.models.folder_tree import FolderClosure
+    from backend.services.folder_service import rebuild_folder_tree
+
+    user_id = login_test_user(client=None, app=app)
+
+    root = Folder(name="Root", created_by=user_id)
+    db.session.add(root)
+    db.session.flush()
+    child = Folder(name="Child", created_by=user_id, parent_id=root.id)
+    db.session.add(child)
+    db.session.flush()
+    leaf = Folder(name="Leaf", created_by=user_id, parent_id=child.id)
+    other = Folder(name="Other", created_by=user_id)
+    db.session.add_all([leaf, other])
+    db.session.commit()
+
+    assert root.is_ancestor_of(leaf.id)
+    assert [f.name for f in root.all_descendants()] == ["Child", "Leaf"]
+
+    child.parent_id = other.id
+    db.session.commit()
+
+    assert not root.is_ancestor_of(leaf.id)
+    assert other.is_ancestor_of(leaf.id)
+
+    def closure():
+        return sorted(
+            (row.ancestor_id, row.descendant_id, row.depth)
+            for row in FolderClosure.query
+        )
+
+    before = closure()
+    rebuild_folder_tree()
+    assert closure() == before
+
+
+def test_bin_and_restore_subtree_in_chunks(app):
+    from backend.models.document import Document
+    from backend.services.folder_service import restore_subtrees, soft_delete_subtrees
+
+    app.config["FOLDER_BULK_CHUNK_SIZE"] = 2
+    user_id = login_test_user(client=None, app=app)
+
+    root = Folder(name="Root", created_by=user_id)
+    db.session.add(root)
+    db.session.flush()
+    child = Folder(name="Child", created_by=user_id, parent_id=root.id)
+    db.session.add(child)
+    db.session.flush()
+
+    for i in range(5):
+        db.session.add(Document(
+            title=f"Doc {i}",
+            filename="a.txt",
+            stored_name="a.txt",
+            filepath="/tmp/a.txt",
+            uploaded_by=user_id,
+            folder_id=child.id if i % 2 else root.id
+        ))
+    db.session.commit()
+
+    assert soft_delete_subtrees([root.id]) == (2, 5)
+    db.session.commit()
+
+    deleted_at = {d.deleted_at for d in Document.query}
+    assert len(deleted_at) == 1 and None not in deleted_at
+    assert child.is_deleted
+
+    assert restore_subtrees([root.id]) == (2, 5)
+    db.session.commit()
+
+    assert not any(d.is_deleted for d in Document.query)
+
+
+def test_folder_copy_job_resumes_from_checkpoint(app):
+    from backend.models import Job, StoredBlob, User
+    from backend.models.document import Document
+    from backend.services.folder_service import clone_subtree
+    from backend.services.job_service import cancel_job, enqueue_job, run_pending_jobs
+
+    app.config.update({"JOB_WORKERS": 0, "JOB_CHECKPOINT_SIZE": 2})
+    user_id = login_test_user(client=None, app=app)
+    user = db.session.get(User, user_id)
+
+    blob = StoredBlob(content_hash="1" * 64, stored_name="b", filepath="/tmp/b", ref_count=5)
+    root = Folder(name="Root", created_by=user_id)
+    db.session.add_all([blob, root])
+    db.session.flush()
+    child = Folder(name="Child", created_by=user_id, parent_id=root.id)
+    db.session.add(child)
+    db.session.flush()
+
+    for i in range(5):
+        db.session.add(Document(
+            title=f"Doc {i}",
+            filename="a.txt",
+            stored_name="b",
+            filepath="/tmp/b",
+            blob_id=blob.id,
+            uploaded_by=user_id,
+            folder_id=child.id if i % 2 else root.id
+        ))
+    db.session.commit()
+
+    # Interrupted after a checkpoint at 2 documents...
+    saved = {}
+
+    def step(done, state):
+        if done == 2:
+            db.session.commit()
+            saved.update(state)
+        if done == 3:
+            raise RuntimeError("worker died")
+
+    try:
+        clone_subtree(root, None, user_id, step=step)
+    except RuntimeError:
+        db.session.rollback()
+
+    # ...resumes with the rest, nothing copied twice
+    copy, failed = clone_subtree(root, None, user_id, state=saved)
+    assert failed == []
+    db.session.commit()
+    assert copy.name == "Root (copy)"
+    assert Document.query.count() == 10
+    assert Folder.query.count() == 4
+
+    job_id = enqueue_job("folder_copy", user, {"folder_id": root.id, "parent_id": None}).id
+    queued = enqueue_job("folder_copy", user, {"folder_id": root.id, "parent_id": None})
+    queued_id = queued.id
+    cancel_job(queued)
+
+    assert run_pending_jobs() == 1
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.progress_done, job.progress_total) == ("done", 5, 5)
+    assert db.session.get(Folder, job.result["folder_id"]).parent_id is None
+    assert db.session.get(Job, queued_id).status == "cancelled"
+    assert Document.query.count() == 15
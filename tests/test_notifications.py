@@ -0,0 +1,111 @@
+from backend.extensions import db
+from backend.models import Notification, User
+from backend.services.notification_service import notify_many, unread_summary
+
+
+def _user(name):
+    user = User(username=name, email=f"{name}@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_repeated_message_is_coalesced(app):
+    alice, bob = _user("alice"), _user("bobby")
+
+    assert notify_many([alice, bob], "Report updated") == 2
+    assert notify_many([alice, bob.id, bob], "Report updated") == 0
+
+    rows = Notification.query.order_by(Notification.user_id).all()
+    assert [n.repeat_count for n in rows] == [2, 2]
+
+
+def test_coalescing_window_and_mixed_insert_update(app):
+    from datetime import datetime, timedelta
+
+    from backend.services.notification_service import IST
+
+    app.config["NOTIFICATION_COALESCE_SECONDS"] = 600
+    alice, bob, carol, dave = (_user(n) for n in ("alice", "bobby", "carol", "david"))
+
+    notify_many([alice, bob, carol], "Report updated")
+    by_user = {n.user_id: n for n in Notification.query}
+
+    # Outside the window, read, or another message: not coalesced
+    by_user[bob.id].created_at = datetime.now(IST) - timedelta(seconds=601)
+    by_user[carol.id].is_read = True
+    notify_many([alice], "Other message")
+    db.session.commit()
+
+    # One call: alice's row is bumped, everyone else gets a new row
+    assert notify_many([alice, bob, carol, dave], "Report updated") == 3
+
+    rows = Notification.query.filter_by(message="Report updated").all()
+    counts = sorted((n.user_id, n.repeat_count, n.is_read) for n in rows)
+    assert counts == [
+        (alice.id, 2, False),
+        (bob.id, 1, False), (bob.id, 1, False),
+        (carol.id, 1, False), (carol.id, 1, True),
+        (dave.id, 1, False),
+    ]
+
+    # The bumped row moves to the top of alice's list
+    assert unread_summary(alice.id)["recent"][0]["message"] == "Report updated"
+
+    # A window of 0 turns coalescing off
+    app.config["NOTIFICATION_COALESCE_SECONDS"] = 0
+    assert notify_many([alice], "Report updated") == 1
+
+
+def test_unread_summary_is_invalidated_on_notify(app):
+    alice = _user("alice")
+
+    assert unread_summary(alice.id)["count"] == 0
+
+    notify_many([alice], "Welcome")
+
+    summary = unread_summary(alice.id)
+    assert summary["count"] == 1
+    assert summary["recent"][0]["message"] == "Welcome"
+
+
+def test_broker_wakes_only_the_users_streams():
+    from backend.services.notification_service import NotificationBroker
+
+    broker = NotificationBroker(queue_size=1)
+    alice_tab, bob_tab = broker.subscribe(1), broker.subscribe(2)
+    assert broker.connections() == 2
+
+    broker.publish([1], updated={1: 42})
+    broker.publish([1])  # queue full: dropped, the stream re-reads anyway
+    assert alice_tab.get_nowait() == 42
+    assert alice_tab.empty() and bob_tab.empty()
+
+    broker.unsubscribe(1, alice_tab)
+    broker.publish([1])
+    assert alice_tab.empty()
+    assert broker.connections() == 1
+
+
+def test_stream_is_opt_in_and_resumes_from_last_event_id(app, client):
+    alice = _user("alice")
+    notify_many([alice], "First")
+    notify_many([alice], "Second")
+
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(alice.id)
+        sess["_fresh"] = True
+
+    # Off by default: 204 stops EventSource from reconnecting; the bell polls
+    assert client.get("/notifications/stream").status_code == 204
+    assert client.get("/notifications/unread").get_json()["count"] == 2
+
+    app.config.update({"NOTIFICATION_STREAM_ENABLED": True, "NOTIFICATION_STREAM_MAX_SECONDS": 0})
+    first_id = Notification.query.filter_by(message="First").one().id
+
+    response = client.get("/notifications/stream", headers={"Last-Event-ID": str(first_id)})
+    body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/event-stream"
+    assert "Second" in body and "First" not in body
+    assert '"unread": 2' in body
@@ -0,0 +1,45 @@
+from sqlalchemy import text
+
+from backend.extensions import db
+from backend.models import Document, User
+from backend.services.schema_service import upgrade_schema
+
+
+def test_columns_added_after_a_table_existed_are_upgraded(app):
+    # Tables as a deployment from before these columns had them
+    with db.engine.begin() as conn:
+        for table, column in (("documents", "size_bytes"), ("documents", "size_checked")):
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+    assert sorted(upgrade_schema()) == ["documents.size_bytes", "documents.size_checked"]
+    assert upgrade_schema() == []
+
+    user = User(username="upgrader", email="upgrader@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Document(title="New", filename="a.txt", stored_name="a", filepath="/tmp/a",
+                            uploaded_by=user.id))
+    db.session.commit()
+    assert (Document.query.one().size_bytes, Document.query.one().size_checked) == (0, False)
+
+
+def test_notifications_gain_repeat_count_and_index(app):
+    from sqlalchemy import inspect
+
+    from backend.models import Notification
+
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_notifications_user_unread"))
+        conn.execute(text("ALTER TABLE notifications DROP COLUMN repeat_count"))
+        conn.execute(text(
+            "INSERT INTO notifications (user_id, message, is_read, created_at) "
+            "VALUES (1, 'Old', 0, '2024-01-01 00:00:00')"
+        ))
+
+    assert sorted(upgrade_schema()) == ["ix_notifications_user_unread", "notifications.repeat_count"]
+
+    indexes = {i["name"] for i in inspect(db.engine).get_indexes("notifications")}
+    assert "ix_notifications_user_unread" in indexes
+
+    # Existing rows count as sent once
+    assert Notification.query.one().repeat_count == 1
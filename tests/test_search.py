@@ -0,0 +1,98 @@
+import io
+import zipfile
+
+from cryptography.fernet import Fernet
+
+from backend.extensions import db
+from backend.models import Document, DocumentSearchToken, User
+from backend.services.blind_index import blind_tokens, tokenize
+from backend.services.document_service import apply_search
+from backend.services.text_extraction import _extract_docx, _extract_pdf
+
+
+def test_tokens_are_normalized_before_hashing(app):
+    assert tokenize("Quarterly REPORT, q3-2024") == {"quarterly", "report", "q3", "2024"}
+    assert blind_tokens("Report") == blind_tokens("report")
+    assert "report" not in blind_tokens("report")[0]
+
+
+def _search(text, fields=("title", "tags")):
+    return sorted(d.title for d in apply_search(Document.query, text, fields))
+
+
+def test_search_follows_title_tags_and_category(app):
+    user = User(username="indexer", email="indexer@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    doc = Document(title="Quarterly Report", tags="finance, q3", filename="r.pdf",
+                   stored_name="r", filepath="/tmp/r", uploaded_by=user.id)
+    other = Document(title="Annual report", filename="a.pdf", stored_name="a",
+                     filepath="/tmp/a", uploaded_by=user.id)
+    db.session.add_all([doc, other])
+    db.session.commit()
+
+    # Every word must match, in any of the searched fields
+    assert _search("report") == ["Annual report", "Quarterly Report"]
+    assert _search("REPORT finance") == ["Quarterly Report"]
+    assert _search("finance", fields=("title",)) == []
+    assert _search("") == ["Annual report", "Quarterly Report"]
+
+    # Setters keep the index in step: old words go, new words come
+    doc.title = "Budget Report"
+    doc.tags = None
+    doc.category = "Legal"
+    db.session.commit()
+
+    assert _search("quarterly") == _search("finance") == []
+    assert _search("budget report") == ["Budget Report"]
+    assert _search("legal", fields=("category",)) == ["Budget Report"]
+    assert DocumentSearchToken.query.filter_by(document_id=doc.id).count() == 3
+
+
+def test_search_survives_key_rotation(app):
+    old_key = app.config["ENCRYPTION_KEY"]
+    app.config["SEARCH_INDEX_KEY"] = old_key
+    doc = Document(title="Contract", filename="c.pdf", stored_name="c", filepath="/tmp/c",
+                   uploaded_by=1)
+    db.session.add(doc)
+    db.session.commit()
+
+    app.config.update({"ENCRYPTION_KEY": Fernet.generate_key(), "ENCRYPTION_OLD_KEYS": [old_key]})
+    assert _search("contract") == ["Contract"]
+
+
+def test_docx_text_is_extracted():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            "<w:body><w:p><w:r><w:t>Employee handbook</w:t></w:r></w:p></w:body></w:document>"
+        )
+    buf.seek(0)
+
+    assert _extract_docx(buf) == "Employee handbook"
+
+
+def test_pdf_text_operators_are_extracted():
+    pdf = b"%PDF-1.4\n1 0 obj<<>>stream\nBT (Purchase order) Tj [(in) -20 (voice)] TJ ET\nendstream\n"
+
+    assert _extract_pdf(io.BytesIO(pdf)) == "Purchase order in voice"
+
+
+def test_decompression_is_bounded(monkeypatch):
+    import zlib
+    from backend.services import text_extraction
+
+    monkeypatch.setattr(text_extraction, "MAX_INFLATED_BYTES", 1024)
+    bomb = b"BT (x) Tj ET " * 100000  # ~1.3 MB inflated from a few KB
+
+    pdf = b"stream\n" + zlib.compress(bomb) + b"\nendstream\n"
+    assert len(_extract_pdf(io.BytesIO(pdf)).split()) < 100
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("word/document.xml", b"<w:t>" + b"a" * 100000 + b"</w:t>")
+    buf.seek(0)
+    assert _extract_docx(buf) == ""
@@ -0,0 +1,198 @@
+import os
+from io import BytesIO
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from backend.services.blob_service import store_blob
+from backend.services.storage_service import (
+    _get_fernet,
+    decrypt_file,
+    iter_decrypted_file,
+    plaintext_size,
+    save_encrypted_file,
+)
+
+
+@pytest.fixture
+def storage_app(app, tmp_path):
+    app.config.update({
+        "UPLOAD_FOLDER": str(tmp_path),
+        "STORAGE_FRAME_SIZE": 64
+    })
+    return app
+
+
+def _upload(data: bytes, name="report.pdf"):
+    return FileStorage(stream=BytesIO(data), filename=name)
+
+
+def test_framed_roundtrip_streams_in_frames(storage_app):
+    data = os.urandom(64 * 3 + 10)
+
+    path, _ = save_encrypted_file(_upload(data))
+
+    chunks = list(iter_decrypted_file(path))
+    assert len(chunks) == 4
+    assert b"".join(chunks) == data
+    assert plaintext_size(path) == len(data)
+
+
+def test_empty_file_roundtrip(storage_app):
+    path, _ = save_encrypted_file(_upload(b""))
+
+    assert decrypt_file(path) == b""
+    assert plaintext_size(path) == 0
+
+
+def test_legacy_fernet_file_still_readable(storage_app, tmp_path):
+    legacy = tmp_path / "legacy.pdf"
+    legacy.write_bytes(_get_fernet().encrypt(b"old payload"))
+
+    assert decrypt_file(str(legacy)) == b"old payload"
+    assert plaintext_size(str(legacy)) is None
+
+
+def test_truncated_file_is_rejected(storage_app):
+    path, _ = save_encrypted_file(_upload(os.urandom(64 * 2 + 1)))
+
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - (1 + 16))
+
+    with pytest.raises(RuntimeError):
+        decrypt_file(path)
+
+
+def test_range_decrypts_only_requested_span(storage_app):
+    data = os.urandom(64 * 5)
+    path, _ = save_encrypted_file(_upload(data))
+
+    chunks = list(iter_decrypted_file(path, 70, 200))
+
+    # frames 1..3 cover bytes 70-199
+    assert len(chunks) == 3
+    assert b"".join(chunks) == data[70:200]
+
+
+def test_identical_content_is_stored_once(storage_app, tmp_path):
+    first = store_blob([b"same ", b"bytes"], "a.pdf")
+    second = store_blob([b"same bytes"], "b.pdf")
+
+    assert first.id == second.id
+    assert first.size_bytes == 10
+    assert len([p for p in tmp_path.iterdir()]) == 1
+
+
+def test_sweep_removes_only_unreferenced_files(storage_app, tmp_path):
+    from backend.services.gc_service import sweep_orphans
+
+    orphan = tmp_path / "orphan.pdf"
+    orphan.write_bytes(b"left behind")
+
+    dry = sweep_orphans(dry_run=True, grace_seconds=0)
+    assert dry.orphans_found == 1
+    assert orphan.exists()
+
+    sweep = sweep_orphans(grace_seconds=0)
+    assert sweep.orphans_removed == 1
+    assert not orphan.exists()
+    assert sweep.files_total == 0
+
+
+def test_sweep_spares_new_blobs_and_deletes_release_refs(storage_app):
+    from backend.extensions import db
+    from backend.models import Document, StoredBlob, User
+    from backend.services.blob_service import release_document_blobs
+    from backend.services.document_service import create_document
+    from backend.services.gc_service import sweep_orphans
+
+    storage_app.config["CONTENT_INDEX_ENABLED"] = False
+
+    # Stored, but its document row isn't committed yet
+    pending = store_blob([b"upload in flight"], "a.pdf")
+    db.session.commit()
+    pending_id = pending.id
+    assert sweep_orphans(grace_seconds=3600).blobs_removed == 0
+    assert db.session.get(StoredBlob, pending_id) is not None
+
+    user = User(username="owner", email="owner@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    doc = create_document(user, "Doc", "", _upload(b"kept"))
+    blob_id = doc.blob_id
+    assert db.session.get(StoredBlob, blob_id).ref_count == 2
+
+    release_document_blobs(Document.id == doc.id)
+    db.session.delete(doc)
+    db.session.commit()
+    assert db.session.get(StoredBlob, blob_id).ref_count == 0
+
+    # Past the grace period an unreferenced blob goes
+    sweep_orphans(grace_seconds=0)
+    assert db.session.get(StoredBlob, pending_id) is None
+
+
+def test_legacy_file_is_moved_into_a_blob_once(storage_app):
+    from backend.extensions import db
+    from backend.models import Document, DocumentVersion, StoredBlob, User
+    from backend.services.document_service import copy_document_row
+
+    user = User(username="legacy", email="legacy@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+
+    path, name = save_encrypted_file(_upload(b"stored before dedup"))
+    doc = Document(title="Old", filename="old.pdf", stored_name=name, filepath=path, uploaded_by=user.id)
+    db.session.add(doc)
+    db.session.flush()
+    db.session.add(DocumentVersion(document_id=doc.id, version=1, stored_name=name, filepath=path))
+    db.session.commit()
+
+    copy_document_row(doc, user.id, None)
+    copy_document_row(doc, user.id, None)
+    db.session.commit()
+
+    blob = StoredBlob.query.one()
+    assert doc.blob_id == blob.id
+    assert DocumentVersion.query.one().blob_id == blob.id
+    assert blob.ref_count == 4  # original + its version + 2 copies
+
+
+def test_files_stay_readable_after_key_rotation(storage_app):
+    from cryptography.fernet import Fernet
+    from backend.services.encryption_service import EncryptionService
+
+    data = os.urandom(64 * 2)
+    path, _ = save_encrypted_file(_upload(data))
+    title = EncryptionService.encrypt_text("Quarterly report")
+
+    old_key = storage_app.config["ENCRYPTION_KEY"]
+    storage_app.config.update({
+        "ENCRYPTION_KEY": Fernet.generate_key(),
+        "ENCRYPTION_OLD_KEYS": [old_key]
+    })
+
+    assert decrypt_file(path) == data
+    assert EncryptionService.decrypt_text(title) == "Quarterly report"
+    assert EncryptionService.rotate_text(title) != title
+
+
+def test_streamed_zip_is_readable(storage_app):
+    import zipfile
+    from datetime import datetime
+    from backend.services.zip_stream import STORED, ZipMember, stream_zip
+
+    data = os.urandom(1000)
+    members = [
+        ZipMember("Reports/", None, None),
+        ZipMember("Reports/q1.txt", datetime(2024, 3, 31, 12, 0), iter([b"a" * 500, b"b" * 500])),
+        ZipMember("scan.pdf", None, iter_decrypted_file(save_encrypted_file(_upload(data))[0]), STORED),
+    ]
+
+    archive = zipfile.ZipFile(BytesIO(b"".join(stream_zip(members))))
+
+    assert archive.testzip() is None
+    assert archive.namelist() == ["Reports/", "Reports/q1.txt", "scan.pdf"]
+    assert archive.read("Reports/q1.txt") == b"a" * 500 + b"b" * 500
+    assert archive.read("scan.pdf") == data
+    assert archive.getinfo("Reports/q1.txt").date_time == (2024, 3, 31, 12, 0, 0)
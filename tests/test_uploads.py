@@ -0,0 +1,111 @@
+import hashlib
+import os
+from io import BytesIO
+
+import pytest
+
+from backend.extensions import db
+from backend.models import UploadSession, User
+from backend.services.storage_service import decrypt_file
+from backend.services.upload_service import (
+    UploadError, UploadOffsetError, finalize_upload, queue_finalize, read_chunk, start_upload,
+    write_chunk
+)
+
+
+@pytest.fixture
+def upload_app(app, tmp_path):
+    app.config.update({
+        "UPLOAD_FOLDER": str(tmp_path / "files"),
+        "UPLOAD_STAGING_FOLDER": str(tmp_path / "staging"),
+        "UPLOAD_CHUNK_SIZE": 100,
+        "CONTENT_INDEX_ENABLED": False
+    })
+    return app
+
+
+def test_resumable_upload_becomes_document_then_version(upload_app, tmp_path):
+    user = User(username="scanner", email="scanner@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    data = os.urandom(250)
+    upload = start_upload(user, "scan.pdf", len(data))
+
+    assert write_chunk(upload, 0, read_chunk(BytesIO(data[:100]))) == 100
+
+    # Resend after a drop: wrong offset tells the client where to resume
+    with pytest.raises(UploadOffsetError) as e:
+        write_chunk(upload, 0, data[:100])
+    assert e.value.expected == 100
+
+    checksum = hashlib.sha256(data[100:200]).hexdigest()
+    with pytest.raises(UploadError):
+        read_chunk(BytesIO(data[100:200]), checksum="0" * 64)
+    write_chunk(upload, 100, read_chunk(BytesIO(data[100:200]), checksum))
+
+    with pytest.raises(UploadOffsetError):
+        finalize_upload(upload, user, title="Scan")
+
+    write_chunk(upload, 200, data[200:])
+
+    # Nothing readable is staged
+    staged = b"".join(p.read_bytes() for p in (tmp_path / "staging").rglob("*.chunk"))
+    assert data[:16] not in staged
+
+    doc = finalize_upload(upload, user, title="Scan")
+    assert decrypt_file(doc.filepath) == data
+    assert (doc.version, doc.size_bytes) == (1, 250)
+    assert UploadSession.query.count() == 0
+    assert not list((tmp_path / "staging").iterdir())
+
+    # Same protocol for a new version of the document
+    upload = start_upload(user, "scan-v2.pdf", 3, document=doc)
+    write_chunk(upload, 0, b"new")
+    assert finalize_upload(upload, user).version == 2
+    assert decrypt_file(doc.filepath) == b"new"
+
+
+def test_finalize_runs_as_job_and_rechecks_target(upload_app):
+    from backend.models import Document, Job
+    from backend.services.job_service import run_pending_jobs
+
+    upload_app.config["JOB_WORKERS"] = 0
+    user = User(username="mover", email="mover@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+
+    upload = start_upload(user, "big.pdf", 4)
+    write_chunk(upload, 0, b"data")
+    job_id = queue_finalize(upload, user, title="Big").id
+    assert Document.query.count() == 0
+
+    assert run_pending_jobs() == 1
+    job = db.session.get(Job, job_id)
+    assert job.status == "done", job.error
+    doc = db.session.get(Document, job.result["document_id"])
+    assert (doc.title, doc.version) == ("Big", 1)
+
+    # A version for a document binned since the upload started is refused
+    upload = start_upload(db.session.get(User, user_id), "big-v2.pdf", 2, document=doc)
+    write_chunk(upload, 0, b"v2")
+    doc.is_deleted = True
+    db.session.commit()
+    with pytest.raises(UploadError):
+        queue_finalize(upload, db.session.get(User, user_id))
+
+
+def test_zip_needs_import_intent_at_init(upload_app):
+    from backend.services.document_service import InvalidFileTypeError
+
+    user = User(username="migrator", email="migrator@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    with pytest.raises(InvalidFileTypeError):
+        start_upload(user, "share.zip", 10)
+    with pytest.raises(UploadError):
+        start_upload(user, "scan.pdf", 10, for_import=True)
+
+    assert start_upload(user, "share.zip", 10, for_import=True).filename == "share.zip"